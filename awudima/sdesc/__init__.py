@@ -1,8 +1,27 @@
 
+import hashlib
+import json
+import math
+import queue
+import threading
+import time
+from collections import deque
+from collections.abc import MutableSet
 from enum import Enum
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 # from sdl.rdfmt_extractor import RDFMTExtractor
 
-from awudima.sdesc.utils import contact_sparql_endpoint
+from awudima.sdesc.utils import contact_sparql_endpoint, get_session_pool, intern_iri
+from awudima.sdesc.hierarchy import ClassHierarchy
+from awudima.sdesc.sinks import create_sink
+from awudima.sdesc.paging import get_page_sizes, keyset_query
+from awudima.sdesc.scheduler import RESULT_LIMIT, TIMEOUT, SERVER_ERROR
+from awudima.sdesc.stats import wilson_interval
+
+
+RDF_TYPE = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#type'
+# failures of a page that a smaller page may avoid: too many rows, too slow to compute, or too heavy for the server
+SHRINKING_FAILURES = (RESULT_LIMIT, TIMEOUT, SERVER_ERROR)
 
 
 class Federation:
@@ -24,58 +43,134 @@ class Federation:
         self.name = name
         self.desc = desc
         self.datasources = set()
-        self.rdfmts = set()
+        self._reset_indexes()
+        # dsId -> {mtId: fingerprint} of the RDF-MTs extracted from each data source, see refresh_source_molecules
+        self.fingerprints = {}
 
-    def extract_molecules(self, merge=True):
+    def extract_molecules(self, merge=True, parallel=False, max_workers=None, time_budget=None, params=None):
         """extract RDFMT for this federation
 
         :param merge: whether to merge or not - replace. default True
+        :param parallel: whether to extract each data source in its own worker. RDF-MTs of a source are merged as soon
+                    as the source is done. default False
+        :param max_workers: max number of data sources extracted at the same time, if {parallel} is set.
+                    default: one worker per data source
+        :param time_budget: max number of seconds for the extraction of all data sources, None for no limit. When it
+                    runs out, RDF-MTs whose extraction is not done are kept with complete set to False, see
+                    RDFMTExtractor params time_budget. default: None
+        :param params: params of the RDFMTExtractor of each data source, see RDFMTExtractor. default: None
         :return:
         """
-        extractor = RDFMTExtractor()
         if merge:
             self.rdfmts = set()
-        rdfmts_dict = self.rdfmts_as_dict_obj()
-
-        for ds in self.datasources:
-            mts = extractor.get_molecules(ds, collect_labels=True, collect_stats=True)
-            for m in mts:
-                if m.mtId in rdfmts_dict:
-                    rdfmts_dict[m.mtId].merge_with(m)
-                else:
-                    self.rdfmts.add(m)
+        deadline = time.time() + time_budget if time_budget is not None else None
+
+        if parallel and len(self.datasources) > 1:
+            if max_workers is None or max_workers < 1:
+                max_workers = len(self.datasources)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(self._extract_datasource, ds, deadline, params)
+                           for ds in self.datasources]
+                for future in as_completed(futures):
+                    self.addRDFMTs(future.result())
+        else:
+            for ds in self.datasources:
+                self.addRDFMTs(self._extract_datasource(ds, deadline, params))
 
         return self.rdfmts
 
-    def extract_source_molecules(self, datasource, merge=True):
+    def refresh_source_molecules(self, datasource, params=None):
+        """incrementally refresh the RDFMTs extracted from {datasource}
+
+        Each RDF-MT of the data source is fingerprinted with cheap signals (its cardinality and predicate set, see
+        RDFMTExtractor.get_fingerprints). Only RDF-MTs that are new or whose fingerprint changed since the last
+        refresh are extracted again; RDF-MTs that are no longer in the data source are removed. On the first refresh
+        of a data source all of its RDF-MTs are considered changed. Dump, tabular and relational data sources are
+        read once: their RDF-MTs are extracted and fingerprinted in the same pass.
+
+        If the RDF-MTs of the data source cannot be listed (e.g., the endpoint is down), nothing is changed. RDF-MTs
+        whose cardinality cannot be counted are not considered changed, and keep their last fingerprint.
+
+        :param datasource: the data source to refresh
+        :param params: params of the RDFMTExtractor, see RDFMTExtractor. default: None
+        :return: dict with lists of mtIds that are 'added', 'changed' and 'removed'
+        """
+        extractor = RDFMTExtractor(params=params)
+        local = extractor._iter_local_molecules(datasource, collect_labels=True, collect_stats=True)
+        if local is not None:
+            mts = {m.mtId: m for m in local}
+            fingerprints = {t: fingerprint(m.cardinality, [p.predId for p in m.predicates]) for t, m in mts.items()}
+        else:
+            mts = None
+            fingerprints = extractor.get_fingerprints(datasource)
+        if fingerprints is None:
+            print("Could not list the RDF-MTs of", datasource.url, "- they are kept unchanged")
+            return {
+                'added': [],
+                'changed': [],
+                'removed': []
+            }
+        old = self.fingerprints.get(datasource.dsId)
+        if old is None:
+            old = {m.mtId: None for m in self.rdfmts if datasource in m.datasources}
+        fingerprints = {t: f if f is not None else old.get(t) for t, f in fingerprints.items()}
+
+        added = [t for t in fingerprints if t not in old]
+        removed = [t for t in old if t not in fingerprints]
+        changed = [t for t in fingerprints if t in old and old[t] != fingerprints[t]]
+
+        self._detach_source(datasource, set(removed + changed))
+        if len(added) + len(changed) > 0:
+            if mts is None:
+                self.addRDFMTs(extractor.get_molecules(datasource, collect_labels=True, collect_stats=True,
+                                                       include=set(added + changed)))
+            else:
+                self.addRDFMTs([mts[t] for t in added + changed])
+        self.fingerprints[datasource.dsId] = fingerprints
+
+        return {
+            'added': added,
+            'changed': changed,
+            'removed': removed
+        }
+
+    def _detach_source(self, datasource, mtIds=None):
+        toremove = []
+        for m in self.rdfmts:
+            if datasource in m.datasources and (mtIds is None or m.mtId in mtIds):
+                # if this rdfmt is not available in any other data sources, then remove it completely,
+                # else just remove the datasouce from sources list
+                if len(m.datasources) == 1:
+                    toremove.append(m)
+                else:
+                    m.datasources.remove(datasource)
+                    self._class_sources[m.mtId] &= ~self._source_bit(datasource)
+
+        for m in toremove:
+            self.rdfmts.discard(m)
+        if mtIds is None:
+            self.fingerprints.pop(datasource.dsId, None)
+
+    def _extract_datasource(self, datasource, deadline=None, params=None):
+        params = dict(params) if params is not None else {}
+        if deadline is not None:
+            params['deadline'] = deadline
+        extractor = RDFMTExtractor(params=params)
+        return extractor.get_molecules(datasource, collect_labels=True, collect_stats=True)
+
+    def extract_source_molecules(self, datasource, merge=True, params=None):
         """extract RDFMT for this federation
 
         :param merge: whether to merge or not - replace. default True
+        :param params: params of the RDFMTExtractor, see RDFMTExtractor. default: None
         :return:
         """
-        extractor = RDFMTExtractor()
         if merge:
-            toremove = []
-            for m in self.rdfmts:
-                if datasource in m.datasources:
-                    # if this rdfmt is not available in any other data sources, then remove it completely,
-                    # else just remove the datasouce from sources list
-                    if len(m.datasources) == 1:
-                        toremove.append(m)
-                    else:
-                        m.datasources.remove(datasource)
-
-            for m in toremove:
-                self.rdfmts.remove(m)
+            self._detach_source(datasource)
 
         # self.rdfmts.update(extractor.get_molecules(datasource, collect_labels=True, collect_stats=True))
-        mts = extractor.get_molecules(datasource, collect_labels=True, collect_stats=True)
-        rdfmts_dict = self.rdfmts_as_dict_obj()
-        for m in mts:
-            if m.mtId in rdfmts_dict:
-                rdfmts_dict[m.mtId].merge_with(m)
-            else:
-                self.rdfmts.add(m)
+        mts = self._extract_datasource(datasource, params=params)
+        self.addRDFMTs(mts)
 
         return self.rdfmts
 
@@ -90,27 +185,165 @@ class Federation:
     def addSource(self, source):
         self.datasources.add(source)
 
+    @property
+    def rdfmts(self):
+        # set view over the RDF-MTs of the federation; changes through it keep the indexes up to date
+        return _RDFMTSet(self)
+
+    @rdfmts.setter
+    def rdfmts(self, rdfmts):
+        rdfmts = list(rdfmts)
+        self._reset_indexes()
+        for r in rdfmts:
+            self.rdfmts.add(r)
+
     def addRDFMT(self, rdfmt):
-        rdfmts_dict = self.rdfmts_as_dict_obj()
-        if rdfmt.mtId in rdfmts_dict:
-            rdfmts_dict[rdfmt.mtId].merge_with(rdfmt)
+        """Adds {rdfmt} to the federation, or merges it in place into the RDF-MT with the same mtId, if any
+
+        :param rdfmt: RDFMT
+        :return:
+        """
+        if rdfmt.mtId in self._rdfmts_by_id:
+            self._rdfmts_by_id[rdfmt.mtId].merge(rdfmt)
+            self._index_rdfmt(rdfmt)
         else:
             self.rdfmts.add(rdfmt)
 
     def addRDFMTs(self, rdfmts):
         # self.rdfmts.update(rdfmts)
-        rdfmts_dict = self.rdfmts_as_dict_obj()
         for rdfmt in rdfmts:
-            if rdfmt.mtId in rdfmts_dict:
-                rdfmts_dict[rdfmt.mtId].merge_with(rdfmt)
-            else:
-                self.rdfmts.add(rdfmt)
+            self.addRDFMT(rdfmt)
+
+    def getRDFMT(self, mtId):
+        """Returns the RDF-MT with the given {mtId}, or None if it is not in the federation
+
+        :param mtId: id of the RDF-MT
+        :return: RDFMT
+        """
+        return self._rdfmts_by_id.get(mtId)
+
+    def _reset_indexes(self):
+        # mtId -> RDFMT
+        self._rdfmts_by_id = {}
+        # predId -> set of mtIds, range -> set of mtIds
+        self._pred_index = {}
+        self._range_index = {}
+        # mtId -> bitset of the data sources it is available in, where each data source is assigned one bit
+        self._class_sources = {}
+        self._source_bits = {}
+        self._sources_by_bit = []
+
+    def _source_bit(self, datasource):
+        if datasource.dsId not in self._source_bits:
+            self._source_bits[datasource.dsId] = 1 << len(self._sources_by_bit)
+            self._sources_by_bit.append(datasource)
+        return self._source_bits[datasource.dsId]
+
+    def _index_rdfmt(self, rdfmt):
+        # indexes the predicates, ranges and data sources of {rdfmt}, as stored in the federation after merges
+        mt = self._rdfmts_by_id[rdfmt.mtId]
+        bits = self._class_sources.get(mt.mtId, 0)
+        for ds in mt.datasources:
+            bits |= self._source_bit(ds)
+        self._class_sources[mt.mtId] = bits
+        for p in mt.predicates:
+            self._pred_index.setdefault(p.predId, set()).add(mt.mtId)
+            for r in p.ranges:
+                self._range_index.setdefault(r, set()).add(mt.mtId)
+
+    def _unindex_rdfmt(self, rdfmt):
+        self._class_sources.pop(rdfmt.mtId, None)
+        for p in rdfmt.predicates:
+            self._pred_index.get(p.predId, set()).discard(rdfmt.mtId)
+            for r in p.ranges:
+                self._range_index.get(r, set()).discard(rdfmt.mtId)
+
+    def rdfmts_of_predicate(self, predId):
+        """RDF-MTs that have the predicate {predId}
+
+        :param predId: id of the predicate
+        :return: set of mtIds
+        """
+        return set(self._pred_index.get(predId, ()))
+
+    def rdfmts_with_range(self, range_id):
+        """RDF-MTs that have at least one predicate whose values range over {range_id} (class or datatype)
+
+        :param range_id: class or datatype IRI
+        :return: set of mtIds
+        """
+        return set(self._range_index.get(range_id, ()))
+
+    def sources_of_rdfmt(self, mtId):
+        """Data sources the RDF-MT {mtId} is available in
+
+        :param mtId: id of the RDF-MT
+        :return: list of DataSources
+        """
+        return self._sources_of_bits(self._class_sources.get(mtId, 0))
+
+    def _sources_of_bits(self, bits):
+        sources = []
+        i = 0
+        while bits:
+            if bits & 1:
+                sources.append(self._sources_by_bit[i])
+            bits >>= 1
+            i += 1
+        return sources
+
+    def select_sources(self, triple_patterns):
+        """Selects the RDF-MTs and data sources that can answer each of the given triple patterns
+
+        Triple patterns are grouped by subject into star-shaped groups. The candidate RDF-MTs of a group are those
+        that are the class of an rdf:type pattern of the group and that have every constant predicate of the group;
+        its data sources are the union of the data sources of the candidate RDF-MTs. All lookups are answered from
+        the indexes of the federation.
+
+        :param triple_patterns: list of (subject, predicate, object) tuples. Variables start with '?'; IRIs can be
+                    given with or without angle brackets; 'a' is accepted for rdf:type
+        :return: dict of triple pattern -> {'rdfmts': set of mtIds, 'sources': list of DataSources}
+        """
+
+        stars = {}
+        for tp in triple_patterns:
+            stars.setdefault(tp[0], []).append(tp)
+
+        selection = {}
+        for subject, tps in stars.items():
+            candidates = None
+            for s, p, o in tps:
+                p = _strip_iri(p)
+                if p.startswith('?'):
+                    continue
+                if p in ('a', RDF_TYPE):
+                    if o.startswith('?'):
+                        continue
+                    mts = {_strip_iri(o)} if _strip_iri(o) in self._class_sources else set()
+                else:
+                    mts = self._pred_index.get(p, set())
+                candidates = set(mts) if candidates is None else candidates & mts
+
+            if candidates is None:
+                candidates = set(self._class_sources)
+
+            bits = 0
+            for mtId in candidates:
+                bits |= self._class_sources[mtId]
+            sources = self._sources_of_bits(bits)
+            for tp in tps:
+                selection[tp] = {
+                    'rdfmts': candidates,
+                    'sources': sources
+                }
+
+        return selection
 
     def rdfmts_as_dict(self):
         return {r.mtId: r.to_json() for r in self.rdfmts}
 
     def rdfmts_as_dict_obj(self):
-        return {r.mtId: r for r in self.rdfmts}
+        return dict(self._rdfmts_by_id)
 
     def to_json(self):
         """Produces a JSON representation of the federation
@@ -126,6 +359,90 @@ class Federation:
             "sources": [s.to_json() for s in self.datasources]
         }
 
+    def dump_ndjson(self, out):
+        """Writes the federation as newline delimited JSON, one record per line
+
+        The first line describes the federation, followed by one line per data source and one line per RDF-MT.
+        RDF-MTs refer to their data sources by dsId instead of repeating them. Records are written one at a time, so
+        the whole catalog is never built as a single document.
+
+        :param out: path of the file to write, or a writable text stream
+        :return:
+        """
+        if isinstance(out, str):
+            with open(out, 'w', encoding='utf-8') as f:
+                return self.dump_ndjson(f)
+
+        out.write(_ndjson_line({"type": "federation", "fedId": self.fedId, "name": self.name, "desc": self.desc}))
+
+        # data sources that are only referenced by RDF-MTs are written as non-members of the federation
+        sources = {ds.dsId: ds for r in self.rdfmts for ds in r.datasources}
+        for ds in self.datasources:
+            sources.pop(ds.dsId, None)
+            out.write(_ndjson_line(dict(ds.to_json(), type="datasource", member=True)))
+        for ds in sources.values():
+            out.write(_ndjson_line(dict(ds.to_json(), type="datasource", member=False)))
+
+        for r in self.rdfmts:
+            out.write(_ndjson_line(dict(r.to_json(datasource_ids=True), type="rdfmt")))
+
+    def save_snapshot(self, path):
+        """Writes a binary, memory-mappable snapshot of the federation, see awudima.sdesc.snapshot
+
+        :param path: path of the snapshot file
+        :return:
+        """
+        from awudima.sdesc.snapshot import write_snapshot
+        write_snapshot(self, path)
+
+    @staticmethod
+    def open_snapshot(path):
+        """Opens a snapshot written by save_snapshot. RDF-MTs are decoded lazily, when first accessed by mtId.
+
+        :param path: path of the snapshot file
+        :return: CatalogSnapshot
+        """
+        from awudima.sdesc.snapshot import CatalogSnapshot
+        return CatalogSnapshot(path)
+
+    @staticmethod
+    def load_ndjson(inp):
+        """Loads a federation written by dump_ndjson, reading one record at a time
+
+        :param inp: path of the file to read, or a readable text stream
+        :return: Federation
+        """
+        if isinstance(inp, str):
+            with open(inp, encoding='utf-8') as f:
+                return Federation.load_ndjson(f)
+
+        federation = None
+        sources = {}
+        for line in inp:
+            line = line.strip()
+            if len(line) == 0:
+                continue
+            record = json.loads(line)
+            rtype = record.pop('type', None)
+            if rtype == 'federation':
+                federation = Federation(record['fedId'], record['name'], record.get('desc', ''))
+                continue
+            if federation is None:
+                raise Exception("Federation record is missing at the beginning of the NDJSON catalog")
+
+            if rtype == 'datasource':
+                ds = DataSource.from_json(record)
+                sources[ds.dsId] = ds
+                if record.get('member', True):
+                    federation.addSource(ds)
+            elif rtype == 'rdfmt':
+                federation.addRDFMT(RDFMT.from_json(record, sources))
+
+        if federation is None:
+            raise Exception("Federation record is missing in the NDJSON catalog")
+
+        return federation
+
     def __str__(self):
         return self.to_str()
 
@@ -142,6 +459,8 @@ class DataSource:
     Represents a data source in a semantic data lake. A data source is identified by its id and url.
     """
 
+    __slots__ = ('dsId', 'name', 'desc', 'dstype', 'url', 'params', 'policy')
+
     def __init__(self, dsId, dstype, url, name, desc='', acronym='', params=None):
         """
 
@@ -188,6 +507,17 @@ class DataSource:
             "desc": self.desc
         }
 
+    @staticmethod
+    def from_json(data):
+        """Creates a data source from its JSON representation, see to_json
+
+        :param data: json representation of the data source
+        :return: DataSource
+        """
+
+        return DataSource(data['dsId'], DataSourceType(data['dstype']), data['url'], data['name'],
+                          desc=data.get('desc', ''), params=data.get('params'))
+
     def __str__(self):
         return self.to_str()
 
@@ -208,8 +538,14 @@ class RDFMT:
     It is identified by its unique mtID (IRI), representing a class/concept in an ontology and it comprises a set of
     possible properties/predicates an instance of this class can have. Instances of an RDF-MT can be available in
     one or more data sources in a federation.
+
+    Instances use __slots__ and interned IRIs (see awudima.sdesc.utils.intern_iri), and keep their data sources in a
+    tuple, so that large catalogs stay compact.
     """
 
+    __slots__ = ('mtId', 'label', 'mttype', 'desc', '_preds_by_id', '_datasources', 'cardinality', 'subClassOf',
+                 'constraints', 'policy', 'complete', 'cardinality_bounds')
+
     def __init__(self, mtId, label, mttype, desc='', cardinality=-1):
         """
 
@@ -219,28 +555,76 @@ class RDFMT:
                     and can be extracted using via 'instance of' property (rdf:type/P31) of instances.
         """
 
-        self.mtId = mtId
+        self.mtId = intern_iri(mtId)
         self.label = label
         self.mttype = mttype
         self.desc = desc
-        self.predicates = set()
-        self.datasources = set()
+        # predId -> Predicate; self.predicates is a set view over it
+        self._preds_by_id = {}
+        # data sources are kept in a tuple, most RDF-MTs have a single one; self.datasources is a set view over it
+        self._datasources = ()
         self.cardinality = cardinality
         self.subClassOf = []
         self.constraints = []
         self.policy = None
+        # False if the extraction of this RDF-MT stopped before all of its details were collected, see time_budget
+        # in RDFMTExtractor
+        self.complete = True
+        # (low, high) bounds of an estimated cardinality, None if the cardinality is exact (or unknown)
+        self.cardinality_bounds = None
+
+    @property
+    def cardinality_estimated(self):
+        return self.cardinality_bounds is not None
 
     def addPredicate(self, pred):
-        self.predicates.add(pred)
+        """Adds {pred} to this RDF-MT, or merges it in place into the predicate with the same predId, if any
+
+        :param pred: Predicate
+        :return:
+        """
+        if pred.predId in self._preds_by_id:
+            self._preds_by_id[pred.predId].merge(pred)
+        else:
+            self._preds_by_id[pred.predId] = pred
+
+    def getPredicate(self, predId):
+        """Returns the predicate with the given {predId}, or None if this RDF-MT has no such predicate
+
+        :param predId: id of the predicate
+        :return: Predicate
+        """
+        return self._preds_by_id.get(predId)
+
+    @property
+    def predicates(self):
+        return _PredicateSet(self._preds_by_id)
+
+    @predicates.setter
+    def predicates(self, preds):
+        # {preds} may be a view over the current predicates, e.g., after rdfmt.predicates |= {...}
+        preds = list(preds)
+        self._preds_by_id = {}
+        for p in preds:
+            self.addPredicate(p)
 
     def preds_as_dict(self):
         return {p.predId: p.to_json() for p in self.predicates}
 
     def preds_as_dict_obj(self):
-        return {p.predId: p for p in self.predicates}
+        return dict(self._preds_by_id)
+
+    @property
+    def datasources(self):
+        return _TupleSet(self, '_datasources')
+
+    @datasources.setter
+    def datasources(self, datasources):
+        self._datasources = tuple(dict.fromkeys(datasources))
 
     def addDataSource(self, ds):
-        self.datasources.add(ds)
+        if ds not in self._datasources:
+            self._datasources = self._datasources + (ds,)
 
     def to_str(self):
         """Produces a textual representation of the molecule template
@@ -250,9 +634,10 @@ class RDFMT:
 
         return self.mtId
 
-    def to_json(self):
+    def to_json(self, datasource_ids=False):
         """Produces a JSON representation of the molecule template
 
+        :param datasource_ids: whether data sources are given by their dsId only. default: False
         :return: json representation of the molecule template
         """
 
@@ -262,43 +647,102 @@ class RDFMT:
             'label': self.label,
             'desc': self.desc,
             'cardinality': self.cardinality,
+            'cardinality_bounds': _bounds_json(self.cardinality_bounds),
             "subClassOf": self.subClassOf,
             "predicates": [p.to_json() for p in self.predicates],
-            "datasources": [d.to_json() for d in self.datasources],
-            "constraints": [c for c in self.constraints]
+            "datasources": [d.dsId if datasource_ids else d.to_json() for d in self.datasources],
+            "constraints": [c for c in self.constraints],
+            "complete": self.complete
         }
 
+    @staticmethod
+    def from_json(data, datasources=None):
+        """Creates a molecule template from its JSON representation, see to_json
+
+        :param data: json representation of the molecule template
+        :param datasources: dict of dsId -> DataSource, used for data sources given by their dsId. Data sources given
+                    as JSON objects are added to it
+        :return: RDFMT
+        """
+
+        if datasources is None:
+            datasources = {}
+        rdfmt = RDFMT(data['mtId'], data.get('label'), data.get('mttype'), desc=data.get('desc', ''),
+                      cardinality=data.get('cardinality', -1))
+        rdfmt.subClassOf = data.get('subClassOf', [])
+        rdfmt.constraints = data.get('constraints', [])
+        rdfmt.complete = data.get('complete', True)
+        rdfmt.cardinality_bounds = _bounds_from_json(data.get('cardinality_bounds'))
+        for p in data.get('predicates', []):
+            rdfmt.addPredicate(Predicate.from_json(p))
+        for d in data.get('datasources', []):
+            if isinstance(d, dict):
+                d = datasources.setdefault(d['dsId'], DataSource.from_json(d)).dsId
+            if d not in datasources:
+                raise Exception("Unknown data source " + d + " of RDFMT " + rdfmt.mtId)
+            rdfmt.addDataSource(datasources[d])
+
+        return rdfmt
+
     def merge_with(self, other):
+        """Returns a new RDF-MT merging this RDF-MT and {other}. Neither of them is changed.
+
+        :param other: RDFMT with the same mtId
+        :return: merged RDFMT
+        """
         if self.mtId != other.mtId:
             raise Exception("Cannot merge two different RDFMTs " + self.mtId + ' and ' + other.mtId)
         merged = RDFMT(self.mtId, self.label, self.mttype, self.desc, self.cardinality)
-        if self.label is None or len(self.label) == 0:
-            merged.label = other.label
-        if self.desc is None or len(self.desc) == 0:
-            merged.desc = other.desc
-        if self.cardinality == -1:
-            merged.cardinality = other.cardinality
+        merged.cardinality_bounds = self.cardinality_bounds
+        merged.subClassOf = list(self.subClassOf)
+        merged.datasources = set(self.datasources)
+        merged.complete = self.complete
 
-        merged.subClassOf.extend(other.subClassOf)
-        merged.subClassOf = list(set(merged.subClassOf))
-
-        otherpreds = other.preds_as_dict_obj()
-        mergedpreds = []
-        difs = self.predicates.difference(other.predicates)
+        otherpreds = other._preds_by_id
         for p in self.predicates:
             if p.predId in otherpreds:
-                mergedpreds.append(p.merge_with(otherpreds[p.predId]))
+                merged.addPredicate(p.merge_with(otherpreds[p.predId]))
             else:
-                mergedpreds.append(p)
+                merged.addPredicate(p.copy())
+        for p in other.predicates:
+            if p.predId not in merged._preds_by_id:
+                merged.addPredicate(p.copy())
+
+        # all predicates of {other} are already in {merged}, so they are merged into copies
+        merged.merge(other)
+
+        return merged
+
+    def merge(self, other):
+        """Merges {other} into this RDF-MT in place
 
-        for p in difs:
-            mergedpreds.append(p)
+        Missing label, description and cardinality (or an estimated cardinality, if {other} has an exact one) are
+        taken from {other}; superclasses, predicates and data sources
+        are united. Predicates with the same predId are merged in place, see Predicate.merge. The merged RDF-MT is
+        complete only if both are.
 
-        merged.predicates = list(set(mergedpreds))
-        merged.datasources = self.datasources | other.datasources
+        :param other: RDFMT with the same mtId
+        :return: this RDFMT
+        """
+        if self.mtId != other.mtId:
+            raise Exception("Cannot merge two different RDFMTs " + self.mtId + ' and ' + other.mtId)
+        if self.label is None or len(self.label) == 0:
+            self.label = other.label
+        if self.desc is None or len(self.desc) == 0:
+            self.desc = other.desc
+        if self.cardinality == -1 or (self.cardinality_estimated and not other.cardinality_estimated and
+                                      other.cardinality != -1):
+            self.cardinality = other.cardinality
+            self.cardinality_bounds = other.cardinality_bounds
+        self.complete = self.complete and other.complete
+
+        self.subClassOf = _union(self.subClassOf, other.subClassOf)
+        for p in other.predicates:
+            self.addPredicate(p)
+        self.datasources.update(other.datasources)
         # TODO: merge constaints and access policies (restriced first approach)
 
-        return merged
+        return self
 
     def __str__(self):
         return self.to_str()
@@ -318,8 +762,14 @@ class Predicate:
 
     A predicate/property of a molecule template represents a single data point associated to molecule (an instance of a
     molecule template.)
+
+    Predicates are the most numerous objects of a catalog. They use __slots__ and interned IRIs, keep their ranges as a
+    tuple, and create their constraints list only when it is first accessed.
     """
 
+    __slots__ = ('predId', 'label', 'desc', '_ranges', 'cardinality', '_constraints', 'policy', 'cardinality_bounds',
+                 'stats')
+
     def __init__(self, predId, label, desc='', cardinality=-1):
         """
 
@@ -329,13 +779,42 @@ class Predicate:
         :param cardinality:
         """
 
-        self.predId = predId
+        self.predId = intern_iri(predId)
         self.label = label
         self.desc = desc
-        self.ranges = set()
+        self._ranges = ()
         self.cardinality = cardinality
-        self.constraints = []
+        self._constraints = None
         self.policy = None
+        # (low, high) bounds of an estimated cardinality, None if the cardinality is exact (or unknown)
+        self.cardinality_bounds = None
+        # value statistics, e.g., null_ratio and distinct of columns of tabular sources, None if not collected
+        self.stats = None
+
+    @property
+    def cardinality_estimated(self):
+        return self.cardinality_bounds is not None
+
+    @property
+    def ranges(self):
+        return _TupleSet(self, '_ranges', intern_iri)
+
+    @ranges.setter
+    def ranges(self, ranges):
+        # {ranges} may be a view over the current ranges, e.g., after pred.ranges |= {...}
+        ranges = list(ranges)
+        self._ranges = ()
+        self.addRanges(ranges)
+
+    @property
+    def constraints(self):
+        if self._constraints is None:
+            self._constraints = []
+        return self._constraints
+
+    @constraints.setter
+    def constraints(self, constraints):
+        self._constraints = constraints
 
     def to_str(self):
         """Produces a textual representation of the predicate
@@ -356,28 +835,95 @@ class Predicate:
             'label': self.label,
             'desc': self.desc,
             'cardinality': self.cardinality,
-            "ranges": [r for r in self.ranges],
-            "constraints": [c for c in self.constraints]
+            'cardinality_bounds': _bounds_json(self.cardinality_bounds),
+            'stats': self.stats,
+            "ranges": [r for r in self._ranges],
+            "constraints": [c for c in self._constraints or []]
         }
 
+    @staticmethod
+    def from_json(data):
+        """Creates a predicate from its JSON representation, see to_json
+
+        :param data: json representation of the predicate
+        :return: Predicate
+        """
+
+        pred = Predicate(data['predId'], data.get('label'), desc=data.get('desc', ''),
+                         cardinality=data.get('cardinality', -1))
+        pred.cardinality_bounds = _bounds_from_json(data.get('cardinality_bounds'))
+        pred.stats = data.get('stats')
+        pred.addRanges(data.get('ranges', []))
+        if len(data.get('constraints', [])) > 0:
+            pred.constraints = data['constraints']
+
+        return pred
+
+    def copy(self):
+        """Returns a copy of this predicate, which can be merged into without changing this one
+
+        :return: Predicate
+        """
+        pred = Predicate(self.predId, self.label, self.desc, self.cardinality)
+        pred._ranges = self._ranges
+        pred.cardinality_bounds = self.cardinality_bounds
+        pred.stats = self.stats
+        pred.policy = self.policy
+        if self._constraints is not None:
+            pred._constraints = list(self._constraints)
+
+        return pred
+
     def merge_with(self, other):
         if self.predId != other.predId:
             raise Exception("Cannot merge two different Predicates " + self.predId + ' and ' + other.predId)
         merged = Predicate(self.predId, self.label, self.desc, self.cardinality)
+        merged.cardinality_bounds = self.cardinality_bounds
+        merged.stats = self.stats if self.stats is not None else other.stats
         if self.label is None or len(self.label) == 0:
             merged.label = other.label
         if self.desc is None or len(self.desc) == 0:
             merged.desc = other.desc
-        if self.cardinality == -1:
+        if self.cardinality == -1 or (self.cardinality_estimated and not other.cardinality_estimated and
+                                      other.cardinality != -1):
             merged.cardinality = other.cardinality
+            merged.cardinality_bounds = other.cardinality_bounds
 
         merged.ranges = set(list(self.ranges) + list(other.ranges))
         # TODO: merge constraints and polity (restriced first approach)
 
         return merged
 
+    def merge(self, other):
+        """Merges {other} into this predicate in place
+
+        :param other: Predicate with the same predId
+        :return: this Predicate
+        """
+        if self.predId != other.predId:
+            raise Exception("Cannot merge two different Predicates " + self.predId + ' and ' + other.predId)
+        if self is other:
+            return self
+        if self.label is None or len(self.label) == 0:
+            self.label = other.label
+        if self.desc is None or len(self.desc) == 0:
+            self.desc = other.desc
+        if self.cardinality == -1 or (self.cardinality_estimated and not other.cardinality_estimated and
+                                      other.cardinality != -1):
+            self.cardinality = other.cardinality
+            self.cardinality_bounds = other.cardinality_bounds
+        if self.stats is None:
+            self.stats = other.stats
+
+        self.addRanges(other._ranges)
+        # TODO: merge constraints and polity (restriced first approach)
+
+        return self
+
     def addRanges(self, ranges):
-        self.ranges.update(ranges)
+        new = [intern_iri(r) for r in ranges if r not in self._ranges]
+        if len(new) > 0:
+            self._ranges = self._ranges + tuple(dict.fromkeys(new))
 
     def __str__(self):
         return self.to_str()
@@ -392,6 +938,204 @@ class Predicate:
         return hash(self.predId)
 
 
+class _SetMethods:
+    """Named methods of set for the MutableSet views of this module, so that they can be used as sets"""
+
+    __slots__ = ()
+
+    def copy(self):
+        return set(self)
+
+    def union(self, *others):
+        return set(self).union(*others)
+
+    def intersection(self, *others):
+        return set(self).intersection(*others)
+
+    def difference(self, *others):
+        return set(self).difference(*others)
+
+    def symmetric_difference(self, other):
+        return set(self).symmetric_difference(other)
+
+    def issubset(self, other):
+        return set(self).issubset(other)
+
+    def issuperset(self, other):
+        return set(self).issuperset(other)
+
+    def update(self, *others):
+        for other in others:
+            for x in other:
+                self.add(x)
+
+    def intersection_update(self, *others):
+        keep = set(self).intersection(*others)
+        for x in list(self):
+            if x not in keep:
+                self.discard(x)
+
+    def difference_update(self, *others):
+        for other in others:
+            for x in list(other):
+                self.discard(x)
+
+    def symmetric_difference_update(self, other):
+        for x in set(other):
+            if x in self:
+                self.discard(x)
+            else:
+                self.add(x)
+
+
+class _TupleSet(_SetMethods, MutableSet):
+    """Set view over a tuple attribute of an object, such as the ranges of a predicate
+
+    A tuple takes much less memory than a set for the few members such attributes usually have. Changes through the
+    view replace the tuple of the object.
+    """
+
+    __slots__ = ('_owner', '_attr', '_convert')
+
+    def __init__(self, owner, attr, convert=None):
+        """
+
+        :param owner: object holding the tuple
+        :param attr: name of the tuple attribute of {owner}
+        :param convert: function applied to members before they are added, e.g., intern_iri. default: None
+        """
+
+        self._owner = owner
+        self._attr = attr
+        self._convert = convert
+
+    def __contains__(self, x):
+        return x in getattr(self._owner, self._attr)
+
+    def __iter__(self):
+        return iter(getattr(self._owner, self._attr))
+
+    def __len__(self):
+        return len(getattr(self._owner, self._attr))
+
+    def add(self, x):
+        if self._convert is not None:
+            x = self._convert(x)
+        members = getattr(self._owner, self._attr)
+        if x not in members:
+            setattr(self._owner, self._attr, members + (x,))
+
+    def discard(self, x):
+        members = getattr(self._owner, self._attr)
+        if x in members:
+            setattr(self._owner, self._attr, tuple([m for m in members if m != x]))
+
+    def __repr__(self):
+        return repr(set(getattr(self._owner, self._attr)))
+
+
+class _RDFMTSet(_SetMethods, MutableSet):
+    """Set view over the RDF-MTs of a federation, which are stored in its mtId -> RDFMT index"""
+
+    __slots__ = ('_federation',)
+
+    def __init__(self, federation):
+        self._federation = federation
+
+    def __contains__(self, rdfmt):
+        return getattr(rdfmt, 'mtId', None) in self._federation._rdfmts_by_id
+
+    def __iter__(self):
+        return iter(self._federation._rdfmts_by_id.values())
+
+    def __len__(self):
+        return len(self._federation._rdfmts_by_id)
+
+    def add(self, rdfmt):
+        if rdfmt.mtId not in self._federation._rdfmts_by_id:
+            self._federation._rdfmts_by_id[rdfmt.mtId] = rdfmt
+            self._federation._index_rdfmt(rdfmt)
+
+    def discard(self, rdfmt):
+        mt = self._federation._rdfmts_by_id.pop(getattr(rdfmt, 'mtId', None), None)
+        if mt is not None:
+            self._federation._unindex_rdfmt(mt)
+
+    def __repr__(self):
+        return repr(set(self._federation._rdfmts_by_id.values()))
+
+
+class _PredicateSet(_SetMethods, MutableSet):
+    """Set view over the predicates of an RDF-MT, which are stored in a predId -> Predicate dict"""
+
+    __slots__ = ('_preds',)
+
+    def __init__(self, preds):
+        self._preds = preds
+
+    def __contains__(self, pred):
+        return getattr(pred, 'predId', None) in self._preds
+
+    def __iter__(self):
+        return iter(self._preds.values())
+
+    def __len__(self):
+        return len(self._preds)
+
+    def add(self, pred):
+        if pred.predId not in self._preds:
+            self._preds[pred.predId] = pred
+
+    def discard(self, pred):
+        self._preds.pop(getattr(pred, 'predId', None), None)
+
+    def __repr__(self):
+        return repr(set(self._preds.values()))
+
+
+def fingerprint(cardinality, pred_ids):
+    """Fingerprint of an RDF-MT, a hash of its cardinality and of its set of predicates
+
+    :param cardinality: number of instances of the RDF-MT
+    :param pred_ids: ids of the predicates of the RDF-MT
+    :return: hex digest
+    """
+
+    signal = str(cardinality) + '\n' + '\n'.join(sorted(set(pred_ids)))
+    return hashlib.sha1(signal.encode('utf-8')).hexdigest()
+
+
+def _ndjson_line(record):
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def _strip_iri(term):
+    if term.startswith('<') and term.endswith('>'):
+        return term[1:-1]
+    return term
+
+
+def _bounds_json(bounds):
+    return list(bounds) if bounds is not None else None
+
+
+def _bounds_from_json(bounds):
+    return tuple(bounds) if bounds is not None else None
+
+
+def _union(first, second):
+    """Order preserving union of two lists, whose elements can be unhashable dicts such as {'sc': iri}"""
+    seen = set()
+    result = []
+    for x in first + second:
+        key = tuple(sorted(x.items())) if isinstance(x, dict) else x
+        if key not in seen:
+            seen.add(key)
+            result.append(x)
+
+    return result
+
+
 class DataSourceType(Enum):
     SPARQL_ENDPOINT = "SPARQL_Endpoint"
     MONGODB = "MongoDB"
@@ -417,6 +1161,8 @@ class DataSourceType(Enum):
     LOCAL_XML = "LOCAL_XML"
     LOCAL_RDF = "LOCAL_RDF"
 
+    SQLITE = "SQLite"
+
     LOCAL_FOLDER = "LOCAL_FOLDER"
     SPARK_FOLDER = "SPARK_FOLDER"
     HADOOP_FOLDER = "HADOOP_FOLDER"
@@ -434,6 +1180,18 @@ class DataSourceType(Enum):
         return self.value
 
 
+# data source types read from local N-Triples/N-Quads dumps, see awudima.sdesc.rdfdump
+DUMP_SOURCE_TYPES = (DataSourceType.LOCAL_RDF, DataSourceType.RDF, DataSourceType.LOCAL_FOLDER)
+
+# data source types read from local CSV/TSV/JSON files and their formats, see awudima.sdesc.tabular
+TABULAR_SOURCE_TYPES = {DataSourceType.LOCAL_CSV: 'csv', DataSourceType.CSV: 'csv',
+                        DataSourceType.LOCAL_TSV: 'tsv', DataSourceType.TSV: 'tsv',
+                        DataSourceType.LOCAL_JSON: 'json', DataSourceType.JSON: 'json'}
+
+# relational data source types and their dialects, see awudima.sdesc.relational
+RELATIONAL_SOURCE_TYPES = {DataSourceType.SQLITE: 'sqlite', DataSourceType.POSTGRES: 'postgres',
+                           DataSourceType.MYSQL: 'mysql'}
+
 metas = ['http://www.w3.org/ns/sparql-service-description',
          'http://www.openlinksw.com/schemas/virtrdf#',
          'http://www.w3.org/2000/01/rdf-schema#',
@@ -447,68 +1205,593 @@ metas = ['http://www.w3.org/ns/sparql-service-description',
 class RDFMTExtractor:
     """ Extracts RDF-MTs from a sparql endpoint, or other sources
 
-    ATM this class only implements the sparql endpoint sources
+    ATM this class implements sparql endpoint sources, local N-Triples/N-Quads dumps (LOCAL_RDF, RDF and
+    LOCAL_FOLDER sources, see awudima.sdesc.rdfdump), local CSV, TSV and JSON files (see awudima.sdesc.tabular) and
+    SQLite, Postgres and MySQL databases (see awudima.sdesc.relational)
+
+    Supported keys of {params}:
+        - session_pool: EndpointSessionPool used to contact endpoints. default: the shared pool of
+                        awudima.sdesc.utils, so connections are reused by all extractors querying the same endpoint
+        - scheduler: EndpointScheduler (see awudima.sdesc.scheduler) limiting the rate and concurrency of queries per
+                     endpoint and retrying transient failures. default: the shared scheduler of awudima.sdesc.scheduler
+        - cache: SPARQLResultCache (see awudima.sdesc.cache) used to reuse results of queries already sent to an
+                 endpoint. default: None (no cache)
+        - max_workers: max number of concurrent predicate/range lookups sent to an endpoint. default: 1 (serial)
+        - stats_mode: how cardinalities are collected if collect_stats is set. 'exact' sends one COUNT query per
+                      class, 'batched' uses grouped queries over batches of classes and one grouped query for the
+                      predicates of each class. 'approximate' avoids aggregates over whole classes: class
+                      cardinalities are bounded by probing OFFSETs, and predicate cardinalities are estimated from a
+                      sample of instances (see get_cardinalities_approximate). Estimated cardinalities have their
+                      bounds in cardinality_bounds. default: 'exact'
+        - stats_batch_size: max number of classes per grouped cardinality query. default: 50
+        - stats_sample_size: number of instances sampled per class if stats_mode is 'approximate'. default: 200
+        - stats_error: relative width of the bounds at which the search of a class cardinality stops, if stats_mode is
+                       'approximate'. default: 0.1
+        - stats_max_probes: max number of probe queries per class cardinality, if stats_mode is 'approximate'.
+                            default: 30
+        - predicate_mode: how predicates of classes are discovered. 'per_class' sends one query per class, 'bulk'
+                          crawls all (class, predicate) pairs with grouped queries over batches of classes before
+                          RDF-MTs are built. default: 'per_class'
+        - predicate_batch_size: max number of classes per grouped predicate query. default: 20
+        - range_mode: how predicate ranges are discovered. 'per_predicate' sends three queries per predicate,
+                      'batched' obtains the ranges of all predicates of a class with grouped queries. default:
+                      'per_predicate'
+        - hierarchy_mode: how superclasses of classes are collected. 'path' sends one rdfs:subClassOf* query per
+                          class, 'local' fetches all rdfs:subClassOf edges once and computes the transitive closure in
+                          memory (see get_class_hierarchy). default: 'path'
+        - callback: function called with each complete RDFMT, if sink_type is 'callback'
+        - sink_mode: 'a' to append to an existing JSON-lines sink, 'w' to overwrite it. default: 'a'
+        - sink_table: name of the table of a SQLite sink. default: rdfmts
+        - time_budget: max number of seconds a get_molecules (or iter_molecules) call may take, None for no limit.
+                       With a budget, classes are counted first and handled in order of decreasing cardinality, and
+                       cheap phases run for all classes before more expensive ones: labels and superclasses of
+                       classes, predicates, predicate ranges, then labels and cardinalities of predicates. When the
+                       budget runs out, RDF-MTs of all listed classes are returned with what is known so far; those
+                       missing any phase have complete set to False, and no further query is sent, not even by
+                       lookups still running. default: None
+        - deadline: time.time() by which get_molecules has to return, instead of time_budget. default: None
+        - processes: number of processes reading a local dump; files, and parts of large uncompressed files, are
+                     read in parallel. Also the number of processes reading the files of a CSV/TSV/JSON folder.
+                     default: 1
+        - dump_chunk_size: size in bytes of the parts large uncompressed dump files are split into, if processes > 1.
+                           default: 64 MB
+        - dump_reservoir_size: max number of objects per (class, predicate) kept until their classes are known, when
+                               reading a dump. default: 20
+        - dump_cache_size: max number of subjects whose classes are cached when reading a dump. default: 100000
+        - table_chunk_rows: number of rows of CSV/TSV/JSON files read and type-checked at a time; memory use is
+                            bounded by the chunk, whatever the size of the file. default: 10000
+        - queue_size: max number of items waiting between two stages of iter_molecules. default: 100
+        - page_size_mode: 'fixed' pages results with the page size of each query, halving it if the endpoint fails.
+                          'adaptive' also grows the page size while the endpoint responds fast, and starts from the
+                          last page size that worked for the endpoint. default: 'fixed'
+        - page_sizes: AdaptivePageSize (see awudima.sdesc.paging) keeping the page sizes of endpoints, if
+                      page_size_mode is 'adaptive'. default: the shared one of awudima.sdesc.paging
+        - page_workers: max number of pages of a paginated query requested at the same time. Pages beyond the
+                        current one are requested speculatively with OFFSET windows and put back in order, so that
+                        long class and instance listings are fetched faster. Not used with keyset paging. default: 1
+        - paging_mode: 'offset' pages results with LIMIT/OFFSET, 'keyset' pages class and predicate listings by
+                       ordering them and filtering on the last IRI of the previous page. Blank node classes are not
+                       listed with 'keyset'. default: 'offset'
     """
 
     def __init__(self, sink_type='memory', path_to_sink='', params=None):
         """
 
-        :param sink_type: sink to save/dump the molecule templates. default: memory
+        :param sink_type: sink to save/dump the molecule templates: 'memory', 'jsonl' (JSON-lines file), 'sqlite' or
+                    'callback', see awudima.sdesc.sinks. Each RDF-MT is written to the sink as soon as it is complete.
+                    With sinks other than 'memory', get_molecules does not keep the RDF-MTs and returns an empty list.
+                    default: memory
         :param path_to_sink: path to the sink. Either path to a json file or uri to sparql endpoint/mongodb collection.
-        :param params: other parameters
+        :param params: other parameters, see class description for supported keys
         """
 
         self.sink_type = sink_type
         self.path_to_sink = path_to_sink
-        self.params = params
+        self.params = params if params is not None else {}
+        self.sink = create_sink(sink_type, path_to_sink, self.params)
+        self.session_pool = self.params.get('session_pool')
+        self.cache = self.params.get('cache')
+        self.scheduler = self.params.get('scheduler')
+        self.page_sizes = self.params.get('page_sizes', get_page_sizes())
+        # endpoint -> ClassHierarchy, fetched once per endpoint if hierarchy_mode is 'local'
+        self.hierarchies = {}
+        self._hierarchy_lock = threading.Lock()
+        # (endpoint, rdfmt_id) -> (cardinality, bounds, sampled instances), if stats_mode is 'approximate'
+        self._class_estimates = {}
+        # deadline of the budgeted extraction each thread works for, see _get_molecules_budgeted
+        self._deadlines = threading.local()
 
     def get_molecules(self, datasource, typing_pred='a', collect_labels=False, collect_stats=False,
-                      labeling_prop="http://www.w3.org/2000/01/rdf-schema#label", limit=-1, out_queue=None):
+                      labeling_prop="http://www.w3.org/2000/01/rdf-schema#label", limit=-1, out_queue=None,
+                      include=None):
         endpoint = datasource.url
 
+        local = self._iter_local_molecules(datasource, typing_pred=typing_pred, collect_labels=collect_labels,
+                                           collect_stats=collect_stats, labeling_prop=labeling_prop, include=include)
+        if local is not None:
+            rdfmts = []
+            for rdfmt in local:
+                self._emit(rdfmt, rdfmts, out_queue)
+            return rdfmts
         if datasource.dstype != DataSourceType.SPARQL_ENDPOINT:
             return []
-        rdfmts = []
+
+        deadline = self.params.get('deadline')
+        if deadline is None and self.params.get('time_budget') is not None:
+            deadline = time.time() + self.params['time_budget']
+        if deadline is not None:
+            return self._get_molecules_budgeted(datasource, deadline, typing_pred=typing_pred,
+                                                collect_labels=collect_labels, collect_stats=collect_stats,
+                                                labeling_prop=labeling_prop, limit=limit, out_queue=out_queue,
+                                                include=include)
+
         concepts = self.get_concepts(endpoint, collect_labels=collect_labels, collect_stats=collect_stats,
                                      labeling_prop=labeling_prop, typing_pred=typing_pred,
-                                     limit=limit, out_queue=out_queue)
+                                     limit=limit, include=include)
+
+        # predicates of all concepts discovered upfront in a single crawl, if requested
+        class_preds = None
+        if self.params.get('predicate_mode') == 'bulk':
+            class_preds = self.get_bulk_predicates(endpoint, concepts, collect_labels=collect_labels,
+                                                   collect_stats=collect_stats, labeling_prop=labeling_prop,
+                                                   limit=limit)
+
+        max_workers = self.params.get('max_workers', 1)
+        if max_workers > 1:
+            return self._get_molecules_concurrent(datasource, concepts, max_workers, class_preds=class_preds,
+                                                  collect_labels=collect_labels, collect_stats=collect_stats,
+                                                  labeling_prop=labeling_prop, limit=limit, out_queue=out_queue)
+        rdfmts = []
         for c in concepts:
-            t = c['t']
-            label = t
+            if class_preds is not None:
+                preds = class_preds[c['t']]
+            else:
+                preds = self.get_predicates(endpoint, c['t'], collect_labels=collect_labels,
+                                            collect_stats=collect_stats, labeling_prop=labeling_prop, limit=limit)
+            if self.params.get('range_mode') == 'batched':
+                ranges = self.get_class_predicate_ranges(endpoint, c['t'], [p['p'] for p in preds])
+            else:
+                ranges = {p['p']: self.get_predicate_ranges(endpoint, c['t'], p['p']) for p in preds}
+            self._emit(self._create_rdfmt(datasource, c, preds, ranges, collect_labels), rdfmts, out_queue)
+
+        return rdfmts
+
+    def _get_molecules_concurrent(self, datasource, concepts, max_workers, class_preds=None, collect_labels=False,
+                                  collect_stats=False, labeling_prop="http://www.w3.org/2000/01/rdf-schema#label",
+                                  limit=-1, out_queue=None):
+        """Extracts predicates and predicate ranges of the given {concepts} with up to {max_workers} concurrent lookups
+
+        Predicates of each concept are looked up in a task of their own, unless they are already given in
+        {class_preds}. As soon as the predicates of a concept are known, the range lookup of each of its predicates is
+        scheduled as a separate task. An RDF-MT is created once all of its range lookups are done.
+
+        :param datasource: the data source the concepts are extracted from
+        :param concepts: list of concepts as returned by get_concepts
+        :param max_workers: max number of queries sent to the endpoint at the same time
+        :param class_preds: dict of rdfmt_id -> list of predicates, if predicates are already discovered
+        :return: list of RDFMTs
+        """
+
+        endpoint = datasource.url
+        batched_ranges = self.params.get('range_mode') == 'batched'
+        rdfmts = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # future -> (concept state, task, pred_id), where task is one of 'predicates' (predicates of a concept),
+            # 'ranges' (ranges of all predicates of a concept) or 'range' (ranges of the predicate pred_id)
+            pending = {}
+
+            def schedule_ranges(state, preds):
+                state['preds'] = preds
+                state['ranges'] = {}
+                t = state['concept']['t']
+                if len(preds) == 0:
+                    self._emit(self._create_rdfmt(datasource, state['concept'], preds, {}, collect_labels), rdfmts,
+                               out_queue)
+                elif batched_ranges:
+                    rfuture = executor.submit(self.get_class_predicate_ranges, endpoint, t, [p['p'] for p in preds])
+                    pending[rfuture] = (state, 'ranges', None)
+                else:
+                    for p in preds:
+                        rfuture = executor.submit(self.get_predicate_ranges, endpoint, t, p['p'])
+                        pending[rfuture] = (state, 'range', p['p'])
+
+            for c in concepts:
+                if class_preds is not None:
+                    schedule_ranges({'concept': c}, class_preds[c['t']])
+                    continue
+                future = executor.submit(self.get_predicates, endpoint, c['t'], collect_labels=collect_labels,
+                                         collect_stats=collect_stats, labeling_prop=labeling_prop, limit=limit)
+                pending[future] = ({'concept': c}, 'predicates', None)
+
+            while len(pending) > 0:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    state, task, pred_id = pending.pop(future)
+                    if task == 'predicates':
+                        schedule_ranges(state, future.result())
+                        continue
+
+                    if task == 'ranges':
+                        state['ranges'] = future.result()
+                    else:
+                        state['ranges'][pred_id] = future.result()
+                    if task == 'ranges' or len(state['ranges']) == len(state['preds']):
+                        self._emit(self._create_rdfmt(datasource, state['concept'], state['preds'], state['ranges'],
+                                                      collect_labels), rdfmts, out_queue)
+
+        return rdfmts
+
+    def _get_molecules_budgeted(self, datasource, deadline, typing_pred='a', collect_labels=False,
+                                collect_stats=False, labeling_prop="http://www.w3.org/2000/01/rdf-schema#label",
+                                limit=-1, out_queue=None, include=None):
+        """Extracts RDF-MTs of {datasource} by priority, in phases of increasing cost, until {deadline}
+
+        Classes are listed and counted with grouped queries first, and handled in order of decreasing cardinality.
+        Each phase runs for all classes (with up to max_workers concurrent lookups) before the next one starts, and
+        lookups still pending at {deadline} are dropped. RDF-MTs of all listed classes are returned, in order of
+        priority; those for which a phase is missing have complete set to False.
+
+        :param datasource: the data source to extract RDF-MTs from
+        :param deadline: time.time() by which the extraction has to stop
+        :return: list of RDFMTs
+        """
+
+        endpoint = datasource.url
+        # no query is sent after {deadline} by this thread or by the lookups, even those still running once this
+        # method returns (see _query)
+        previous = getattr(self._deadlines, 'deadline', None)
+        self._deadlines.deadline = deadline
+        preds = {}
+        ranges = {}
+        described = {}
+        pred_described = set()
+        batched_ranges = self.params.get('range_mode') == 'batched'
+        executor = ThreadPoolExecutor(max_workers=max(1, self.params.get('max_workers', 1)),
+                                      initializer=setattr, initargs=(self._deadlines, 'deadline', deadline))
+        try:
+            concepts, _ = self._list_concepts(endpoint, typing_pred=typing_pred, limit=limit)
+            if include is not None:
+                concepts = [c for c in concepts if c['t'] in include]
+            if time.time() < deadline:
+                counted = self.get_cardinalities_batched(endpoint, [{'t': c['t']} for c in concepts], 't',
+                                                         typing_pred=typing_pred)
+                cards = {c['t']: c['card'] for c in counted}
+                concepts.sort(key=lambda c: cards.get(c['t'], -1), reverse=True)
+                if collect_stats:
+                    for c in concepts:
+                        c['card'] = cards.get(c['t'], -1)
+
+            # lookups still running at the deadline work on copies, so they cannot change the returned RDF-MTs
+            described = _run_phase(executor, deadline, concepts, lambda c: self._describe_concepts(
+                endpoint, [dict(c)], collect_labels=collect_labels, labeling_prop=labeling_prop, typing_pred=typing_pred)[0])
+            for i, c in described.items():
+                concepts[i] = c
+
+            preds = _run_phase(executor, deadline, concepts, lambda c: self.get_predicates(endpoint, c['t'],
+                                                                                          limit=limit))
+
+            def predicate_ranges(i):
+                t, pred_ids = concepts[i]['t'], [p['p'] for p in preds[i]]
+                if batched_ranges:
+                    return self.get_class_predicate_ranges(endpoint, t, pred_ids)
+                return {p: self.get_predicate_ranges(endpoint, t, p) for p in pred_ids}
+
+            found = sorted(preds)
+            ranges = {found[j]: r for j, r in _run_phase(executor, deadline, found, predicate_ranges).items()}
+
+            pred_described = set(found)
+            if collect_labels or collect_stats:
+                res = _run_phase(executor, deadline, found, lambda i: self._describe_predicates(
+                    endpoint, concepts[i]['t'], [dict(p) for p in preds[i]], collect_labels=collect_labels, collect_stats=collect_stats,
+                    labeling_prop=labeling_prop))
+                pred_described = set()
+                for j, p in res.items():
+                    preds[found[j]] = p
+                    pred_described.add(found[j])
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._deadlines.deadline = previous
+
+        rdfmts = []
+        for i, c in enumerate(concepts):
+            rdfmt = self._create_rdfmt(datasource, c, preds.get(i, []), ranges.get(i, {}), collect_labels)
+            rdfmt.complete = i in described and i in ranges and i in pred_described
+            self._emit(rdfmt, rdfmts, out_queue)
+
+        return rdfmts
+
+    def iter_molecules(self, datasource, typing_pred='a', collect_labels=False, collect_stats=False,
+                       labeling_prop="http://www.w3.org/2000/01/rdf-schema#label", limit=-1, out_queue=None,
+                       include=None):
+        """Streaming version of get_molecules: yields each RDF-MT as soon as it is complete
+
+        Extraction runs as a pipeline of stages connected by bounded queues (see params queue_size): concept
+        discovery -> predicate discovery -> range discovery -> labels/stats/superclasses. Concept discovery pages
+        through the classes of the endpoint in a thread of its own, each other stage runs max_workers threads, so
+        the first RDF-MTs are available long before all classes of the endpoint are listed. RDF-MTs are yielded in
+        the order they are completed and are also written to the sink (and {out_queue}, if given).
+
+        predicate_mode 'bulk' and a time budget (params time_budget or deadline) need all classes upfront, to crawl
+        their predicates at once or to order them by cardinality. With either of them, RDF-MTs are extracted as by
+        get_molecules and yielded only once all of them are done.
+
+        If the generator is closed before it is exhausted, the pipeline stops after the queries in progress.
+
+        :param datasource: the data source to extract RDF-MTs from
+        :param out_queue: if given, each complete RDFMT is also put into this queue
+        :param include: if given, only classes in {include} are extracted
+        :return: generator of RDFMTs
+        """
+
+        local = self._iter_local_molecules(datasource, typing_pred=typing_pred, collect_labels=collect_labels,
+                                           collect_stats=collect_stats, labeling_prop=labeling_prop, include=include)
+        if local is not None:
+            for rdfmt in local:
+                self.sink.write(rdfmt)
+                if out_queue is not None:
+                    out_queue.put(rdfmt)
+                yield rdfmt
+            return
+        if datasource.dstype != DataSourceType.SPARQL_ENDPOINT:
+            return
+        if self.params.get('predicate_mode') == 'bulk' or self.params.get('deadline') is not None or \
+                self.params.get('time_budget') is not None:
+            # RDF-MTs are collected from a queue, since get_molecules keeps them only if the sink is in memory
+            done = queue.Queue()
+            self.get_molecules(datasource, typing_pred=typing_pred, collect_labels=collect_labels,
+                               collect_stats=collect_stats, labeling_prop=labeling_prop, limit=limit, out_queue=done,
+                               include=include)
+            while not done.empty():
+                rdfmt = done.get()
+                if out_queue is not None:
+                    out_queue.put(rdfmt)
+                yield rdfmt
+            return
+
+        endpoint = datasource.url
+        max_workers = max(1, self.params.get('max_workers', 1))
+        queue_size = self.params.get('queue_size', 100)
+        batched_ranges = self.params.get('range_mode') == 'batched'
+        stop = threading.Event()
+        errors = []
+        seen = set()
+        seen_lock = threading.Lock()
+
+        concepts_q = _PipelineQueue(queue_size, stop)
+        preds_q = _PipelineQueue(queue_size, stop)
+        ranges_q = _PipelineQueue(queue_size, stop)
+        rdfmts_q = _PipelineQueue(queue_size, stop)
+
+        def discover_concepts():
+            self._list_concepts(endpoint, typing_pred=typing_pred, limit=limit, out_queue=concepts_q)
+
+        def discover_predicates(c):
+            with seen_lock:
+                # pages of DISTINCT results may overlap if the endpoint does not return them in a stable order
+                if c['t'] in seen or (include is not None and c['t'] not in include):
+                    return None
+                seen.add(c['t'])
+            return c, self.get_predicates(endpoint, c['t'], limit=limit)
+
+        def discover_ranges(item):
+            c, preds = item
+            if batched_ranges:
+                ranges = self.get_class_predicate_ranges(endpoint, c['t'], [p['p'] for p in preds])
+            else:
+                ranges = {p['p']: self.get_predicate_ranges(endpoint, c['t'], p['p']) for p in preds}
+            return c, preds, ranges
+
+        def describe(item):
+            c, preds, ranges = item
+            c = self._describe_concepts(endpoint, [c], collect_labels=collect_labels, collect_stats=collect_stats,
+                                        labeling_prop=labeling_prop, typing_pred=typing_pred)[0]
+            preds = self._describe_predicates(endpoint, c['t'], preds, collect_labels=collect_labels,
+                                              collect_stats=collect_stats, labeling_prop=labeling_prop)
+            return self._create_rdfmt(datasource, c, preds, ranges, collect_labels)
+
+        threads = [threading.Thread(target=_run_source, args=(discover_concepts, concepts_q, max_workers, stop,
+                                                              errors), daemon=True)]
+        for fn, in_q, out_q in [(discover_predicates, concepts_q, preds_q),
+                                (discover_ranges, preds_q, ranges_q),
+                                (describe, ranges_q, rdfmts_q)]:
+            stage = {'done': 0, 'lock': threading.Lock()}
+            for _ in range(max_workers):
+                threads.append(threading.Thread(target=_run_stage, args=(fn, in_q, out_q, max_workers, stage, stop,
+                                                                        errors), daemon=True))
+        for t in threads:
+            t.start()
+
+        try:
+            finished = 0
+            while finished < max_workers:
+                rdfmt = rdfmts_q.get()
+                if rdfmt is _END:
+                    finished += 1
+                    continue
+                self.sink.write(rdfmt)
+                if out_queue is not None:
+                    out_queue.put(rdfmt)
+                yield rdfmt
+        except _PipelineStopped:
+            pass
+        finally:
+            stop.set()
+            for t in threads:
+                t.join()
+
+        if len(errors) > 0:
+            raise errors[0]
+
+    def _iter_local_molecules(self, datasource, typing_pred='a', collect_labels=False, collect_stats=False,
+                              labeling_prop="http://www.w3.org/2000/01/rdf-schema#label", include=None):
+        # RDF-MTs of a dump, tabular or relational data source, None for other types of data sources
+        if datasource.dstype in DUMP_SOURCE_TYPES:
+            return self._iter_dump_molecules(datasource, typing_pred=typing_pred, collect_labels=collect_labels,
+                                             collect_stats=collect_stats, labeling_prop=labeling_prop,
+                                             include=include)
+        if datasource.dstype in TABULAR_SOURCE_TYPES:
+            return self._iter_table_molecules(datasource, collect_labels=collect_labels, collect_stats=collect_stats,
+                                              include=include)
+        if datasource.dstype in RELATIONAL_SOURCE_TYPES:
+            return self._iter_relational_molecules(datasource, collect_labels=collect_labels,
+                                                   collect_stats=collect_stats, include=include)
+        return None
+
+    def _iter_dump_molecules(self, datasource, typing_pred='a', collect_labels=False, collect_stats=False,
+                             labeling_prop="http://www.w3.org/2000/01/rdf-schema#label", include=None):
+        """Extracts RDF-MTs of a local N-Triples/N-Quads dump (a file or a folder of files) in a single pass
+
+        See awudima.sdesc.rdfdump. Class cardinalities are estimated, predicate cardinalities are exact.
+
+        :param datasource: data source whose url is the path of the dump
+        :return: generator of RDFMTs
+        """
+
+        from awudima.sdesc.rdfdump import summarize_dump
+
+        if typing_pred == 'a':
+            typing_pred = RDF_TYPE
+        elif typing_pred.startswith('<'):
+            typing_pred = typing_pred[1:-1]
+        summary = summarize_dump(datasource.url, processes=self.params.get('processes', 1),
+                                 chunk_size=self.params.get('dump_chunk_size', 64 * 1024 * 1024),
+                                 typing_pred=typing_pred, labeling_prop=labeling_prop,
+                                 reservoir_size=self.params.get('dump_reservoir_size', 20),
+                                 cache_size=self.params.get('dump_cache_size', 100000))
+        for concept, preds, ranges in summary.molecules(collect_labels=collect_labels, collect_stats=collect_stats,
+                                                        include=include):
+            yield self._create_rdfmt(datasource, concept, preds, ranges, collect_labels)
+
+    def _iter_table_molecules(self, datasource, collect_labels=False, collect_stats=False, include=None):
+        """Extracts RDF-MTs of local CSV, TSV or JSON files, one per file
+
+        See awudima.sdesc.tabular. The url of the data source is a file, or a folder whose files of the format of the
+        data source are read in parallel. If the params of the data source have 'collection' set, all files of the
+        folder hold records of the same kind and make up a single RDF-MT identified by the folder. The key
+        'delimiter' of the params of the data source overrides the delimiter of CSV files.
+
+        :param datasource: data source whose url is the path of the file or folder
+        :return: generator of RDFMTs
+        """
+
+        from awudima.sdesc.tabular import table_files, file_iri, summarize_tables
+
+        fmt = TABULAR_SOURCE_TYPES[datasource.dstype]
+        dsparams = datasource.params if datasource.params is not None else {}
+        collection = dsparams.get('collection', False)
+        files = table_files(datasource.url, fmt)
+        if collection:
+            if include is not None and file_iri(datasource.url) not in include:
+                return
+        elif include is not None:
+            files = [f for f in files if file_iri(f) in include]
+
+        summaries = summarize_tables(files, fmt, processes=self.params.get('processes', 1),
+                                     chunk_rows=self.params.get('table_chunk_rows', 10000),
+                                     delimiter=dsparams.get('delimiter'))
+        if collection:
+            merged = None
+            for _, summary in summaries:
+                merged = summary if merged is None else merged.merge(summary)
+            if merged is not None:
+                summaries = [(datasource.url, merged)]
+
+        for path, summary in summaries:
+            concept, preds, ranges = summary.molecule(file_iri(path), collect_stats=collect_stats)
+            yield self._create_rdfmt(datasource, concept, preds, ranges, collect_labels)
+
+    def _iter_relational_molecules(self, datasource, collect_labels=False, collect_stats=False, include=None):
+        """Extracts RDF-MTs of a relational database, one per table
+
+        See awudima.sdesc.relational. Tables, columns, foreign keys and row estimates are read from the catalog of the
+        database with a few bulk queries, whatever the number of tables. Supported keys of the params of the data
+        source: connection (an open DB-API connection, used instead of connecting to the url of the data source),
+        user, password, schema (default: all non-system schemas for Postgres, the database of the url for MySQL) and
+        base_iri (IRI prefix of the RDF-MTs, default: the url of the data source without credentials).
+
+        :param datasource: data source whose url is the path (SQLite) or url (Postgres, MySQL) of the database
+        :return: generator of RDFMTs
+        """
+
+        from awudima.sdesc.relational import connect, read_catalog, molecules, default_base_iri
+
+        dialect = RELATIONAL_SOURCE_TYPES[datasource.dstype]
+        dsparams = datasource.params if datasource.params is not None else {}
+        conn = dsparams.get('connection')
+        own_conn = conn is None
+        if own_conn:
+            conn = connect(dialect, datasource.url, dsparams)
+        try:
+            tables = read_catalog(conn, dialect, schema=dsparams.get('schema'))
+        finally:
+            if own_conn:
+                conn.close()
+
+        base_iri = dsparams.get('base_iri', default_base_iri(dialect, datasource.url))
+        for concept, preds, ranges in molecules(tables, base_iri, collect_stats=collect_stats):
+            if include is not None and concept['t'] not in include:
+                continue
+            yield self._create_rdfmt(datasource, concept, preds, ranges, collect_labels)
+
+    def _emit(self, rdfmt, rdfmts, out_queue=None):
+        # writes a complete RDF-MT to the sink and the output queue, and keeps it only if the sink is in memory
+        self.sink.write(rdfmt)
+        if out_queue is not None:
+            out_queue.put(rdfmt)
+        if self.sink.in_memory:
+            rdfmts.append(rdfmt)
+
+    def close(self):
+        """Closes the sink of this extractor
+
+        :return:
+        """
+        self.sink.close()
+
+    def _create_rdfmt(self, datasource, concept, preds, ranges, collect_labels=False):
+        """Creates an RDFMT of the given {concept} with its predicates {preds} and their {ranges}
+
+        :param datasource: the data source the concept is extracted from
+        :param concept: dict representation of the concept, as returned by get_concepts
+        :param preds: list of predicates, as returned by get_predicates
+        :param ranges: dict of pred_id -> list of ranges
+        :param collect_labels: whether labels are collected or not
+        :return: RDFMT
+        """
+
+        t = concept['t']
+        label = t
+        if collect_labels:
+            label = concept.get('label', t)
+        card = -1
+        if 'card' in concept:
+            card = concept['card']
+
+        rdfmt = RDFMT(t, label, 'typed', cardinality=card)
+        rdfmt.cardinality_bounds = concept.get('card_bounds')
+        if 'subClassOf' in concept:
+            rdfmt.subClassOf = concept['subClassOf']
+
+        for p in preds:
+            label = p['p']
             if collect_labels:
-                label = c['label']
+                label = p.get('label', p['p'])
             card = -1
-            if 'card' in c:
-                card = c['card']
-
-            rdfmt = RDFMT(t, label, 'typed', cardinality=card)
-            if 'subClassOf' in c:
-                rdfmt.subClassOf = c['subClassOf']
-
-            preds = self.get_predicates(endpoint, t, collect_labels=collect_labels, collect_stats=collect_stats,
-                                        labeling_prop=labeling_prop, limit=limit, out_queue=out_queue)
-
-            for p in preds:
-                label = p['p']
-                if collect_labels:
-                    label = p['label']
-                card = -1
-                if 'card' in p:
-                    card = p['card']
-                pred = Predicate(p['p'], label, cardinality=card)
-
-                ranges = self.get_predicate_ranges(endpoint, t, p['p'])
-                pred.addRanges(ranges)
-                rdfmt.addPredicate(pred)
-
-            rdfmt.addDataSource(datasource)
-            rdfmts.append(rdfmt)
+            if 'card' in p:
+                card = p['card']
+            pred = Predicate(p['p'], label, cardinality=card)
+            pred.cardinality_bounds = p.get('card_bounds')
+            pred.stats = p.get('stats')
+            pred.addRanges(ranges.get(p['p'], []))
+            rdfmt.addPredicate(pred)
 
-        return rdfmts
+        rdfmt.addDataSource(datasource)
+
+        return rdfmt
 
     def get_concepts(self, endpoint, collect_labels=False, collect_stats=False,
                      labeling_prop="http://www.w3.org/2000/01/rdf-schema#label",
-                     typing_pred='a', limit=-1, out_queue=None):
+                     typing_pred='a', limit=-1, out_queue=None, include=None):
         """Entry point for extracting RDF-MTs of an endpoint.
 
             Extracts list of rdf:Class concepts from the endpoint
@@ -522,26 +1805,77 @@ class RDFMTExtractor:
                 Can be any predicate uri, such as a or <http://www.w3.org/1999/02/22-rdf-syntax-ns#type>.
                  Should be in full uri format (not prefixed as rdf:type, wdt:P31, except 'a' which is the default)
                 default: rdf:type or 'a'.
+        :param include: if given, only concepts in this set are extracted
         :return:
         """
+        reslist, _ = self._list_concepts(endpoint, typing_pred=typing_pred, limit=limit, out_queue=out_queue)
+        if include is not None:
+            reslist = [r for r in reslist if r['t'] in include]
+
+        return self._describe_concepts(endpoint, reslist, collect_labels=collect_labels, collect_stats=collect_stats,
+                                       labeling_prop=labeling_prop, typing_pred=typing_pred)
+
+    def _describe_concepts(self, endpoint, reslist, collect_labels=False, collect_stats=False,
+                           labeling_prop="http://www.w3.org/2000/01/rdf-schema#label", typing_pred='a'):
+        # collect labels, cardinalities and superclasses of the concepts in {reslist}
+        if collect_labels:
+            reslist = self.get_labels(endpoint, reslist, 't', labeling_prop, 50)
+        if collect_stats:
+            if self.params.get('stats_mode') == 'batched':
+                reslist = self.get_cardinalities_batched(endpoint, reslist, 't', typing_pred=typing_pred)
+            elif self.params.get('stats_mode') == 'approximate':
+                reslist = self.get_cardinalities_approximate(endpoint, reslist, 't', typing_pred=typing_pred)
+            else:
+                reslist = self.get_cardinality(endpoint, reslist, 't')
+
+        reslist = self.get_super_classes(endpoint, reslist, 't')
+
+        return reslist
+
+    def _list_concepts(self, endpoint, typing_pred='a', limit=-1, out_queue=None):
+        # (list of classes of {endpoint}, status of _get_results_iter), the list may be partial if status is -1
         query = "SELECT DISTINCT ?t WHERE{ ?s " + typing_pred + " ?t } "
 
         # if limit is not set, then set limit to 50, graceful request
         if limit == -1:
             limit = 50
 
-        reslist, status = self._get_results_iter(query, endpoint, limit)
+        reslist, status = self._get_results_iter(query, endpoint, limit, out_queue=out_queue, key='t', order_by='t')
 
         # exclude some metadata classes
-        reslist = [r for r in reslist if True not in [m in str(r['t']) for m in metas]]
-        if collect_labels:
-            reslist = self.get_labels(endpoint, reslist, 't', labeling_prop, 50)
-        if collect_stats:
-            reslist = self.get_cardinality(endpoint, reslist, 't')
+        return [r for r in reslist if True not in [m in str(r['t']) for m in metas]], status
 
-        reslist = self.get_super_classes(endpoint, reslist, 't')
+    def get_fingerprints(self, datasource, typing_pred='a', limit=-1):
+        """Fingerprints of the RDF-MTs of a data source, computed from cheap signals
 
-        return reslist
+        The fingerprint of an RDF-MT is a hash of its cardinality and of its set of predicates. Both are collected for
+        all classes with grouped queries (see get_cardinalities_batched and get_class_predicates), so fingerprinting a
+        data source costs a handful of queries compared to a full extraction. Dump, tabular and relational data
+        sources are summarized without labels instead (a single pass over the data, or a few catalog queries), and
+        their RDF-MTs are fingerprinted with fingerprint().
+
+        :param datasource: the data source
+        :param typing_pred: typing predicate used in the endpoint. default: 'a'
+        :param limit:
+        :return: dict of rdfmt_id -> fingerprint (None if the cardinality of the RDF-MT could not be counted), empty
+                    for data sources of other types; None if the classes of the data source could not be listed
+        """
+        local = self._iter_local_molecules(datasource, typing_pred=typing_pred, collect_stats=True)
+        if local is not None:
+            return {rdfmt.mtId: fingerprint(rdfmt.cardinality, [p.predId for p in rdfmt.predicates])
+                    for rdfmt in local}
+        if datasource.dstype != DataSourceType.SPARQL_ENDPOINT:
+            return {}
+        endpoint = datasource.url
+
+        concepts, status = self._list_concepts(endpoint, typing_pred=typing_pred, limit=limit)
+        if status == -1:
+            return None
+        concepts = self.get_cardinalities_batched(endpoint, concepts, 't', typing_pred=typing_pred)
+        class_preds = self.get_class_predicates(endpoint, [c['t'] for c in concepts])
+
+        return {c['t']: fingerprint(c['card'], [p['p'] for p in class_preds.get(c['t'], [])]) if c['card'] >= 0
+                else None for c in concepts}
 
     def get_predicates(self, endpoint, rdfmt_id, collect_labels=False, collect_stats=False,
                        labeling_prop="http://www.w3.org/2000/01/rdf-schema#label",
@@ -561,7 +1895,7 @@ class RDFMTExtractor:
 
         if limit < 1:
             limit = 15
-        reslist, status = self._get_results_iter(query, endpoint, limit)
+        reslist, status = self._get_results_iter(query, endpoint, limit, out_queue=out_queue, key='p', order_by='p')
         if status == -1:
             # fallback strategy - get predicates from randomly selected instances of {rdfmt_id}
             print(rdfmt_id, 'properties are not extracted properly. Falling back to randomly selected instances...')
@@ -571,14 +1905,103 @@ class RDFMTExtractor:
                 if r not in existingpreds:
                     reslist.append({'p': r})
 
+        return self._describe_predicates(endpoint, rdfmt_id, reslist, collect_labels=collect_labels,
+                                         collect_stats=collect_stats, labeling_prop=labeling_prop)
+
+    def _describe_predicates(self, endpoint, rdfmt_id, reslist, collect_labels=False, collect_stats=False,
+                             labeling_prop="http://www.w3.org/2000/01/rdf-schema#label"):
         # collect labels if requested
         if collect_labels:
             reslist = self.get_labels(endpoint, reslist, 'p', labeling_prop, 5)
         if collect_stats:
-            reslist = self.get_cardinality(endpoint, reslist, 'p')
+            if self.params.get('stats_mode') == 'batched':
+                reslist = self.get_predicate_cardinalities(endpoint, rdfmt_id, reslist, 'p')
+            elif self.params.get('stats_mode') == 'approximate':
+                reslist = self.get_predicate_cardinalities_approximate(endpoint, rdfmt_id, reslist, 'p')
+            else:
+                reslist = self.get_cardinality(endpoint, reslist, 'p')
 
         return reslist
 
+    def get_class_predicates(self, endpoint, rdfmt_ids, batch_size=-1, limit=-1):
+        """Get predicates of all the given classes {rdfmt_ids} with grouped, paginated queries
+
+        Classes are bound with a VALUES block of up to {batch_size} classes, and all (class, predicate) pairs of a
+        batch are crawled with a single paginated SELECT DISTINCT ?t ?p query. Classes of a batch that cannot be
+        crawled this way fall back to get_predicates.
+
+        :param endpoint: endpoint
+        :param rdfmt_ids: list of RDF class Concepts extracted from an endpoint
+        :param batch_size: max number of classes per query. default: params['predicate_batch_size'] or 20
+        :param limit: page size. default: 100
+        :return: dict of rdfmt_id -> list of predicates, each as {'p': pred_id}
+        """
+        if batch_size < 1:
+            batch_size = self.params.get('predicate_batch_size', 20)
+        if limit < 1:
+            limit = 100
+
+        class_preds = {}
+        for i in range(0, len(rdfmt_ids), batch_size):
+            batch = rdfmt_ids[i: i + batch_size]
+            values = " ".join(["<" + t + ">" for t in batch])
+            query = "SELECT DISTINCT ?t ?p WHERE { VALUES ?t { " + values + " } ?s a ?t . ?s ?p ?pt } ORDER BY ?t ?p "
+
+            reslist, status = self._get_results_iter(query, endpoint, limit)
+            if status == -1:
+                print('properties of', len(batch), 'classes are not extracted in bulk. Falling back to each class...')
+                for t in batch:
+                    class_preds[t] = self.get_predicates(endpoint, t)
+                continue
+
+            for t in batch:
+                class_preds[t] = []
+            for r in reslist:
+                if 't' in r and 'p' in r and r['t'] in class_preds:
+                    class_preds[r['t']].append({'p': r['p']})
+
+        return class_preds
+
+    def get_bulk_predicates(self, endpoint, concepts, collect_labels=False, collect_stats=False,
+                            labeling_prop="http://www.w3.org/2000/01/rdf-schema#label", limit=-1, out_queue=None):
+        """Get predicates of all {concepts} in a single crawl, see get_class_predicates
+
+        Labels are collected once per distinct predicate rather than once per (class, predicate) pair.
+
+        :param endpoint: endpoint
+        :param concepts: list of concepts as returned by get_concepts
+        :param collect_labels: boolean value setting wheather to collect labels or not. default: False
+        :param collect_stats: boolean value setting wheather to collect cardinalities or not. default: False
+        :param labeling_prop: if {collect_labels} is set `True`, then this labeling property will be used.
+                        default: http://www.w3.org/2000/01/rdf-schema#label
+        :param limit:
+        :return: dict of rdfmt_id -> list of predicates, as returned by get_predicates
+        """
+        class_preds = self.get_class_predicates(endpoint, [c['t'] for c in concepts])
+
+        preds = {}
+        for plist in class_preds.values():
+            for p in plist:
+                preds.setdefault(p['p'], {'p': p['p']})
+        predlist = list(preds.values())
+        if collect_labels:
+            predlist = self.get_labels(endpoint, predlist, 'p', labeling_prop, 5)
+        # cardinalities per class, if stats_mode is 'batched' or 'approximate'
+        per_class = self.params.get('stats_mode') in ('batched', 'approximate')
+        if collect_stats and not per_class:
+            predlist = self.get_cardinality(endpoint, predlist, 'p')
+        preds = {p['p']: p for p in predlist}
+
+        for t, plist in class_preds.items():
+            plist = [dict(preds[p['p']]) for p in plist]
+            if collect_stats and self.params.get('stats_mode') == 'batched':
+                plist = self.get_predicate_cardinalities(endpoint, t, plist, 'p')
+            elif collect_stats and self.params.get('stats_mode') == 'approximate':
+                plist = self.get_predicate_cardinalities_approximate(endpoint, t, plist, 'p')
+            class_preds[t] = plist
+
+        return class_preds
+
     def get_predicate_ranges(self, endpoint, rdfmt_id, pred_id, limit=100):
         """get value ranges/rdfs ranges of the given predicate {pred_id}
 
@@ -599,6 +2022,65 @@ class RDFMTExtractor:
 
         return ranges
 
+    def get_class_predicate_ranges(self, endpoint, rdfmt_id, pred_ids, limit=-1):
+        """get value ranges/rdfs ranges of all the given predicates {pred_ids} of RDF-MT {rdfmt_id}
+
+        Same as get_predicate_ranges for each predicate, but the ranges of all predicates are obtained together:
+        rdfs:range of the predicates with VALUES bound queries, and object types and datatypes of the values of
+        {rdfmt_id} instances with one grouped (?p ?r) query each.
+
+        :param endpoint: url
+        :param rdfmt_id: rdfmt
+        :param pred_ids: list of predicates
+        :param limit: page size, default: 100
+        :return: dict of pred_id -> list of ranges
+        """
+
+        if limit < 1:
+            limit = 100
+
+        ranges = self._get_rdfs_ranges_batched(endpoint, pred_ids)
+
+        INSTANCE_RANGES = " SELECT DISTINCT ?p ?r WHERE{ ?s a <" + rdfmt_id + ">. ?s ?p ?pt. ?pt a ?r } ORDER BY ?p ?r "
+        INSTANCE_RANGES_DType = " SELECT DISTINCT ?p (datatype(?pt) AS ?r) WHERE{ ?s a <" + rdfmt_id + \
+                                ">. ?s ?p ?pt. FILTER isLiteral(?pt) } ORDER BY ?p ?r "
+
+        reslist, status = self._get_results_iter(INSTANCE_RANGES, endpoint, limit)
+        reslist2, status2 = self._get_results_iter(INSTANCE_RANGES_DType, endpoint, limit)
+        reslist.extend(reslist2)
+
+        for r in reslist:
+            if 'p' not in r or 'r' not in r or r['p'] not in ranges:
+                continue
+            if True in [m in r['r'] for m in metas]:
+                continue
+            if r['r'] not in ranges[r['p']]:
+                ranges[r['p']].append(r['r'])
+
+        return ranges
+
+    def _get_rdfs_ranges_batched(self, endpoint, pred_ids, batch_size=50, limit=-1):
+
+        if limit == -1:
+            limit = 100
+
+        ranges = {p: [] for p in pred_ids}
+        for i in range(0, len(pred_ids), batch_size):
+            values = " ".join(["<" + p + ">" for p in pred_ids[i: i + batch_size]])
+            RDFS_RANGES = " SELECT DISTINCT ?p ?range WHERE{ VALUES ?p { " + values + " } " \
+                          "?p <http://www.w3.org/2000/01/rdf-schema#range> ?range. } ORDER BY ?p ?range "
+
+            reslist, status = self._get_results_iter(RDFS_RANGES, endpoint, limit)
+
+            for r in reslist:
+                if 'p' not in r or 'range' not in r or r['p'] not in ranges:
+                    continue
+                if True in [m in r['range'] for m in metas]:
+                    continue
+                ranges[r['p']].append(r['range'])
+
+        return ranges
+
     def _get_rdfs_ranges(self, endpoint, pred_id, limit=-1):
 
         RDFS_RANGES = " SELECT DISTINCT ?range  WHERE{ <" + pred_id + "> <http://www.w3.org/2000/01/rdf-schema#range> ?range. }"
@@ -656,40 +2138,175 @@ class RDFMTExtractor:
 
         return ranges
 
-    def _get_results_iter(self, query, endpoint, limit, max_rows=-1, out_queue=None):
+    def _get_results_iter(self, query, endpoint, limit, max_rows=-1, out_queue=None, key=None, order_by=None):
+        """Pages through the results of {query}, reducing the page size if the endpoint fails
+
+        Pages are requested with LIMIT/OFFSET. If page_size_mode is 'adaptive' (see params), the page size also grows
+        while the endpoint responds fast and the best page size is remembered per endpoint. If paging_mode is
+        'keyset' and {order_by} is given, pages are requested in the order of {order_by} and each page starts after
+        the last value of the previous one instead of at an OFFSET (see awudima.sdesc.paging.keyset_query).
+
+        :param query: SPARQL query without LIMIT/OFFSET
+        :param endpoint: url
+        :param limit: page size
+        :param max_rows: stop after this number of rows, -1 for all rows
+        :param out_queue: if given, each row is also put into this queue as soon as its page is received
+        :param key: if given, rows whose {key} value is a metadata IRI (see metas) are not put into {out_queue}
+        :param order_by: name of the IRI variable (without '?') of a single variable SELECT DISTINCT {query} that
+                    can be paged by keyset; None if the query cannot
+        :return: (list of rows, status), status is -1 if the endpoint failed even with a page size of 1 or failed
+                    with an error other than RESULT_LIMIT, TIMEOUT or SERVER_ERROR (see awudima.sdesc.scheduler),
+                    else 0
+        """
+        page_sizes = None
+        requested = limit
+        if self.params.get('page_size_mode') == 'adaptive':
+            page_sizes = self.page_sizes
+            limit = page_sizes.initial(endpoint, limit)
+        keyset = order_by is not None and self.params.get('paging_mode') == 'keyset'
+
         offset = 0
+        last = None
+        truncated = None
         reslist = []
         status = 0
 
-        while True:
-            query_copy = query + " LIMIT " + str(limit) + ( " OFFSET " + str(offset) if offset > 0 else '')
-            res, card = contact_sparql_endpoint(query_copy, endpoint)
+        page_workers = self.params.get('page_workers', 1)
+        if page_workers > 1 and not keyset:
+            failure, offset = self._get_pages_parallel(query, endpoint, limit, page_workers, reslist,
+                                                       max_rows=max_rows, out_queue=out_queue, key=key)
+            if failure == 0:
+                return reslist, status
+            if failure not in SHRINKING_FAILURES or self._deadline_passed():
+                return reslist, -1
+            # a page was too large or too slow, continue one page at a time with smaller pages
+            limit = page_sizes.failure(endpoint, limit) if page_sizes is not None else limit // 2
+            if limit < 1:
+                return reslist, -1
 
-            # in case source fails because of the data/row limit, try again up to limit = 1
-            if card == -2:
-                limit = limit // 2
+        while True:
+            if keyset:
+                query_copy = keyset_query(query, order_by, last) + " LIMIT " + str(limit)
+            else:
+                query_copy = query + " LIMIT " + str(limit) + (" OFFSET " + str(offset) if offset > 0 else '')
+            start = time.time()
+            res, card = self._query(query_copy, endpoint)
+            elapsed = time.time() - start
+
+            # in case source fails because of the data/row limit, or the page takes too long to compute, try again
+            # up to limit = 1; once the time budget is used up, no further page is requested
+            if card in SHRINKING_FAILURES and not self._deadline_passed():
+                limit = page_sizes.failure(endpoint, limit) if page_sizes is not None else limit // 2
                 if limit < 1:
                     status = -1
                     break
                 continue
+            # other failures, e.g., a rejected query or an unreachable endpoint, would not change with smaller pages
+            if card < 0:
+                status = -1
+                break
 
             # if results are returned from the endpoint, append them to the results list
             if card > 0:
                 reslist.extend(res)
+                if keyset:
+                    last = res[-1].get(order_by, last)
 
-                # if output queue is given, then put each non-metadata classes to the queue
+                # if output queue is given, then put each non-metadata row to the queue
                 if out_queue is not None:
-                    for r in res:
-                        if True not in [m in str(r['t']) for m in metas]:
-                            out_queue.put(r)
+                    _queue_rows(out_queue, res, key)
 
-            # if number of rows returned are less than the requested limit, then we are done
-            if card < limit or (max_rows > 0 and len(reslist) >= max_rows):
+                # rows after a short page: the endpoint truncates results to the number of rows of that page
+                if truncated is not None:
+                    page_sizes.set_row_limit(endpoint, truncated)
+                    limit = truncated
+            truncated = None
+
+            if max_rows > 0 and len(reslist) >= max_rows:
                 break
-            offset += limit
+            # if number of rows returned are less than the requested limit, then we are done, unless the page size
+            # has grown beyond the requested one: endpoints may silently truncate large pages, so the next page is
+            # checked once
+            if card < limit:
+                if page_sizes is None or card <= 0 or limit <= requested:
+                    break
+                truncated = card
+            offset += card
+            if page_sizes is not None and truncated is None:
+                limit = page_sizes.success(endpoint, limit, card, elapsed)
 
         return reslist, status
 
+    def _get_pages_parallel(self, query, endpoint, limit, page_workers, reslist, max_rows=-1, out_queue=None,
+                            key=None):
+        """Fetches pages of {query} speculatively, with up to {page_workers} pages requested at the same time
+
+        Once the first page is full, the next {page_workers} OFFSET windows are kept in flight. Pages are appended to {reslist} in order; once a
+        page has less than {limit} rows (the last page), pages requested beyond it are cancelled or dropped.
+
+        :param query: SPARQL query without LIMIT/OFFSET
+        :param endpoint: url
+        :param limit: page size
+        :param page_workers: max number of pages requested at the same time
+        :param reslist: list the rows are appended to
+        :param max_rows: stop after this number of rows, -1 for all rows
+        :param out_queue: if given, each row is also put into this queue as soon as its page is appended
+        :param key: if given, rows whose {key} value is a metadata IRI (see metas) are not put into {out_queue}
+        :return: (failure, offset), failure is the status code if the endpoint failed to return the page at {offset},
+                    else 0
+        """
+
+        pending = deque()
+        next_offset = 0
+        # the page workers send no query after the deadline of the calling thread either, see _query
+        deadline = getattr(self._deadlines, 'deadline', None)
+        with ThreadPoolExecutor(max_workers=page_workers, initializer=setattr,
+                                initargs=(self._deadlines, 'deadline', deadline)) as executor:
+            def request_page():
+                nonlocal next_offset
+                query_copy = query + " LIMIT " + str(limit) + (" OFFSET " + str(next_offset) if next_offset > 0 else '')
+                pending.append((next_offset, executor.submit(self._query, query_copy, endpoint)))
+                next_offset += limit
+
+            # the first page is requested alone, so that results of a single page cost a single request
+            request_page()
+            speculate = True
+            while True:
+                offset, future = pending.popleft()
+                res, card = future.result()
+                if card >= 0 and self._deadline_passed():
+                    card = TIMEOUT
+                if card < 0:
+                    failure = card
+                    break
+                if card > 0:
+                    reslist.extend(res)
+                    if out_queue is not None:
+                        _queue_rows(out_queue, res, key)
+                if card < limit or (max_rows > 0 and len(reslist) >= max_rows):
+                    failure = 0
+                    break
+                request_page()
+                while speculate and len(pending) < page_workers:
+                    request_page()
+                speculate = False
+
+            for _, future in pending:
+                future.cancel()
+
+        return failure, offset
+
+    def _query(self, query, endpoint):
+        # pages of a budgeted extraction are not requested after its deadline
+        if self._deadline_passed():
+            return [], TIMEOUT
+        pool = self.session_pool if self.session_pool is not None else get_session_pool()
+        return contact_sparql_endpoint(query, endpoint, pool=pool, cache=self.cache, scheduler=self.scheduler)
+
+    def _deadline_passed(self):
+        deadline = getattr(self._deadlines, 'deadline', None)
+        return deadline is not None and time.time() >= deadline
+
     def _get_preds_of_sample_instances(self, endpoint, rdfmt_id, limit=50):
 
         """get a union of predicates from the first 100 subjects returned
@@ -739,10 +2356,10 @@ class RDFMTExtractor:
 
         while True:
             query_copy = query + " LIMIT " + str(limit) + " OFFSET " + str(offset)
-            res, card = contact_sparql_endpoint(query_copy, endpoint)
+            res, card = self._query(query_copy, endpoint)
 
             # in case source fails because of the data/row limit, try again up to limit = 1
-            if card == -2:
+            if card == RESULT_LIMIT:
                 limit = limit // 2
                 if limit < 1:
                     break
@@ -789,7 +2406,7 @@ class RDFMTExtractor:
 
             for r in reslist:
                 for j in range(len(batches)):
-                    if len(r['l' + str(j)]) > 0:
+                    if len(r.get('l' + str(j), '')) > 0:
                         batches[j]['label'] = r['l' + str(j)]
             result.extend(batches)
             # reset batches list to empty
@@ -806,6 +2423,18 @@ class RDFMTExtractor:
         :return:
         """
         results = []
+        hierarchy = None
+        if self.params.get('hierarchy_mode') == 'local':
+            hierarchy = self.get_class_hierarchy(endpoint)
+        # falls back to path queries if the hierarchy could not be fetched
+        if hierarchy is not None:
+            for t in ids:
+                # exclude some metadata classes
+                t['subClassOf'] = [{'sc': sc} for sc in hierarchy.superclasses(t[key])
+                                   if True not in [m in sc for m in metas]]
+                results.append(t)
+            return results
+
         for t in ids:
             rdfmt_id = t[key]
             # uses path query to get all superclasses, since subClassOf property is transitive
@@ -824,6 +2453,54 @@ class RDFMTExtractor:
 
         return results
 
+    def get_class_hierarchy(self, endpoint, limit=-1, refresh=False):
+        """Get the rdfs:subClassOf hierarchy of all classes of the endpoint
+
+        All rdfs:subClassOf edges are fetched once with a paginated query and kept in memory, so that transitive
+        superclasses and subclasses of any class can be looked up without contacting the endpoint again.
+
+        :param endpoint:
+        :param limit: page size. default: 100
+        :param refresh: whether to fetch the edges again even if the hierarchy of the endpoint is already known
+        :return: ClassHierarchy, None if the endpoint failed to return all edges. A failed fetch is not kept, so that
+                it is tried again on the next call
+        """
+        # concurrent extractions of the same endpoint wait for a single fetch
+        with self._hierarchy_lock:
+            if endpoint in self.hierarchies and not refresh:
+                return self.hierarchies[endpoint]
+
+            if limit == -1:
+                limit = 100
+            query = "PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#> " \
+                    " SELECT DISTINCT ?c ?sc WHERE { ?c rdfs:subClassOf ?sc } ORDER BY ?c ?sc "
+
+            reslist, status = self._get_results_iter(query, endpoint, limit)
+            if status == -1:
+                print("Could not fetch the class hierarchy of", endpoint)
+                return None
+            hierarchy = ClassHierarchy([(r['c'], r['sc']) for r in reslist if 'c' in r and 'sc' in r])
+            self.hierarchies[endpoint] = hierarchy
+
+        return hierarchy
+
+    def get_sub_classes(self, endpoint, rdfmt_id):
+        """Get all direct and indirect subclasses of the given RDF-MT {rdfmt_id}, including itself
+
+        :param endpoint:
+        :param rdfmt_id:
+        :return: list of class IRIs
+        """
+        hierarchy = self.get_class_hierarchy(endpoint)
+        if hierarchy is not None:
+            return hierarchy.subclasses(rdfmt_id)
+
+        query = "PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#> " \
+                " SELECT DISTINCT ?c WHERE { ?c rdfs:subClassOf* <" + rdfmt_id + "> }"
+        reslist, status = self._get_results_iter(query, endpoint, 15)
+
+        return [r['c'] for r in reslist if 'c' in r]
+
     def get_cardinality(self, endpoint, ids, key):
         """collect cardinality of the given RDF-MT {rdfmt_id}
 
@@ -844,10 +2521,285 @@ class RDFMTExtractor:
             card = -1
 
             if reslist is not None and len(reslist) > 0:
-                card = reslist[0]['card']
+                card = _to_int(reslist[0]['card'])
 
             t['card'] = card
             results.append(t)
 
         return results
 
+    def get_cardinalities_batched(self, endpoint, ids, key, typing_pred='a', batch_size=-1):
+        """collect cardinality of the given RDF-MTs {ids} using one grouped query per batch of classes
+
+        Classes are bound with a VALUES block of up to {batch_size} classes, and the number of distinct instances of
+        each class in the batch is computed with a single GROUP BY ?t query.
+
+        :param endpoint:
+        :param ids: list of dict values
+        :param key: key to access the rdfmt_id
+        :param typing_pred: typing predicate used in the endpoint. default: 'a'
+        :param batch_size: max number of classes per query. default: params['stats_batch_size'] or 50
+        :return: updated list {ids} with additional element 'card'
+        """
+        if batch_size < 1:
+            batch_size = self.params.get('stats_batch_size', 50)
+
+        for i in range(0, len(ids), batch_size):
+            batch = ids[i: i + batch_size]
+            values = " ".join(["<" + t[key] + ">" for t in batch])
+            query = "SELECT ?t (COUNT(DISTINCT ?s) AS ?card) WHERE { VALUES ?t { " + values + " } ?s " + \
+                    typing_pred + " ?t } GROUP BY ?t ORDER BY ?t "
+
+            reslist, status = self._get_results_iter(query, endpoint, batch_size)
+            cards = {r['t']: _to_int(r['card']) for r in reslist if 't' in r and 'card' in r}
+
+            # classes missing in the result have no instances, or are set as unknown (-1) if the query failed
+            for t in batch:
+                t['card'] = cards.get(t[key], 0 if status == 0 else -1)
+
+        return ids
+
+    def get_cardinalities_approximate(self, endpoint, ids, key, typing_pred='a'):
+        """estimate cardinality of the given RDF-MTs {ids} without counting all of their instances
+
+        A sample of up to stats_sample_size distinct instances of each class is fetched first; if the class has fewer
+        instances, its cardinality is exact. Otherwise OFFSETs are probed with LIMIT 1 queries, doubling the offset
+        until no instance is returned and then bisecting, until the bounds are within stats_error of each other or
+        stats_max_probes queries are sent. The estimate is the middle of the bounds. The sample is kept for
+        get_predicate_cardinalities_approximate.
+
+        Unlike local dumps and tabular sources, no HyperLogLog sketch of the instances is built: only the sample is
+        streamed from the endpoint, and its distinct instances are already counted exactly, while the size of the
+        rest of the class comes from the probes, which a sketch of the sample cannot estimate.
+
+        :param endpoint:
+        :param ids: list of dict values
+        :param key: key to access the rdfmt_id
+        :param typing_pred: typing predicate used in the endpoint. default: 'a'
+        :return: updated list {ids} with additional elements 'card' and 'card_bounds' ((low, high), high is -1 if no
+                    upper bound was found; None if 'card' is exact)
+        """
+        for t in ids:
+            card, bounds, sample = self._estimate_class(endpoint, t[key], typing_pred=typing_pred)
+            t['card'] = card
+            t['card_bounds'] = bounds
+
+        return ids
+
+    def _estimate_class(self, endpoint, rdfmt_id, typing_pred='a'):
+        if (endpoint, rdfmt_id) in self._class_estimates:
+            return self._class_estimates[(endpoint, rdfmt_id)]
+
+        sample_size = self.params.get('stats_sample_size', 200)
+        query = " SELECT DISTINCT ?s WHERE { ?s " + typing_pred + " <" + rdfmt_id + "> } "
+        reslist, status = self._get_results_iter(query, endpoint, sample_size, max_rows=sample_size)
+        sample = [r['s'] for r in reslist[:sample_size] if 's' in r]
+        if status == -1:
+            estimate = -1, None, sample
+        elif len(reslist) < sample_size:
+            estimate = len(reslist), None, sample
+        else:
+            low, high = self._probe_class_size(endpoint, rdfmt_id, sample_size, typing_pred=typing_pred)
+            estimate = (low + high) // 2 if high >= 0 else low, (low, high), sample
+
+        self._class_estimates[(endpoint, rdfmt_id)] = estimate
+        return estimate
+
+    def _probe_class_size(self, endpoint, rdfmt_id, low, typing_pred='a'):
+        # bounds (low, high) of the number of instances of {rdfmt_id}, known to be at least {low}. A row at OFFSET k
+        # means there are more than k instances, no row means at most k. high is -1 if no upper bound was found
+        query = " SELECT ?s WHERE { ?s " + typing_pred + " <" + rdfmt_id + "> } LIMIT 1 OFFSET "
+        max_error = self.params.get('stats_error', 0.1)
+        probes = self.params.get('stats_max_probes', 30)
+        high = -1
+        while probes > 0 and (high < 0 or high - low > max_error * low):
+            offset = low * 2 if high < 0 else (low + high) // 2
+            res, card = self._query(query + str(offset), endpoint)
+            probes -= 1
+            if card < 0:
+                break
+            if card > 0:
+                low = offset + 1
+            else:
+                high = offset
+
+        return low, high
+
+    def get_predicate_cardinalities_approximate(self, endpoint, rdfmt_id, ids, key, typing_pred='a', batch_size=50):
+        """estimate cardinality of the given predicates {ids} of RDF-MT {rdfmt_id} from a sample of its instances
+
+        The triples of the instances sampled by get_cardinalities_approximate are counted per predicate with grouped
+        queries over batches of {batch_size} instances. The cardinality of a predicate (number of triples using it
+        whose subject is an instance of {rdfmt_id}) is then extrapolated to the whole class; its bounds combine the
+        Wilson interval of the fraction of instances using the predicate with the bounds of the class cardinality.
+        If the sample covers the whole class, cardinalities are exact.
+
+        :param endpoint:
+        :param rdfmt_id: RDF class Concept the predicates belong to
+        :param ids: list of dict values
+        :param key: key to access the pred_id
+        :param typing_pred: typing predicate used in the endpoint. default: 'a'
+        :param batch_size: max number of instances per grouped query. default: 50
+        :return: updated list {ids} with additional elements 'card' and 'card_bounds' (None if 'card' is exact)
+        """
+        class_card, class_bounds, sample = self._estimate_class(endpoint, rdfmt_id, typing_pred=typing_pred)
+        # blank nodes cannot be bound with VALUES
+        sample = [s for s in sample if ':' in s and not s.startswith('nodeID://')]
+
+        subjects = {}
+        triples = {}
+        for i in range(0, len(sample), batch_size):
+            values = " ".join(["<" + s + ">" for s in sample[i: i + batch_size]])
+            query = "SELECT ?p (COUNT(DISTINCT ?s) AS ?n) (COUNT(?o) AS ?c) WHERE { VALUES ?s { " + values + \
+                    " } ?s ?p ?o } GROUP BY ?p ORDER BY ?p "
+            reslist, status = self._get_results_iter(query, endpoint, 1000)
+            for r in reslist:
+                if 'p' in r:
+                    subjects[r['p']] = subjects.get(r['p'], 0) + _to_int(r.get('n'))
+                    triples[r['p']] = triples.get(r['p'], 0) + _to_int(r.get('c'))
+
+        m = len(sample)
+        for p in ids:
+            n = subjects.get(p[key], 0)
+            c = triples.get(p[key], 0)
+            if class_card < 0 or m == 0:
+                p['card'] = -1
+                p['card_bounds'] = None
+            elif class_bounds is None and m == class_card:
+                p['card'] = c
+                p['card_bounds'] = None
+            else:
+                low, high = class_bounds if class_bounds is not None else (class_card, class_card)
+                per_subject = c / n if n > 0 else 0
+                flow, fhigh = wilson_interval(n, m)
+                p['card'] = int(round(class_card * c / m))
+                p['card_bounds'] = (int(low * flow * per_subject),
+                                    int(math.ceil(high * fhigh * per_subject)) if high >= 0 else -1)
+
+        return ids
+
+    def get_predicate_cardinalities(self, endpoint, rdfmt_id, ids, key, limit=100):
+        """collect cardinality of the given predicates {ids} of RDF-MT {rdfmt_id} using one grouped query
+
+        The cardinality of a predicate is the number of triples using it whose subject is an instance of {rdfmt_id}.
+
+        :param endpoint:
+        :param rdfmt_id: RDF class Concept the predicates belong to
+        :param ids: list of dict values
+        :param key: key to access the pred_id
+        :param limit: page size of the grouped query. default: 100
+        :return: updated list {ids} with additional element 'card'
+        """
+        query = "SELECT ?p (COUNT(?o) AS ?card) WHERE { ?s a <" + rdfmt_id + "> . ?s ?p ?o } GROUP BY ?p ORDER BY ?p "
+
+        reslist, status = self._get_results_iter(query, endpoint, limit)
+        cards = {r['p']: _to_int(r['card']) for r in reslist if 'p' in r and 'card' in r}
+
+        for p in ids:
+            p['card'] = cards.get(p[key], -1)
+
+        return ids
+
+
+def _run_phase(executor, deadline, items, fn):
+    # applies {fn} to each of {items} (in order) with {executor}, and returns index -> result of the items done
+    # before {deadline}. Items not started by then are cancelled.
+    futures = {executor.submit(fn, item): i for i, item in enumerate(items)}
+    done, not_done = wait(futures, timeout=max(0.0, deadline - time.time()))
+    for future in not_done:
+        future.cancel()
+
+    return {futures[future]: future.result() for future in done}
+
+
+class _PipelineStopped(Exception):
+    pass
+
+
+class _PipelineQueue(queue.Queue):
+    """Bounded queue between two stages of RDFMTExtractor.iter_molecules
+
+    Blocking put/get give up with _PipelineStopped once {stop} is set, so that no stage waits forever on a consumer
+    or producer that is gone.
+    """
+
+    def __init__(self, maxsize, stop):
+        super().__init__(maxsize)
+        self.stop = stop
+
+    def put(self, item, block=True, timeout=None):
+        while not self.stop.is_set():
+            try:
+                return super().put(item, timeout=0.1)
+            except queue.Full:
+                pass
+        raise _PipelineStopped()
+
+    def get(self, block=True, timeout=None):
+        while not self.stop.is_set():
+            try:
+                return super().get(timeout=0.1)
+            except queue.Empty:
+                pass
+        raise _PipelineStopped()
+
+
+# marks the end of the items of a pipeline stage, one per worker of the next stage
+_END = object()
+
+
+def _run_source(fn, out_q, consumers, stop, errors):
+    # first stage of a pipeline: {fn} puts its items into {out_q}
+    try:
+        fn()
+        for _ in range(consumers):
+            out_q.put(_END)
+    except _PipelineStopped:
+        pass
+    except Exception as e:
+        errors.append(e)
+        stop.set()
+
+
+def _run_stage(fn, in_q, out_q, consumers, stage, stop, errors):
+    # worker of a pipeline stage: applies {fn} to the items of {in_q}, items for which it returns None are dropped.
+    # The last worker of the stage to finish passes one end marker per worker of the next stage
+    try:
+        while True:
+            item = in_q.get()
+            if item is _END:
+                break
+            result = fn(item)
+            if result is not None:
+                out_q.put(result)
+        with stage['lock']:
+            stage['done'] += 1
+            last = stage['done'] == consumers
+        if last:
+            for _ in range(consumers):
+                out_q.put(_END)
+    except _PipelineStopped:
+        pass
+    except Exception as e:
+        errors.append(e)
+        stop.set()
+
+
+def _queue_rows(out_queue, rows, key=None):
+    # puts each non-metadata row to the queue
+    for r in rows:
+        if key is None or True not in [m in str(r.get(key, '')) for m in metas]:
+            out_queue.put(r)
+
+
+def _to_int(value):
+    """Converts a count value returned by an endpoint, e.g., 42 or 42^^<http://www.w3.org/2001/XMLSchema#integer>, to int
+
+    :param value: count value
+    :return: int value, or -1 if it is not a number
+    """
+    try:
+        return int(str(value).split('^^', 1)[0])
+    except ValueError:
+        return -1
+
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+class SPARQLResultCache:
+    """Persistent on-disk cache of SPARQL query results
+
+    Results are stored in a SQLite database, keyed by the endpoint and the normalized query text (which includes
+    its LIMIT/OFFSET). Entries expire after a time-to-live that can be set per endpoint. When the cache grows beyond
+    {max_entries} entries or {max_size} bytes of results, least recently used entries are evicted first.
+    """
+
+    def __init__(self, path, ttl=86400, endpoint_ttls=None, max_entries=-1, max_size=-1, bypass=False):
+        """
+
+        :param path: path to the SQLite database file. ':memory:' keeps the cache in memory only
+        :param ttl: default time-to-live of entries in seconds. None: entries never expire. default: 86400 (one day)
+        :param endpoint_ttls: dict of endpoint -> time-to-live in seconds, overriding {ttl} for that endpoint
+        :param max_entries: max number of cached results, -1 for unbounded. default: -1
+        :param max_size: max total size of cached results in bytes, -1 for unbounded. default: -1
+        :param bypass: if True, cached results are not read but fresh results are still written. default: False
+        """
+
+        self.path = path
+        self.ttl = ttl
+        self.endpoint_ttls = endpoint_ttls if endpoint_ttls is not None else {}
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS results ("
+                           " key TEXT PRIMARY KEY, endpoint TEXT, created REAL, accessed REAL,"
+                           " size INTEGER, card INTEGER, result TEXT)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        self._conn.commit()
+        self._entries, self._size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        with self._lock:
+            self._evict()
+            self._conn.commit()
+
+    def get(self, endpoint, query):
+        """Returns the cached result of {query} on {endpoint}, if any and not expired
+
+        :param endpoint: url of the endpoint
+        :param query: SPARQL query, including LIMIT/OFFSET
+        :return: (result, card) as returned by contact_sparql_endpoint, or None
+        """
+
+        if self.bypass:
+            self.misses += 1
+            return None
+
+        key = _cache_key(endpoint, query)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT created, size, card, result FROM results WHERE key = ?",
+                                     (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            created, size, card, result = row
+            ttl = self.endpoint_ttls.get(endpoint, self.ttl)
+            if ttl is not None and now - created > ttl:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._conn.commit()
+                self._entries -= 1
+                self._size -= size
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+
+        return json.loads(result), card
+
+    def put(self, endpoint, query, result, card):
+        """Stores the result of {query} on {endpoint}, evicting least recently used entries if the cache is full
+
+        :param endpoint: url of the endpoint
+        :param query: SPARQL query, including LIMIT/OFFSET
+        :param result: result list (or boolean) as returned by contact_sparql_endpoint
+        :param card: number of results as returned by contact_sparql_endpoint
+        :return:
+        """
+
+        key = _cache_key(endpoint, query)
+        value = json.dumps(result)
+        size = len(value)
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+            if old is not None:
+                self._entries -= 1
+                self._size -= old[0]
+            self._conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               (key, endpoint, now, now, size, card, value))
+            self._entries += 1
+            self._size += size
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        while self._entries > 0 and ((0 <= self.max_entries < self._entries) or (0 <= self.max_size < self._size)):
+            rows = self._conn.execute("SELECT key, size FROM results ORDER BY accessed LIMIT ?",
+                                      (max(1, self._entries // 10),)).fetchall()
+            for key, size in rows:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._entries -= 1
+                self._size -= size
+                if not ((0 <= self.max_entries < self._entries) or (0 <= self.max_size < self._size)):
+                    break
+
+    def invalidate(self, endpoint=None):
+        """Removes all cached results of {endpoint}, or of all endpoints if not given
+
+        :param endpoint: url of the endpoint
+        :return:
+        """
+
+        with self._lock:
+            if endpoint is None:
+                self._conn.execute("DELETE FROM results")
+            else:
+                self._conn.execute("DELETE FROM results WHERE endpoint = ?", (endpoint,))
+            self._conn.commit()
+            self._entries, self._size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+
+    def stats(self):
+        """Returns hit/miss counters and the current size of the cache
+
+        :return: dict with hits, misses, entries and size (bytes)
+        """
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': self._entries,
+            'size': self._size
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _normalize_query(query):
+    return " ".join(query.split())
+
+
+def _cache_key(endpoint, query):
+    return hashlib.sha1((endpoint + '\n' + _normalize_query(query)).encode('utf-8')).hexdigest()
@@ -0,0 +1,89 @@
+
+class ClassHierarchy:
+    """rdfs:subClassOf hierarchy of classes
+
+    Keeps the direct subClassOf edges between classes in memory and answers transitive superclass/subclass lookups
+    from them, so the hierarchy of an endpoint needs to be fetched only once. Transitive closures are computed on
+    first use and cached until new edges are added. Cycles in the hierarchy are tolerated.
+    """
+
+    def __init__(self, edges=None):
+        """
+
+        :param edges: iterable of (subclass, superclass) pairs
+        """
+
+        self.parents = {}
+        self.children = {}
+        self._superclasses = {}
+        self._subclasses = {}
+        if edges is not None:
+            for sub, sup in edges:
+                self.add_edge(sub, sup)
+
+    def add_edge(self, subclass, superclass):
+        """Adds a direct {subclass} rdfs:subClassOf {superclass} edge
+
+        :param subclass: class IRI
+        :param superclass: class IRI
+        :return:
+        """
+
+        self.parents.setdefault(subclass, set()).add(superclass)
+        self.children.setdefault(superclass, set()).add(subclass)
+        self._superclasses = {}
+        self._subclasses = {}
+
+    def superclasses(self, cls, reflexive=True):
+        """All direct and indirect superclasses of {cls}, as rdfs:subClassOf* would return them
+
+        :param cls: class IRI
+        :param reflexive: whether {cls} itself is included (as the first element). default: True
+        :return: list of class IRIs, nearest superclasses first
+        """
+
+        if cls not in self._superclasses:
+            self._superclasses[cls] = _closure(cls, self.parents)
+        closure = self._superclasses[cls]
+
+        return list(closure) if reflexive else list(closure[1:])
+
+    def subclasses(self, cls, reflexive=True):
+        """All direct and indirect subclasses of {cls}
+
+        :param cls: class IRI
+        :param reflexive: whether {cls} itself is included (as the first element). default: True
+        :return: list of class IRIs, nearest subclasses first
+        """
+
+        if cls not in self._subclasses:
+            self._subclasses[cls] = _closure(cls, self.children)
+        closure = self._subclasses[cls]
+
+        return list(closure) if reflexive else list(closure[1:])
+
+    def classes(self):
+        """All classes that take part in at least one subClassOf edge
+
+        :return: set of class IRIs
+        """
+
+        return set(self.parents) | set(self.children)
+
+    def __len__(self):
+        return sum([len(sups) for sups in self.parents.values()])
+
+
+def _closure(cls, edges):
+    # breadth first traversal, so that nearest classes come first
+    visited = {cls}
+    result = [cls]
+    i = 0
+    while i < len(result):
+        for nxt in edges.get(result[i], ()):
+            if nxt not in visited:
+                visited.add(nxt)
+                result.append(nxt)
+        i += 1
+
+    return tuple(result)
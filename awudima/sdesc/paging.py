@@ -0,0 +1,139 @@
+import threading
+
+
+class AdaptivePageSize:
+    """Page sizes of paginated queries, adapted per endpoint to how the endpoint responds
+
+    The page size grows (doubles) while full pages are returned faster than {grow_below} seconds, and shrinks
+    (halves) when a page takes longer than {shrink_above} seconds or the endpoint fails. The last page size that
+    worked for an endpoint is remembered and used as the starting size of the next paginated query to it.
+    The smallest page size an endpoint failed with is kept as its ceiling: pages never grow to or past it, and grow
+    only halfway towards it, so that the page size settles below the limit of the endpoint instead of swinging
+    between a size that works and one that fails. Some endpoints silently truncate results to a max number of rows;
+    once such a limit is detected (see set_row_limit), pages never grow beyond it.
+    """
+
+    def __init__(self, min_size=1, max_size=10000, grow_below=1.0, shrink_above=10.0):
+        """
+
+        :param min_size: smallest page size. default: 1
+        :param max_size: largest page size. default: 10000
+        :param grow_below: pages returned faster than this number of seconds let the page size grow. default: 1.0
+        :param shrink_above: pages returned slower than this number of seconds make the page size shrink. default: 10.0
+        """
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.grow_below = grow_below
+        self.shrink_above = shrink_above
+        self._sizes = {}
+        self._row_limits = {}
+        # endpoint -> smallest page size the endpoint failed with
+        self._ceilings = {}
+        self._lock = threading.Lock()
+
+    def initial(self, endpoint, limit):
+        """Page size to start a paginated query to {endpoint} with
+
+        :param endpoint: url of the endpoint
+        :param limit: page size requested by the caller, used if no page size is known for {endpoint}
+        :return: page size
+        """
+
+        with self._lock:
+            if endpoint in self._sizes:
+                return self._sizes[endpoint]
+            return min(limit, self._max(endpoint), self._ceilings.get(endpoint, limit + 1) - 1)
+
+    def success(self, endpoint, limit, card, elapsed):
+        """Records a page of {card} rows returned in {elapsed} seconds for a page size of {limit}
+
+        :param endpoint: url of the endpoint
+        :param limit: requested page size
+        :param card: number of rows returned
+        :param elapsed: response time in seconds
+        :return: page size of the next page
+        """
+
+        with self._lock:
+            size = limit
+            if elapsed > self.shrink_above:
+                size = max(self.min_size, limit // 2)
+            elif elapsed < self.grow_below and card >= limit:
+                size = min(self._grown(endpoint, limit), self._max(endpoint))
+            self._sizes[endpoint] = size
+
+        return size
+
+    def failure(self, endpoint, limit):
+        """Records a failed page of size {limit}
+
+        :param endpoint: url of the endpoint
+        :param limit: requested page size
+        :return: page size to retry with, 0 if even the smallest page size failed
+        """
+
+        size = limit // 2
+        with self._lock:
+            self._ceilings[endpoint] = min(limit, self._ceilings.get(endpoint, limit))
+            if size < self.min_size:
+                return 0
+            self._sizes[endpoint] = size
+
+        return size
+
+    def set_row_limit(self, endpoint, row_limit):
+        """Records that {endpoint} returns at most {row_limit} rows per query
+
+        :param endpoint: url of the endpoint
+        :param row_limit: max number of rows
+        :return:
+        """
+
+        with self._lock:
+            self._row_limits[endpoint] = row_limit
+            if self._sizes.get(endpoint, 0) > row_limit:
+                self._sizes[endpoint] = row_limit
+
+    def _grown(self, endpoint, limit):
+        # doubles {limit}, or moves it halfway towards the ceiling of the endpoint, staying below the ceiling
+        ceiling = self._ceilings.get(endpoint)
+        if ceiling is None:
+            return limit * 2
+        return min(limit * 2, (limit + ceiling) // 2)
+
+    def _max(self, endpoint):
+        return min(self.max_size, self._row_limits.get(endpoint, self.max_size))
+
+
+_default_page_sizes = AdaptivePageSize()
+
+
+def get_page_sizes():
+    """Returns the page sizes shared by all extractors that do not get their own AdaptivePageSize
+
+    :return: AdaptivePageSize
+    """
+
+    return _default_page_sizes
+
+
+def keyset_query(query, var, last=None):
+    """Rewrites a SELECT DISTINCT query of a single IRI variable {var} for keyset pagination
+
+    A filter that keeps only IRIs ordered after {last} is added to the end of the WHERE clause, and results are
+    ordered by {var}, so that the next page starts where the previous one ended instead of at an OFFSET that the
+    endpoint has to scan again.
+
+    :param query: SPARQL query without solution modifiers
+    :param var: name of the variable, without '?'
+    :param last: value of {var} in the last row of the previous page, None for the first page
+    :return: SPARQL query, without LIMIT
+    """
+
+    cond = "isIRI(?" + var + ")"
+    if last is not None:
+        cond += " && STR(?" + var + ") > \"" + last.replace('\\', '\\\\').replace('"', '\\"') + "\""
+    end = query.rfind('}')
+
+    return query[:end] + " FILTER(" + cond + ") " + query[end:] + " ORDER BY STR(?" + var + ")"
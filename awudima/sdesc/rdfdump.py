@@ -0,0 +1,447 @@
+import gzip
+import os
+import random
+import re
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from awudima.sdesc import RDF_TYPE, metas
+from awudima.sdesc.hierarchy import ClassHierarchy
+from awudima.sdesc.stats import HyperLogLog
+
+RDFS_LABEL = 'http://www.w3.org/2000/01/rdf-schema#label'
+RDFS_SUBCLASSOF = 'http://www.w3.org/2000/01/rdf-schema#subClassOf'
+RDFS_RANGE = 'http://www.w3.org/2000/01/rdf-schema#range'
+XSD_STRING = 'http://www.w3.org/2001/XMLSchema#string'
+RDF_LANGSTRING = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#langString'
+
+# types of IRIs whose labels are kept, since they describe the schema
+SCHEMA_TYPES = {'http://www.w3.org/2000/01/rdf-schema#Class',
+                'http://www.w3.org/2002/07/owl#Class',
+                'http://www.w3.org/1999/02/22-rdf-syntax-ns#Property',
+                'http://www.w3.org/2002/07/owl#ObjectProperty',
+                'http://www.w3.org/2002/07/owl#DatatypeProperty'}
+
+DUMP_EXTENSIONS = ('.nt', '.nq', '.ntriples', '.nquads', '.nt.gz', '.nq.gz', '.ntriples.gz', '.nquads.gz')
+
+_TERM = r'(?:<[^>]*>|_:\S+|"(?:[^"\\]|\\.)*"(?:@[A-Za-z0-9\-]+|\^\^<[^>]*>)?)'
+_STATEMENT = re.compile(r'\s*(<[^>]*>|_:\S+)\s+<([^>]*)>\s+(' + _TERM + r')\s*(?:' + _TERM + r')?\s*\.\s*$')
+
+
+class DumpSummary:
+    """Mergeable summary of the RDF-MTs of (a part of) an N-Triples/N-Quads dump
+
+    Statements are read in one pass and grouped into runs of consecutive statements with the same subject, as dumps
+    are usually sorted or grouped by subject. The classes of a subject are taken from the rdf:type statements of its
+    run, or of an earlier run if it is still in a bounded LRU cache of subject types. Memory is bounded by the size of
+    the schema, not of the data:
+        - instances of each class are counted with a HyperLogLog sketch
+        - predicates of each class are counted exactly (number of statements)
+        - ranges of IRI objects are the classes of the objects, as far as known from the cache; objects whose classes
+          are not known yet are kept in a bounded reservoir per (class, predicate) until their own run is read
+        - labels are kept for classes, predicates, IRIs typed as classes or properties, and IRIs with schema
+          statements (rdfs:subClassOf, rdfs:range). Labels of other untyped IRIs, which may turn out to be classes or
+          predicates later in the dump, are kept in a bounded LRU cache
+    Summaries of separate parts of a dump (e.g., files or byte ranges read by separate processes) are combined with
+    merge, once the parts are read.
+    """
+
+    def __init__(self, typing_pred=RDF_TYPE, labeling_prop=RDFS_LABEL, reservoir_size=20, cache_size=100000,
+                 precision=12):
+        """
+
+        :param typing_pred: IRI of the typing predicate. default: rdf:type
+        :param labeling_prop: IRI of the labeling property. default: rdfs:label
+        :param reservoir_size: max number of untyped objects kept per (class, predicate). default: 20
+        :param cache_size: max number of subjects whose classes are cached. default: 100000
+        :param precision: precision of the HyperLogLog sketches counting instances. default: 12
+        """
+
+        self.typing_pred = typing_pred
+        self.labeling_prop = labeling_prop
+        self.reservoir_size = reservoir_size
+        self.cache_size = cache_size
+        self.precision = precision
+        # class -> HyperLogLog of its instances
+        self.instances = {}
+        # class -> {predicate -> number of statements}
+        self.predicates = {}
+        # (class, predicate) -> set of ranges
+        self.ranges = {}
+        # (class, predicate) -> [number of untyped objects seen, sample of them]
+        self.reservoirs = {}
+        # object -> set of (class, predicate) it is sampled for, until its classes are known
+        self.pending = {}
+        # predicate -> set of rdfs:range
+        self.declared_ranges = {}
+        # set of (class, superclass)
+        self.subclass_edges = set()
+        # IRI -> label, of schema IRIs
+        self.labels = {}
+        # LRU cache of IRI -> label, of other untyped IRIs
+        self.candidate_labels = OrderedDict()
+        # predicates used in the part read so far
+        self.predicate_iris = set()
+        # LRU cache of subject -> tuple of classes
+        self.types = OrderedDict()
+        self.statements = 0
+
+    def add_run(self, subject, statements):
+        """Adds the statements of a run of {subject}
+
+        :param subject: subject term, an IRI without <> or a blank node as _:label
+        :param statements: list of (predicate IRI, object term) pairs, objects as in parse_statement
+        :return:
+        """
+
+        self.statements += len(statements)
+        classes = [o for p, o in statements if p == self.typing_pred and _is_resource(o)]
+        if len(classes) > 0:
+            cached = self.types.get(subject, ())
+            classes = tuple(dict.fromkeys(list(cached) + classes))
+            self._cache_types(subject, classes)
+            for c in classes:
+                sketch = self.instances.get(c)
+                if sketch is None:
+                    sketch = self.instances[c] = HyperLogLog(self.precision)
+                sketch.add(subject)
+            self._resolve(subject, classes)
+        else:
+            classes = self.types.get(subject, ())
+            if len(classes) > 0:
+                self.types.move_to_end(subject)
+
+        schema = subject in self.instances or subject in self.predicate_iris or \
+            len(SCHEMA_TYPES.intersection(classes)) > 0
+        label = None
+        for p, o in statements:
+            if p == RDFS_SUBCLASSOF and _is_resource(o):
+                self.subclass_edges.add((subject, o))
+                schema = True
+            elif p == RDFS_RANGE and _is_resource(o):
+                self.declared_ranges.setdefault(subject, set()).add(o)
+                schema = True
+            elif p == self.labeling_prop and label is None and o[0] == '"':
+                label = _literal_label(o)
+        if label is not None and subject not in self.labels:
+            if schema:
+                self.labels[subject] = label
+            elif len(classes) == 0:
+                self.candidate_labels[subject] = label
+                if len(self.candidate_labels) > self.cache_size:
+                    self.candidate_labels.popitem(last=False)
+
+        self.predicate_iris.update([p for p, o in statements])
+        for c in classes:
+            preds = self.predicates.setdefault(c, {})
+            for p, o in statements:
+                preds[p] = preds.get(p, 0) + 1
+                self._add_range(c, p, o)
+
+    def _add_range(self, c, p, o):
+        if o[0] == '"':
+            self.ranges.setdefault((c, p), set()).add(_literal_datatype(o))
+            return
+
+        classes = self.types.get(o)
+        if classes is not None:
+            self.ranges.setdefault((c, p), set()).update(classes)
+            return
+
+        # reservoir sample of the objects whose classes are not known yet
+        key = (c, p)
+        reservoir = self.reservoirs.get(key)
+        if reservoir is None:
+            reservoir = self.reservoirs[key] = [0, []]
+        reservoir[0] += 1
+        sample = reservoir[1]
+        if o in self.pending and key in self.pending[o]:
+            return
+        if len(sample) < self.reservoir_size:
+            sample.append(o)
+        else:
+            i = random.randrange(reservoir[0])
+            if i >= self.reservoir_size:
+                return
+            self._unpend(sample[i], key)
+            sample[i] = o
+        self.pending.setdefault(o, set()).add(key)
+
+    def _unpend(self, o, key):
+        keys = self.pending.get(o)
+        if keys is not None:
+            keys.discard(key)
+            if len(keys) == 0:
+                del self.pending[o]
+
+    def _resolve(self, subject, classes):
+        # subject was sampled as an untyped object: its classes are now known
+        keys = self.pending.pop(subject, None)
+        if keys is None:
+            return
+        for key in keys:
+            self.ranges.setdefault(key, set()).update(classes)
+            reservoir = self.reservoirs.get(key)
+            if reservoir is not None and subject in reservoir[1]:
+                reservoir[1].remove(subject)
+
+    def _cache_types(self, subject, classes):
+        self.types[subject] = classes
+        self.types.move_to_end(subject)
+        if len(self.types) > self.cache_size:
+            self.types.popitem(last=False)
+
+    def merge(self, other):
+        """Merges the summary of another, already read, part of the dump into this one
+
+        Objects still untyped in one part are resolved with the cached subject classes of the other.
+
+        :param other: DumpSummary
+        :return: this DumpSummary
+        """
+
+        for c, sketch in other.instances.items():
+            if c in self.instances:
+                self.instances[c].merge(sketch)
+            else:
+                self.instances[c] = sketch
+        for c, preds in other.predicates.items():
+            mine = self.predicates.setdefault(c, {})
+            for p, n in preds.items():
+                mine[p] = mine.get(p, 0) + n
+        for key, ranges in other.ranges.items():
+            self.ranges.setdefault(key, set()).update(ranges)
+        for p, ranges in other.declared_ranges.items():
+            self.declared_ranges.setdefault(p, set()).update(ranges)
+        self.subclass_edges.update(other.subclass_edges)
+        self.predicate_iris.update(other.predicate_iris)
+        for iri, label in other.labels.items():
+            self.labels.setdefault(iri, label)
+        for iri, label in other.candidate_labels.items():
+            self.candidate_labels.setdefault(iri, label)
+
+        for subject, classes in list(other.types.items()):
+            self._resolve(subject, classes)
+        for o, keys in other.pending.items():
+            classes = self.types.get(o)
+            if classes is not None:
+                for key in keys:
+                    self.ranges.setdefault(key, set()).update(classes)
+            else:
+                self.pending.setdefault(o, set()).update(keys)
+        for subject, classes in other.types.items():
+            self._cache_types(subject, classes)
+        self.reservoirs = {}
+        self.statements += other.statements
+
+        return self
+
+    def molecules(self, collect_labels=False, collect_stats=False, include=None):
+        """Descriptions of the RDF-MTs of the summary, in the format of RDFMTExtractor.get_concepts/get_predicates
+
+        :param collect_labels: whether labels are set. default: False
+        :param collect_stats: whether cardinalities are set. Class cardinalities are estimates, with their bounds in
+                    'card_bounds'. default: False
+        :param include: if given, only classes in {include} are described
+        :return: generator of (concept dict, list of predicate dicts, dict of predicate -> list of ranges)
+        """
+
+        hierarchy = ClassHierarchy(self.subclass_edges)
+        for c in sorted(self.instances):
+            if True in [m in c for m in metas] or (include is not None and c not in include):
+                continue
+            concept = {'t': c,
+                       'subClassOf': [{'sc': sc} for sc in hierarchy.superclasses(c)
+                                      if True not in [m in sc for m in metas]]}
+            if collect_labels:
+                concept['label'] = self._label(c)
+            if collect_stats:
+                sketch = self.instances[c]
+                card = sketch.count()
+                concept['card'] = card
+                error = 2 * sketch.error()
+                concept['card_bounds'] = (int(card * (1 - error)), int(card * (1 + error)) + 1)
+
+            preds = []
+            ranges = {}
+            for p, n in sorted(self.predicates.get(c, {}).items()):
+                pred = {'p': p}
+                if collect_labels:
+                    pred['label'] = self._label(p)
+                if collect_stats:
+                    pred['card'] = n
+                preds.append(pred)
+                ranges[p] = sorted(self.ranges.get((c, p), set()) | self.declared_ranges.get(p, set()))
+
+            yield concept, preds, ranges
+
+    def _label(self, iri):
+        return self.labels.get(iri, self.candidate_labels.get(iri, iri))
+
+
+def parse_statement(line):
+    """Parses an N-Triples or N-Quads statement; the graph of a quad is ignored
+
+    :param line: statement
+    :return: (subject, predicate, object) or None if the line is not a statement. IRIs are returned without <>,
+                blank nodes as _:label and literals as in the dump ("value"@lang or "value"^^<datatype>)
+    """
+
+    m = _STATEMENT.match(line)
+    if m is None:
+        return None
+    s, p, o = m.groups()
+    if s[0] == '<':
+        s = s[1:-1]
+    if o[0] == '<':
+        o = o[1:-1]
+
+    return s, p, o
+
+
+def dump_files(path):
+    """N-Triples/N-Quads files of a dump: {path} itself if it is a file, else the dump files in the folder {path}
+
+    :param path: path or file:// url of a file or folder
+    :return: sorted list of paths
+    """
+
+    if path.startswith('file://'):
+        path = path[len('file://'):]
+    if not os.path.isdir(path):
+        return [path]
+
+    files = []
+    for root, _, names in os.walk(path):
+        files.extend([os.path.join(root, n) for n in names if n.lower().endswith(DUMP_EXTENSIONS)])
+
+    return sorted(files)
+
+
+def summarize_dump(path, processes=1, chunk_size=64 * 1024 * 1024, **options):
+    """Reads the dump at {path} and returns its summary
+
+    With {processes} > 1, files are read by separate processes, and uncompressed files larger than {chunk_size}
+    bytes are split into parts that start at a change of subject. The summaries of the parts are merged in order.
+
+    :param path: path or file:// url of a dump file or a folder of dump files (optionally gzip compressed)
+    :param processes: number of processes. default: 1
+    :param chunk_size: size in bytes of the parts uncompressed files are split into, if {processes} > 1
+    :param options: parameters of DumpSummary
+    :return: DumpSummary
+    """
+
+    parts = []
+    for f in dump_files(path):
+        size = os.path.getsize(f)
+        if processes > 1 and not f.endswith('.gz') and size > chunk_size:
+            bounds = [0] + [_run_boundary(f, offset) for offset in range(chunk_size, size, chunk_size)] + [size]
+            bounds = sorted(set(bounds))
+            parts.extend([(f, bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)])
+        else:
+            parts.append((f, 0, -1))
+
+    if processes > 1 and len(parts) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            summaries = list(executor.map(_summarize_part, parts, [options] * len(parts)))
+    else:
+        summaries = [_summarize_part(part, options) for part in parts]
+
+    if len(summaries) == 0:
+        return DumpSummary(**options)
+    summary = summaries[0]
+    for other in summaries[1:]:
+        summary.merge(other)
+
+    return summary
+
+
+def _summarize_part(part, options):
+    path, start, end = part
+    summary = DumpSummary(**options)
+    subject = None
+    statements = []
+    with _open(path) as f:
+        if start > 0:
+            f.seek(start)
+        position = start
+        for raw in f:
+            position += len(raw)
+            statement = parse_statement(raw.decode('utf-8', errors='replace'))
+            if statement is not None:
+                s, p, o = statement
+                if s != subject:
+                    if subject is not None:
+                        summary.add_run(subject, statements)
+                    subject = s
+                    statements = []
+                statements.append((p, o))
+            if 0 <= end <= position:
+                break
+    if subject is not None:
+        summary.add_run(subject, statements)
+
+    return summary
+
+
+def _run_boundary(path, offset):
+    # offset of the first statement at or after {offset} whose subject differs from the one of the statement it
+    # follows, so that runs of a subject are not split between parts
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        f.readline()
+        position = f.tell()
+        subject = None
+        for raw in iter(f.readline, b''):
+            statement = parse_statement(raw.decode('utf-8', errors='replace'))
+            if statement is not None:
+                if subject is not None and statement[0] != subject:
+                    return position
+                subject = statement[0]
+            position += len(raw)
+
+        return position
+
+
+def _open(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def _is_resource(term):
+    return term[0] != '"'
+
+
+def _literal_datatype(literal):
+    end = literal.rfind('"')
+    suffix = literal[end + 1:]
+    if suffix.startswith('^^<'):
+        return suffix[3:-1]
+    if suffix.startswith('@'):
+        return RDF_LANGSTRING
+
+    return XSD_STRING
+
+
+_ESCAPE = re.compile(r'\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)')
+_ESCAPES = {'t': '\t', 'b': '\b', 'n': '\n', 'r': '\r', 'f': '\f'}
+
+
+def _unescape(m):
+    code = m.group(1)
+    if code[0] in 'uU' and len(code) > 1:
+        return chr(int(code[1:], 16))
+
+    return _ESCAPES.get(code, code)
+
+
+def _literal_label(literal):
+    # label in the format of RDFMTExtractor.get_labels: value@lang for language tagged literals
+    end = literal.rfind('"')
+    value = _ESCAPE.sub(_unescape, literal[1:end])
+    suffix = literal[end + 1:]
+    if suffix.startswith('@'):
+        return value + suffix
+
+    return value
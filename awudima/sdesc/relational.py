@@ -0,0 +1,388 @@
+import os
+import re
+import urllib.parse
+
+XSD = 'http://www.w3.org/2001/XMLSchema#'
+RDF_JSON = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#JSON'
+
+# SQL column types (lower case, without length/precision arguments) -> xsd datatypes
+SQL_TYPES = {
+    'int': 'integer', 'integer': 'integer', 'smallint': 'integer', 'bigint': 'integer', 'tinyint': 'integer',
+    'mediumint': 'integer', 'int2': 'integer', 'int4': 'integer', 'int8': 'integer', 'serial': 'integer',
+    'smallserial': 'integer', 'bigserial': 'integer',
+    'decimal': 'decimal', 'numeric': 'decimal', 'money': 'decimal',
+    'real': 'float', 'float4': 'float',
+    'float': 'double', 'float8': 'double', 'double': 'double', 'double precision': 'double',
+    'boolean': 'boolean', 'bool': 'boolean',
+    'char': 'string', 'character': 'string', 'varchar': 'string', 'character varying': 'string', 'nchar': 'string',
+    'nvarchar': 'string', 'text': 'string', 'tinytext': 'string', 'mediumtext': 'string', 'longtext': 'string',
+    'clob': 'string', 'uuid': 'string', 'enum': 'string', 'set': 'string', 'citext': 'string',
+    'date': 'date',
+    'time': 'time', 'time without time zone': 'time', 'time with time zone': 'time', 'timetz': 'time',
+    'datetime': 'dateTime', 'timestamp': 'dateTime', 'timestamp without time zone': 'dateTime',
+    'timestamp with time zone': 'dateTime', 'timestamptz': 'dateTime',
+    'year': 'gYear', 'interval': 'duration',
+    'binary': 'hexBinary', 'varbinary': 'hexBinary', 'blob': 'hexBinary', 'tinyblob': 'hexBinary',
+    'mediumblob': 'hexBinary', 'longblob': 'hexBinary', 'bytea': 'hexBinary',
+}
+
+_TYPE_ARGS = re.compile(r'\s*\(.*?\)')
+
+# catalog queries of each dialect, each one reading all tables at once
+SQLITE_COLUMNS = "SELECT m.name, p.name, p.type, p.\"notnull\", p.pk " \
+                 "FROM sqlite_master m JOIN pragma_table_info(m.name) p " \
+                 "WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite\\_%' ESCAPE '\\' " \
+                 "ORDER BY m.name, p.cid"
+SQLITE_FOREIGN_KEYS = "SELECT m.name, f.id, f.\"from\", f.\"table\", f.\"to\" " \
+                      "FROM sqlite_master m JOIN pragma_foreign_key_list(m.name) f " \
+                      "WHERE m.type = 'table' " \
+                      "ORDER BY m.name, f.id, f.seq"
+SQLITE_ROWS = "SELECT tbl, MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 GROUP BY tbl"
+
+POSTGRES_COLUMNS = "SELECT c.table_schema, c.table_name, c.column_name, c.data_type, c.is_nullable " \
+                   "FROM information_schema.columns c JOIN information_schema.tables t " \
+                   "ON t.table_schema = c.table_schema AND t.table_name = c.table_name " \
+                   "WHERE t.table_type = 'BASE TABLE' {schema} " \
+                   "ORDER BY c.table_schema, c.table_name, c.ordinal_position"
+POSTGRES_FOREIGN_KEYS = "SELECT ns.nspname, cl.relname, con.conname, a.attname, rns.nspname, rcl.relname, ra.attname " \
+                        "FROM pg_constraint con " \
+                        "JOIN pg_class cl ON cl.oid = con.conrelid " \
+                        "JOIN pg_namespace ns ON ns.oid = cl.relnamespace " \
+                        "JOIN pg_class rcl ON rcl.oid = con.confrelid " \
+                        "JOIN pg_namespace rns ON rns.oid = rcl.relnamespace " \
+                        "CROSS JOIN LATERAL unnest(con.conkey, con.confkey) WITH ORDINALITY AS k(attnum, refnum, n) " \
+                        "JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum " \
+                        "JOIN pg_attribute ra ON ra.attrelid = con.confrelid AND ra.attnum = k.refnum " \
+                        "WHERE con.contype = 'f' {schema} " \
+                        "ORDER BY ns.nspname, cl.relname, con.conname, k.n"
+POSTGRES_ROWS = "SELECT n.nspname, c.relname, c.reltuples " \
+                "FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace " \
+                "WHERE c.relkind IN ('r', 'p') {schema}"
+POSTGRES_STATS = "SELECT schemaname, tablename, attname, null_frac, n_distinct FROM pg_stats WHERE TRUE {schema}"
+POSTGRES_SYSTEM_SCHEMAS = "NOT IN ('pg_catalog', 'information_schema', 'pg_toast')"
+
+MYSQL_COLUMNS = "SELECT c.TABLE_SCHEMA, c.TABLE_NAME, c.COLUMN_NAME, c.DATA_TYPE, c.IS_NULLABLE " \
+                "FROM information_schema.COLUMNS c JOIN information_schema.TABLES t " \
+                "ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME " \
+                "WHERE t.TABLE_TYPE = 'BASE TABLE' AND c.TABLE_SCHEMA = {schema} " \
+                "ORDER BY c.TABLE_SCHEMA, c.TABLE_NAME, c.ORDINAL_POSITION"
+MYSQL_FOREIGN_KEYS = "SELECT TABLE_SCHEMA, TABLE_NAME, CONSTRAINT_NAME, COLUMN_NAME, REFERENCED_TABLE_SCHEMA, " \
+                     "REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME " \
+                     "FROM information_schema.KEY_COLUMN_USAGE " \
+                     "WHERE REFERENCED_TABLE_NAME IS NOT NULL AND TABLE_SCHEMA = {schema} " \
+                     "ORDER BY TABLE_SCHEMA, TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION"
+MYSQL_ROWS = "SELECT TABLE_SCHEMA, TABLE_NAME, TABLE_ROWS FROM information_schema.TABLES " \
+             "WHERE TABLE_TYPE = 'BASE TABLE' AND TABLE_SCHEMA = {schema}"
+
+
+class Table:
+    """Catalog entry of a table: its columns, foreign keys and estimated number of rows"""
+
+    __slots__ = ('name', 'columns', 'foreign_keys', 'rows')
+
+    def __init__(self, name):
+        self.name = name
+        # list of dicts with name, type, nullable and, if known, null_ratio and distinct
+        self.columns = []
+        # list of (list of columns, referenced table name, list of referenced columns)
+        self.foreign_keys = []
+        # estimated number of rows from planner statistics, -1 if unknown
+        self.rows = -1
+
+
+def connect(dialect, url, params=None):
+    """Opens a DB-API connection to a relational database
+
+    Database drivers are optional: sqlite3 comes with python, psycopg2 is needed for Postgres and pymysql for MySQL.
+
+    :param dialect: 'sqlite', 'postgres' or 'mysql'
+    :param url: path of a SQLite database (or sqlite:///path), or postgresql:// or mysql:// url of the database
+    :param params: dict that may hold user and password, if they are not in {url}
+    :return: DB-API connection
+    """
+
+    params = params if params is not None else {}
+    if dialect == 'sqlite':
+        import sqlite3
+
+        path = url[len('sqlite:///'):] if url.startswith('sqlite:///') else url
+        if path.startswith('file://'):
+            path = path[len('file://'):]
+        # read-only, so that a wrong path does not create an empty database
+        return sqlite3.connect('file:' + urllib.parse.quote(path) + '?mode=ro', uri=True, check_same_thread=False)
+
+    parts = urllib.parse.urlsplit(url)
+    user = urllib.parse.unquote(parts.username) if parts.username else params.get('user')
+    password = urllib.parse.unquote(parts.password) if parts.password else params.get('password')
+    database = parts.path.lstrip('/') or params.get('database')
+    if dialect == 'postgres':
+        try:
+            import psycopg2
+        except ImportError:
+            raise Exception("psycopg2 is required to read Postgres data sources")
+        return psycopg2.connect(host=parts.hostname, port=parts.port or 5432, user=user, password=password,
+                                dbname=database)
+    if dialect == 'mysql':
+        try:
+            import pymysql
+        except ImportError:
+            raise Exception("pymysql is required to read MySQL data sources")
+        return pymysql.connect(host=parts.hostname, port=parts.port or 3306, user=user, password=password,
+                               database=database)
+
+    raise Exception("Unsupported relational dialect " + str(dialect))
+
+
+def default_base_iri(dialect, url):
+    """IRI prefix of the RDF-MTs of a database, if the data source does not set base_iri: its url without credentials
+
+    :param dialect: 'sqlite', 'postgres' or 'mysql'
+    :param url: url of the database, as given to connect
+    :return: IRI ending with '/'
+    """
+
+    if dialect == 'sqlite':
+        path = url[len('sqlite:///'):] if url.startswith('sqlite:///') else url
+        if not path.startswith('file://'):
+            path = 'file://' + urllib.parse.quote(os.path.abspath(path))
+        return path.rstrip('/') + '/'
+
+    parts = urllib.parse.urlsplit(url)
+    netloc = parts.hostname or ''
+    if parts.port is not None:
+        netloc += ':' + str(parts.port)
+
+    return urllib.parse.urlunsplit((parts.scheme, netloc, parts.path.rstrip('/'), '', '')) + '/'
+
+
+def read_catalog(conn, dialect, schema=None):
+    """Reads the tables, columns, foreign keys and row estimates of a database with a few catalog queries
+
+    The number of queries does not depend on the number of tables. Row estimates come from planner statistics:
+    sqlite_stat1 (filled by ANALYZE) for SQLite, pg_class.reltuples for Postgres and TABLES.TABLE_ROWS for MySQL.
+    For Postgres, pg_stats also gives the null ratio and number of distinct values of analyzed columns.
+
+    :param conn: DB-API connection
+    :param dialect: 'sqlite', 'postgres' or 'mysql'
+    :param schema: schema whose tables are read. default: all non-system schemas for Postgres, the database of the
+                connection for MySQL
+    :return: dict of table name -> Table, table names are qualified with their schema unless it is the default one
+    """
+
+    if dialect == 'sqlite':
+        return _read_sqlite(conn)
+    if dialect == 'postgres':
+        return _read_postgres(conn, schema)
+    if dialect == 'mysql':
+        return _read_mysql(conn, schema)
+
+    raise Exception("Unsupported relational dialect " + str(dialect))
+
+
+def molecules(tables, base_iri, collect_stats=False):
+    """Describes each table of {tables} as an RDF-MT, in the format of RDFMTExtractor.get_concepts/get_predicates
+
+    IRIs follow the W3C Direct Mapping: a table is identified by {base_iri}table, its columns by {base_iri}table#column
+    and its foreign keys by {base_iri}table#ref-column1;column2. The range of a column is the xsd datatype of its SQL
+    type, the range of a foreign key is the RDF-MT of the referenced table.
+
+    :param tables: dict of table name -> Table, as returned by read_catalog
+    :param base_iri: IRI prefix of the RDF-MTs
+    :param collect_stats: whether row estimates and column statistics are set. default: False
+    :return: generator of (concept dict, list of predicate dicts, dict of predicate -> list of ranges)
+    """
+
+    for table in tables.values():
+        mtId = table_iri(base_iri, table.name)
+        concept = {'t': mtId, 'label': table.name, 'subClassOf': [{'sc': mtId}]}
+        if collect_stats and table.rows >= 0:
+            concept['card'] = table.rows
+
+        preds = []
+        ranges = {}
+        for column in table.columns:
+            predId = mtId + '#' + _quote(column['name'])
+            pred = {'p': predId, 'label': column['name']}
+            if collect_stats and table.rows >= 0:
+                if 'null_ratio' in column:
+                    pred['card'] = int(round(table.rows * (1 - column['null_ratio'])))
+                    pred['stats'] = {'null_ratio': column['null_ratio'], 'distinct': column['distinct']}
+                elif not column['nullable']:
+                    pred['card'] = table.rows
+            preds.append(pred)
+            ranges[predId] = [sql_datatype(column['type'])]
+
+        nullable = {c['name'] for c in table.columns if c['nullable']}
+        for columns, ref_table, _ in table.foreign_keys:
+            predId = mtId + '#ref-' + ';'.join([_quote(c) for c in columns])
+            pred = {'p': predId, 'label': 'ref-' + ';'.join(columns)}
+            if collect_stats and table.rows >= 0 and len(nullable.intersection(columns)) == 0:
+                pred['card'] = table.rows
+            preds.append(pred)
+            ranges[predId] = [table_iri(base_iri, ref_table)]
+
+        yield concept, preds, ranges
+
+
+def table_iri(base_iri, name):
+    return base_iri + _quote(name)
+
+
+def sql_datatype(sql_type):
+    """xsd datatype of a SQL column type
+
+    Other types, e.g., free-form declared types of SQLite columns, are mapped following SQLite's type affinity rules
+    for the INTEGER, TEXT, BLOB and REAL affinities, and to xsd:string otherwise.
+
+    :param sql_type: declared type of the column, e.g., VARCHAR(20)
+    :return: datatype IRI
+    """
+
+    name = _TYPE_ARGS.sub('', (sql_type or '').lower()).replace(' unsigned', '').strip()
+    if name in ('json', 'jsonb'):
+        return RDF_JSON
+    if name in SQL_TYPES:
+        return XSD + SQL_TYPES[name]
+    if 'int' in name:
+        return XSD + 'integer'
+    if 'char' in name or 'clob' in name or 'text' in name:
+        return XSD + 'string'
+    if name == '' or 'blob' in name:
+        return XSD + 'hexBinary'
+    if 'real' in name or 'floa' in name or 'doub' in name:
+        return XSD + 'double'
+    if name.startswith('timestamp') or name.startswith('datetime'):
+        return XSD + 'dateTime'
+
+    return XSD + 'string'
+
+
+def _read_sqlite(conn):
+    tables = {}
+    cur = conn.cursor()
+    cur.execute(SQLITE_COLUMNS)
+    for name, column, sql_type, notnull, pk in cur.fetchall():
+        table = tables.get(name)
+        if table is None:
+            table = tables[name] = Table(name)
+        table.columns.append({'name': column, 'type': sql_type, 'nullable': not (notnull or pk), 'pk': pk})
+
+    cur.execute(SQLITE_FOREIGN_KEYS)
+    keys = {}
+    for name, fkid, column, ref_table, ref_column in cur.fetchall():
+        keys.setdefault((name, fkid), (ref_table, []))[1].append((column, ref_column))
+    for (name, _), (ref_table, pairs) in keys.items():
+        if name not in tables:
+            continue
+        ref_columns = [r for _, r in pairs]
+        if None in ref_columns and ref_table in tables:
+            # a foreign key without referenced columns references the primary key
+            pk = sorted([c for c in tables[ref_table].columns if c['pk']], key=lambda c: c['pk'])
+            ref_columns = [c['name'] for c in pk]
+        tables[name].foreign_keys.append(([c for c, _ in pairs], ref_table, ref_columns))
+
+    try:
+        cur.execute(SQLITE_ROWS)
+        for name, rows in cur.fetchall():
+            if name in tables and rows is not None:
+                tables[name].rows = rows
+    except conn.OperationalError:
+        # the database has not been analyzed (no sqlite_stat1 table)
+        pass
+    cur.close()
+
+    return tables
+
+
+def _read_postgres(conn, schema=None):
+    if schema is not None:
+        schema_cond = "= '" + schema.replace("'", "''") + "'"
+    else:
+        schema_cond = POSTGRES_SYSTEM_SCHEMAS
+
+    tables = {}
+    cur = conn.cursor()
+    cur.execute(POSTGRES_COLUMNS.format(schema='AND c.table_schema ' + schema_cond))
+    for nsp, name, column, sql_type, nullable in cur.fetchall():
+        name = _qualified(nsp, name, 'public')
+        table = tables.get(name)
+        if table is None:
+            table = tables[name] = Table(name)
+        table.columns.append({'name': column, 'type': sql_type, 'nullable': nullable == 'YES'})
+
+    cur.execute(POSTGRES_FOREIGN_KEYS.format(schema='AND ns.nspname ' + schema_cond))
+    _add_foreign_keys(tables, cur.fetchall(), 'public')
+
+    cur.execute(POSTGRES_ROWS.format(schema='AND n.nspname ' + schema_cond))
+    for nsp, name, rows in cur.fetchall():
+        name = _qualified(nsp, name, 'public')
+        # reltuples is -1 (or 0 before Postgres 14) for tables never vacuumed or analyzed
+        if name in tables and rows is not None and rows >= 0:
+            tables[name].rows = int(rows)
+
+    cur.execute(POSTGRES_STATS.format(schema='AND schemaname ' + schema_cond))
+    columns = {(t.name, c['name']): (t, c) for t in tables.values() for c in t.columns}
+    for nsp, name, column, null_frac, n_distinct in cur.fetchall():
+        table, c = columns.get((_qualified(nsp, name, 'public'), column), (None, None))
+        if table is None or table.rows < 0:
+            continue
+        c['null_ratio'] = null_frac
+        # negative n_distinct is the ratio of distinct values to rows
+        c['distinct'] = int(round(-n_distinct * table.rows)) if n_distinct < 0 else int(n_distinct)
+    cur.close()
+
+    return tables
+
+
+def _read_mysql(conn, schema=None):
+    cur = conn.cursor()
+    # the database of the connection, whose tables are named without their database name
+    if schema is None:
+        cur.execute("SELECT DATABASE()")
+        row = cur.fetchone()
+        schema = row[0] if row is not None else None
+    schema_cond = "'" + schema.replace("'", "''") + "'" if schema is not None else 'DATABASE()'
+
+    tables = {}
+    cur.execute(MYSQL_COLUMNS.format(schema=schema_cond))
+    for _, name, column, sql_type, nullable in cur.fetchall():
+        table = tables.get(name)
+        if table is None:
+            table = tables[name] = Table(name)
+        table.columns.append({'name': column, 'type': sql_type, 'nullable': nullable == 'YES'})
+
+    cur.execute(MYSQL_FOREIGN_KEYS.format(schema=schema_cond))
+    # referenced tables in other databases keep their database name
+    _add_foreign_keys(tables, cur.fetchall(), schema)
+
+    cur.execute(MYSQL_ROWS.format(schema=schema_cond))
+    for _, name, rows in cur.fetchall():
+        if name in tables and rows is not None:
+            tables[name].rows = int(rows)
+    cur.close()
+
+    return tables
+
+
+def _add_foreign_keys(tables, rows, default_schema):
+    # rows: (schema, table, constraint, column, referenced schema, referenced table, referenced column)
+    keys = {}
+    for nsp, name, constraint, column, ref_nsp, ref_name, ref_column in rows:
+        key = (_qualified(nsp, name, default_schema), constraint)
+        if key not in keys:
+            keys[key] = ([], _qualified(ref_nsp, ref_name, default_schema), [])
+        keys[key][0].append(column)
+        keys[key][2].append(ref_column)
+    for (name, _), fk in keys.items():
+        if name in tables:
+            tables[name].foreign_keys.append(fk)
+
+
+def _qualified(schema, name, default_schema):
+    if schema is None or schema == default_schema:
+        return name
+    return schema + '.' + name
+
+
+def _quote(name):
+    return urllib.parse.quote(name, safe='.')
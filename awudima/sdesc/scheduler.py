@@ -0,0 +1,161 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# status codes returned as cardinality by contact_sparql_endpoint when a query fails
+RESULT_LIMIT = -2        # the result is too large for the endpoint: retry with a smaller LIMIT
+TIMEOUT = -3             # no (complete) response in time
+SERVER_ERROR = -4        # 5xx or 429 response: the endpoint is overloaded or temporarily unavailable
+CONNECTION_ERROR = -5    # the endpoint could not be reached
+QUERY_ERROR = -6         # any other response, e.g., the query is rejected
+
+# failures that may succeed if the same query is sent again later
+RETRYABLE = (TIMEOUT, SERVER_ERROR, CONNECTION_ERROR)
+
+
+class EndpointScheduler:
+    """Schedules the queries sent to SPARQL endpoints within per-endpoint limits
+
+    Each endpoint gets at most {max_concurrent} queries in flight and at most {requests_per_second} new queries per
+    second. Queries that fail with a transient error (see RETRYABLE) are retried after an exponential backoff with
+    full jitter, up to {max_retries} times per query, as long as the retry budget of the endpoint allows: retries may
+    not exceed {min_retries} plus {retry_ratio} times the number of queries sent to it, so that an endpoint that keeps
+    failing is not hammered with retries. Limits can be overridden per endpoint with {endpoint_limits}.
+    """
+
+    def __init__(self, max_concurrent=8, requests_per_second=None, max_retries=3, backoff=0.5, max_backoff=30.0,
+                 retry_ratio=0.2, min_retries=10, endpoint_limits=None):
+        """
+
+        :param max_concurrent: max number of queries in flight per endpoint, None for unbounded. default: 8
+        :param requests_per_second: max number of queries started per second per endpoint, None for unbounded.
+                    default: None
+        :param max_retries: max number of retries of a query. default: 3
+        :param backoff: base delay in seconds before the first retry, doubled for each further retry. default: 0.5
+        :param max_backoff: max delay in seconds before a retry. default: 30
+        :param retry_ratio: retries allowed per query sent to an endpoint, on top of {min_retries}. default: 0.2
+        :param min_retries: retries allowed to an endpoint regardless of the number of queries. default: 10
+        :param endpoint_limits: dict of endpoint -> dict with any of the keys max_concurrent, requests_per_second and
+                    max_retries, overriding the defaults for that endpoint
+        """
+
+        self.max_concurrent = max_concurrent
+        self.requests_per_second = requests_per_second
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_ratio = retry_ratio
+        self.min_retries = min_retries
+        self.endpoint_limits = endpoint_limits if endpoint_limits is not None else {}
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _state(self, endpoint):
+        state = self._states.get(endpoint)
+        if state is not None:
+            return state
+
+        with self._lock:
+            state = self._states.get(endpoint)
+            if state is None:
+                max_concurrent = self._limit(endpoint, 'max_concurrent')
+                state = {
+                    'slots': threading.BoundedSemaphore(max_concurrent) if max_concurrent is not None else None,
+                    'lock': threading.Lock(),
+                    'next_start': 0.0,
+                    'requests': 0,
+                    'retries': 0,
+                    'failures': {}
+                }
+                self._states[endpoint] = state
+
+        return state
+
+    def _limit(self, endpoint, name):
+        return self.endpoint_limits.get(endpoint, {}).get(name, getattr(self, name))
+
+    @contextmanager
+    def slot(self, endpoint):
+        """Waits until a query may be sent to {endpoint} and holds one of its slots while the query is in flight
+
+        :param endpoint: url of the endpoint
+        :return: context manager
+        """
+
+        state = self._state(endpoint)
+        if state['slots'] is not None:
+            state['slots'].acquire()
+        try:
+            rps = self._limit(endpoint, 'requests_per_second')
+            with state['lock']:
+                now = time.monotonic()
+                start = max(now, state['next_start'])
+                if rps:
+                    state['next_start'] = start + 1.0 / rps
+                state['requests'] += 1
+            if start > now:
+                time.sleep(start - now)
+            yield
+        finally:
+            if state['slots'] is not None:
+                state['slots'].release()
+
+    def run(self, endpoint, send):
+        """Sends a query with {send} within the limits of {endpoint}, retrying it on transient failures
+
+        :param endpoint: url of the endpoint
+        :param send: function without arguments that sends the query and returns (result, card) as returned by
+                    contact_sparql_endpoint, with card < 0 (one of the status codes of this module) on failure
+        :return: (result, card) of the last attempt
+        """
+
+        state = self._state(endpoint)
+        max_retries = self._limit(endpoint, 'max_retries')
+        attempt = 0
+        while True:
+            with self.slot(endpoint):
+                res, card = send()
+            if card >= 0 or card not in RETRYABLE:
+                break
+            with state['lock']:
+                state['failures'][card] = state['failures'].get(card, 0) + 1
+                # the retry is itself a request, and must fit into the budget once it is sent
+                if attempt >= max_retries or \
+                        state['retries'] + 1 > self.min_retries + self.retry_ratio * (state['requests'] + 1):
+                    break
+                state['retries'] += 1
+            time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+            attempt += 1
+
+        if card < 0 and card not in RETRYABLE:
+            with state['lock']:
+                state['failures'][card] = state['failures'].get(card, 0) + 1
+
+        return res, card
+
+    def stats(self):
+        """Returns the number of queries, retries and failures (per status code) of each endpoint
+
+        :return: dict of endpoint -> dict with requests, retries and failures
+        """
+
+        with self._lock:
+            states = dict(self._states)
+
+        return {endpoint: {'requests': state['requests'],
+                           'retries': state['retries'],
+                           'failures': dict(state['failures'])}
+                for endpoint, state in states.items()}
+
+
+_default_scheduler = EndpointScheduler()
+
+
+def get_scheduler():
+    """Returns the scheduler shared by all queries that are not given a scheduler of their own
+
+    :return: EndpointScheduler
+    """
+
+    return _default_scheduler
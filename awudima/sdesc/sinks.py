@@ -0,0 +1,133 @@
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+
+class MoleculeSink(ABC):
+    """Destination of the RDF-MTs produced by an RDFMTExtractor
+
+    Each RDF-MT is written as soon as its extraction is complete. If {in_memory} is False, the extractor does not keep
+    the written RDF-MTs, so memory use stays bounded regardless of the size of the crawl.
+    """
+
+    in_memory = False
+
+    @abstractmethod
+    def write(self, rdfmt):
+        """Writes a complete RDF-MT
+
+        :param rdfmt: RDFMT
+        :return:
+        """
+
+    def close(self):
+        pass
+
+
+class MemorySink(MoleculeSink):
+    """Keeps RDF-MTs in memory; they are returned by RDFMTExtractor.get_molecules"""
+
+    in_memory = True
+
+    def write(self, rdfmt):
+        pass
+
+
+class JSONLinesSink(MoleculeSink):
+    """Appends one JSON representation of an RDF-MT per line to a file, flushed after each RDF-MT"""
+
+    def __init__(self, path, mode='a'):
+        """
+
+        :param path: path to the JSON-lines file
+        :param mode: 'a' to append to an existing file, 'w' to overwrite it. default: 'a'
+        """
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, mode, encoding='utf-8')
+
+    def write(self, rdfmt):
+        line = json.dumps(rdfmt.to_json(), ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class SQLiteSink(MoleculeSink):
+    """Stores the JSON representation of each RDF-MT in a SQLite table, one row per (mtId, data source)"""
+
+    def __init__(self, path, table='rdfmts'):
+        """
+
+        :param path: path to the SQLite database file
+        :param table: name of the table. default: rdfmts
+        """
+
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS " + table + " ("
+                           " mtId TEXT, dsId TEXT, rdfmt TEXT, PRIMARY KEY (mtId, dsId))")
+        self._conn.commit()
+
+    def write(self, rdfmt):
+        value = json.dumps(rdfmt.to_json(), ensure_ascii=False, separators=(',', ':'))
+        dsIds = [ds.dsId for ds in rdfmt.datasources] or ['']
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO " + self.table + " VALUES (?, ?, ?)",
+                                   [(rdfmt.mtId, dsId, value) for dsId in dsIds])
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CallbackSink(MoleculeSink):
+    """Passes each RDF-MT to a callback function"""
+
+    def __init__(self, callback):
+        """
+
+        :param callback: function called with each complete RDFMT
+        """
+
+        self.callback = callback
+
+    def write(self, rdfmt):
+        self.callback(rdfmt)
+
+
+def create_sink(sink_type='memory', path_to_sink='', params=None):
+    """Creates the sink of the given type
+
+    :param sink_type: one of 'memory', 'jsonl' (or 'json'), 'sqlite' and 'callback'
+    :param path_to_sink: path to the JSON-lines or SQLite file
+    :param params: other parameters: 'callback' (function) for callback sinks, 'sink_mode' ('a' or 'w') for JSON-lines
+                sinks, 'sink_table' for SQLite sinks
+    :return: MoleculeSink
+    """
+
+    if params is None:
+        params = {}
+    if sink_type == 'memory':
+        return MemorySink()
+    if sink_type in ('jsonl', 'json', 'sqlite') and (path_to_sink is None or len(path_to_sink) == 0):
+        raise Exception("path_to_sink is required for " + sink_type + " sinks")
+    if sink_type in ('jsonl', 'json'):
+        return JSONLinesSink(path_to_sink, mode=params.get('sink_mode', 'a'))
+    if sink_type == 'sqlite':
+        return SQLiteSink(path_to_sink, table=params.get('sink_table', 'rdfmts'))
+    if sink_type == 'callback':
+        if params.get('callback') is None:
+            raise Exception("params['callback'] is required for callback sinks")
+        return CallbackSink(params['callback'])
+
+    raise Exception("Unknown sink type " + str(sink_type))
@@ -0,0 +1,189 @@
+import json
+import mmap
+import struct
+
+from awudima.sdesc import Federation, DataSource, RDFMT
+
+# Layout of a snapshot file:
+#   header:  magic, version, number of RDF-MTs, offset of the index, offset and length of the metadata record
+#   records: one JSON encoded RDF-MT per record, with data sources given by their dsId
+#   meta:    JSON encoded federation description and its data sources
+#   keys:    utf-8 encoded mtIds, concatenated
+#   index:   one (key offset, key length, record offset, record length) entry per RDF-MT, sorted by mtId bytes
+MAGIC = b'RDFMTSNP'
+VERSION = 1
+_HEADER = struct.Struct('<8sIIQQI')
+_ENTRY = struct.Struct('<QIQI')
+
+
+def write_snapshot(federation, path):
+    """Writes a binary snapshot of {federation} that can be opened with CatalogSnapshot
+
+    RDF-MT records are written one at a time; only their offsets are kept in memory to build the index.
+
+    :param federation: Federation
+    :param path: path of the snapshot file
+    :return:
+    """
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, 0, 0, 0, 0))
+
+        sources = {}
+        entries = []
+        for r in federation.rdfmts:
+            for ds in r.datasources:
+                sources[ds.dsId] = ds
+            record = _encode(r.to_json(datasource_ids=True))
+            entries.append((r.mtId.encode('utf-8'), f.tell(), len(record)))
+            f.write(record)
+
+        members = set([ds.dsId for ds in federation.datasources])
+        for ds in federation.datasources:
+            sources[ds.dsId] = ds
+        meta = _encode({
+            "fedId": federation.fedId,
+            "name": federation.name,
+            "desc": federation.desc,
+            "sources": [dict(ds.to_json(), member=ds.dsId in members) for ds in sources.values()]
+        })
+        meta_offset = f.tell()
+        f.write(meta)
+
+        entries.sort()
+        key_offsets = []
+        for key, _, _ in entries:
+            key_offsets.append(f.tell())
+            f.write(key)
+
+        index_offset = f.tell()
+        for (key, offset, length), key_offset in zip(entries, key_offsets):
+            f.write(_ENTRY.pack(key_offset, len(key), offset, length))
+
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, VERSION, len(entries), index_offset, meta_offset, len(meta)))
+
+
+class CatalogSnapshot:
+    """Read-only federation catalog backed by a memory-mapped snapshot file
+
+    Opening a snapshot only reads its header and the federation metadata; RDF-MTs are decoded from the mapped file
+    when they are first accessed by mtId (binary search over the sorted index), and then kept.
+    """
+
+    def __init__(self, path):
+        """
+
+        :param path: path of a snapshot file written by write_snapshot
+        """
+
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._count, self._index_offset, meta_offset, meta_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise Exception("Not an RDF-MT catalog snapshot: " + path)
+
+        meta = json.loads(self._mm[meta_offset: meta_offset + meta_len].decode('utf-8'))
+        self.fedId = meta['fedId']
+        self.name = meta['name']
+        self.desc = meta['desc']
+        self.datasources = set()
+        self._sources = {}
+        for d in meta['sources']:
+            ds = DataSource.from_json(d)
+            self._sources[ds.dsId] = ds
+            if d.get('member', True):
+                self.datasources.add(ds)
+        self._rdfmts = {}
+
+    def _entry(self, i):
+        return _ENTRY.unpack_from(self._mm, self._index_offset + i * _ENTRY.size)
+
+    def _key(self, i):
+        key_offset, key_len, _, _ = self._entry(i)
+        return self._mm[key_offset: key_offset + key_len]
+
+    def _find(self, mtId):
+        key = mtId.encode('utf-8')
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self._key(lo) == key:
+            return lo
+
+        return -1
+
+    def get(self, mtId, default=None):
+        """Returns the RDF-MT with the given {mtId}, decoding it on first access
+
+        :param mtId: id of the RDF-MT
+        :param default: value returned if there is no such RDF-MT
+        :return: RDFMT
+        """
+
+        if mtId in self._rdfmts:
+            return self._rdfmts[mtId]
+        i = self._find(mtId)
+        if i < 0:
+            return default
+
+        _, _, offset, length = self._entry(i)
+        rdfmt = RDFMT.from_json(json.loads(self._mm[offset: offset + length].decode('utf-8')), self._sources)
+        self._rdfmts[mtId] = rdfmt
+
+        return rdfmt
+
+    def mtIds(self):
+        """Ids of all RDF-MTs in the snapshot, in sorted order, without decoding the RDF-MTs
+
+        :return: generator of mtIds
+        """
+
+        for i in range(self._count):
+            yield self._key(i).decode('utf-8')
+
+    def to_federation(self):
+        """Decodes all RDF-MTs into a Federation
+
+        :return: Federation
+        """
+
+        federation = Federation(self.fedId, self.name, self.desc)
+        for ds in self.datasources:
+            federation.addSource(ds)
+        for mtId in self.mtIds():
+            federation.addRDFMT(self[mtId])
+
+        return federation
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __getitem__(self, mtId):
+        rdfmt = self.get(mtId)
+        if rdfmt is None:
+            raise KeyError(mtId)
+        return rdfmt
+
+    def __contains__(self, mtId):
+        return mtId in self._rdfmts or self._find(mtId) >= 0
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _encode(record):
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
@@ -0,0 +1,180 @@
+import codecs
+import json
+
+
+class SPARQLJSONError(ValueError):
+    """Raised when a response is not a valid application/sparql-results+json document"""
+    pass
+
+
+_WHITESPACE = ' \t\n\r'
+_decoder = json.JSONDecoder()
+
+
+def flatten_term(props):
+    """Flattens an RDF term of a SPARQL JSON binding into a string
+
+    Typed literals get their datatype appended as value^^<datatype>, and language tagged literals get their tag
+    appended as value@lang. Other terms are returned as their plain value.
+
+    :param props: dict representation of the RDF term, e.g., {'type': 'uri', 'value': 'http://...'}
+    :return: flat string value of the term
+    """
+
+    value = props['value']
+    if props.get('type') == 'typed-literal':
+        return value + "^^<" + props['datatype'] + ">"
+    if 'xml:lang' in props:
+        return value + '@' + props['xml:lang']
+
+    return value
+
+
+class SPARQLJSONStream:
+    """Incremental decoder of application/sparql-results+json documents
+
+    Reads the document chunk by chunk and yields one flattened binding (a dict of variable -> flat value) at a time,
+    while the rest of the document is still being read. Only the current, not yet decoded part of the document is kept
+    in memory. The result of boolean (ASK) queries is available in {boolean} once the stream is consumed.
+    """
+
+    def __init__(self, chunks, compact_size=65536):
+        """
+
+        :param chunks: iterable of bytes (or str) chunks of the document, e.g., requests.Response.iter_content()
+        :param compact_size: number of consumed characters after which the internal buffer is compacted
+        """
+
+        self.vars = []
+        self.boolean = None
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self._compact_size = compact_size
+
+    def __iter__(self):
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            if key == 'results':
+                yield from self._results()
+            elif key == 'boolean':
+                self.boolean = self._value()
+            elif key == 'head':
+                head = self._value()
+                if isinstance(head, dict):
+                    self.vars = head.get('vars', [])
+            else:
+                self._value()
+            if not self._next_member('}'):
+                break
+
+    def _results(self):
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            if key == 'bindings':
+                self._expect('[')
+                if self._peek() == ']':
+                    self._pos += 1
+                else:
+                    while True:
+                        binding = self._value()
+                        yield {var: flatten_term(props) for var, props in binding.items()}
+                        if not self._next_member(']'):
+                            break
+            else:
+                self._value()
+            if not self._next_member('}'):
+                break
+
+    def _fill(self):
+        if self._eof:
+            return False
+        if self._pos > self._compact_size:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._eof = True
+            self._buf += self._utf8.decode(b'', final=True)
+            return True
+        if isinstance(chunk, bytes):
+            chunk = self._utf8.decode(chunk)
+        self._buf += chunk
+
+        return True
+
+    def _peek(self):
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char):
+        c = self._peek()
+        if c != char:
+            raise SPARQLJSONError("Expected '" + char + "' but found '" + c + "' at position " + str(self._pos))
+        self._pos += 1
+
+    def _next_member(self, closing):
+        c = self._peek()
+        self._pos += 1
+        if c == ',':
+            return True
+        if c == closing:
+            return False
+        raise SPARQLJSONError("Expected ',' or '" + closing + "' but found '" + c + "'")
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+                # a value that ends exactly at the buffer end might continue in the next chunk, e.g., numbers
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self._eof:
+                    raise SPARQLJSONError(str(e))
+            self._fill()
+
+
+def iter_bindings(chunks):
+    """Lazily yields flattened bindings of an application/sparql-results+json document
+
+    :param chunks: iterable of bytes (or str) chunks of the document
+    :return: generator of dicts of variable -> flat value
+    """
+
+    return iter(SPARQLJSONStream(chunks))
+
+
+def parse_results(chunks):
+    """Decodes a whole application/sparql-results+json document
+
+    :param chunks: iterable of bytes (or str) chunks of the document
+    :return: list of flattened bindings for SELECT queries, or the boolean result for ASK queries
+    """
+
+    stream = SPARQLJSONStream(chunks)
+    rows = list(stream)
+    if stream.boolean is not None:
+        return stream.boolean
+
+    return rows
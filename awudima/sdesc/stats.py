@@ -0,0 +1,107 @@
+import hashlib
+import math
+
+
+class HyperLogLog:
+    """Mergeable sketch estimating the number of distinct values added to it
+
+    Uses 2^{precision} one-byte registers, whatever the number of values; the standard error of the estimate is about
+    1.04 / sqrt(2^{precision}), i.e., 1.6% with the default precision. Sketches built over separate parts of the data
+    (e.g., pages of a result, files or worker processes) are combined with merge.
+    """
+
+    def __init__(self, precision=12):
+        """
+
+        :param precision: number of bits of the hash used to select a register, between 4 and 16. default: 12
+        """
+
+        if not 4 <= precision <= 16:
+            raise Exception("HyperLogLog precision must be between 4 and 16, got " + str(precision))
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        """Adds {value} to the sketch
+
+        :param value: str or bytes
+        :return:
+        """
+
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        h = int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), 'big')
+        bits = 64 - self.precision
+        index = h >> bits
+        rank = bits - (h & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        """Adds each of {values} to the sketch
+
+        :param values: iterable of str or bytes
+        :return:
+        """
+
+        for value in values:
+            self.add(value)
+
+    def merge(self, other):
+        """Merges {other} into this sketch in place, so that it estimates the distinct values added to either
+
+        :param other: HyperLogLog with the same precision
+        :return: this HyperLogLog
+        """
+
+        if other.precision != self.precision:
+            raise Exception("Cannot merge HyperLogLog sketches of different precisions")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+        return self
+
+    def count(self):
+        """Estimated number of distinct values added to the sketch
+
+        :return: int
+        """
+
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum([2.0 ** -r for r in self.registers])
+        zeros = self.registers.count(0)
+        # small range correction: linear counting while many registers are still empty
+        if estimate <= 2.5 * m and zeros > 0:
+            estimate = m * math.log(m / zeros)
+
+        return int(round(estimate))
+
+    def error(self):
+        """Relative standard error of the estimate
+
+        :return: float
+        """
+
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def __len__(self):
+        return self.count()
+
+
+def wilson_interval(successes, n, z=1.96):
+    """Wilson score interval of a proportion observed in a sample
+
+    :param successes: number of sampled items with the property
+    :param n: sample size
+    :param z: quantile of the standard normal distribution for the confidence level. default: 1.96 (95%)
+    :return: (low, high) bounds of the proportion, (0.0, 1.0) if {n} is 0
+    """
+
+    if n <= 0:
+        return 0.0, 1.0
+    p = successes / n
+    denominator = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+
+    return max(0.0, center - margin), min(1.0, center + margin)
@@ -0,0 +1,368 @@
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import urllib.parse
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+
+from awudima.sdesc.stats import HyperLogLog
+
+XSD = 'http://www.w3.org/2001/XMLSchema#'
+RDF_JSON = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#JSON'
+
+# candidate datatypes of a column, most specific first; a column gets the first one all of its values match
+DATATYPES = [
+    ('boolean', re.compile(r'(?i:true|false)')),
+    ('integer', re.compile(r'[+-]?\d+')),
+    ('decimal', re.compile(r'[+-]?(?:\d+\.\d*|\.\d+|\d+)')),
+    ('double', re.compile(r'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?|NaN|-?INF')),
+    ('date', re.compile(r'\d{4}-\d{2}-\d{2}')),
+    ('dateTime', re.compile(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?')),
+    ('anyURI', re.compile(r'[A-Za-z][A-Za-z0-9+.\-]*://\S+')),
+]
+
+# values of a cell that stand for a missing value
+NULLS = {'', 'NULL', 'null', 'NA', 'N/A', '\\N'}
+
+TABULAR_EXTENSIONS = {'csv': ('.csv', '.csv.gz'),
+                      'tsv': ('.tsv', '.tsv.gz', '.tab'),
+                      'json': ('.json', '.jsonl', '.ndjson', '.json.gz', '.jsonl.gz', '.ndjson.gz')}
+
+
+class ColumnSummary:
+    """Mergeable summary of the values of a column (or key): counts, null ratio, distinct values and datatype"""
+
+    __slots__ = ('count', 'nulls', 'candidates', 'nested', 'distinct')
+
+    def __init__(self, precision=12):
+        self.count = 0
+        self.nulls = 0
+        # names of the DATATYPES all non-null values seen so far match
+        self.candidates = [name for name, _ in DATATYPES]
+        # whether nested JSON values (objects or arrays) were seen
+        self.nested = False
+        self.distinct = HyperLogLog(precision)
+
+    def add_values(self, values):
+        """Adds a chunk of values of the column
+
+        Each check runs over the whole chunk of a column, and candidate datatypes are dropped as soon as one value
+        does not match them.
+
+        :param values: list of cell values (str, or JSON values)
+        :return:
+        """
+
+        self.count += len(values)
+        present = [v for v in values if v is not None and not (type(v) is str and v in NULLS)]
+        self.nulls += len(values) - len(present)
+        if len(present) == 0:
+            return
+
+        if not all(map(_is_str, present)):
+            if True in [isinstance(v, (dict, list)) for v in present]:
+                self.nested = True
+                present = [json.dumps(v, sort_keys=True) if isinstance(v, (dict, list)) else v for v in present]
+            present = [_json_scalar(v) for v in present]
+        if self.nested:
+            self.candidates = []
+
+        patterns = dict(DATATYPES)
+        self.candidates = [name for name in self.candidates if all(map(patterns[name].fullmatch, present))]
+        self.distinct.update(present)
+
+    def merge(self, other):
+        self.count += other.count
+        self.nulls += other.nulls
+        self.candidates = [name for name in self.candidates if name in other.candidates]
+        self.nested = self.nested or other.nested
+        self.distinct.merge(other.distinct)
+
+        return self
+
+    def datatype(self):
+        """Range of the column: the most specific xsd datatype of its values, rdf:JSON for nested JSON values
+
+        :return: datatype IRI
+        """
+
+        if self.nested:
+            return RDF_JSON
+        if self.nulls == self.count:
+            return XSD + 'string'
+        if len(self.candidates) > 0:
+            return XSD + self.candidates[0]
+
+        return XSD + 'string'
+
+    def null_ratio(self):
+        return self.nulls / self.count if self.count > 0 else 0.0
+
+
+class TableSummary:
+    """Mergeable summary of a tabular file (or of a collection of files with the same kind of records)"""
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.rows = 0
+        # column name -> ColumnSummary, in the order columns are first seen
+        self.columns = {}
+
+    def add_chunk(self, columns, rows):
+        """Adds a chunk of {rows} rows, given column-wise
+
+        :param columns: dict of column name -> list of its values in the chunk (None where a record has no value)
+        :param rows: number of rows of the chunk
+        :return:
+        """
+
+        self.rows += rows
+        for name, values in columns.items():
+            column = self.columns.get(name)
+            if column is None:
+                column = self.columns[name] = ColumnSummary(self.precision)
+                # records read before the column was first seen have no value for it
+                column.count = column.nulls = self.rows - rows
+            column.add_values(values)
+        for name, column in self.columns.items():
+            if name not in columns:
+                column.count += rows
+                column.nulls += rows
+
+    def merge(self, other):
+        for name, column in self.columns.items():
+            if name in other.columns:
+                column.merge(other.columns[name])
+            else:
+                column.count += other.rows
+                column.nulls += other.rows
+        for name, column in other.columns.items():
+            if name not in self.columns:
+                column.count += self.rows
+                column.nulls += self.rows
+                self.columns[name] = column
+        self.rows += other.rows
+
+        return self
+
+    def molecule(self, mtId, collect_stats=False):
+        """Description of the RDF-MT of the table, in the format of RDFMTExtractor.get_concepts/get_predicates
+
+        Predicates are the columns, identified as {mtId}#column. Their cardinality is the number of non-null values,
+        and their stats the null ratio and the estimated number of distinct values.
+
+        :param mtId: id of the RDF-MT
+        :param collect_stats: whether cardinalities and stats are set. default: False
+        :return: (concept dict, list of predicate dicts, dict of predicate -> list of ranges)
+        """
+
+        concept = {'t': mtId, 'label': _label(mtId), 'subClassOf': [{'sc': mtId}]}
+        if collect_stats:
+            concept['card'] = self.rows
+
+        preds = []
+        ranges = {}
+        for name, column in self.columns.items():
+            predId = mtId + '#' + urllib.parse.quote(name, safe='')
+            pred = {'p': predId, 'label': name}
+            if collect_stats:
+                pred['card'] = column.count - column.nulls
+                pred['stats'] = {'null_ratio': column.null_ratio(),
+                                 'distinct': min(column.distinct.count(), pred['card'])}
+            preds.append(pred)
+            ranges[predId] = [column.datatype()]
+
+        return concept, preds, ranges
+
+
+def table_files(path, fmt):
+    """Files of a tabular source: {path} itself if it is a file, else the files of format {fmt} in the folder {path}
+
+    :param path: path or file:// url of a file or folder
+    :param fmt: 'csv', 'tsv' or 'json'
+    :return: sorted list of paths
+    """
+
+    path = _local_path(path)
+    if not os.path.isdir(path):
+        return [path]
+
+    files = []
+    for root, _, names in os.walk(path):
+        files.extend([os.path.join(root, n) for n in names if n.lower().endswith(TABULAR_EXTENSIONS[fmt])])
+
+    return sorted(files)
+
+
+def file_iri(path):
+    """file:// IRI of a local path, used as mtId of the RDF-MT of a file or folder
+
+    :param path: path or file:// url
+    :return: IRI
+    """
+
+    if path.startswith('file://'):
+        return path
+    return 'file://' + urllib.request.pathname2url(os.path.abspath(path))
+
+
+def summarize_table(path, fmt, chunk_rows=10000, delimiter=None, precision=12):
+    """Reads a CSV, TSV or JSON file chunk by chunk and returns its summary
+
+    CSV/TSV files need a header row. Fields of TSV files are not quoted: quote characters are part of the values. JSON
+    files are either an array of objects, read one object at a time, or JSON lines; the keys of the objects are the
+    columns. Files ending with .gz are decompressed while they are read, and a leading UTF-8 byte order mark is
+    skipped.
+
+    :param path: path of the file
+    :param fmt: 'csv', 'tsv' or 'json'
+    :param chunk_rows: number of rows per chunk. default: 10000
+    :param delimiter: delimiter of CSV files. default: ',' for csv, tab for tsv
+    :param precision: precision of the HyperLogLog sketches counting distinct values. default: 12
+    :return: TableSummary
+    """
+
+    summary = TableSummary(precision)
+    with _open(path) as f:
+        if fmt == 'json':
+            records = _iter_json_records(f)
+            while True:
+                chunk = _take(records, chunk_rows)
+                if len(chunk) == 0:
+                    break
+                names = dict.fromkeys([k for r in chunk for k in r])
+                summary.add_chunk({k: [r.get(k) for r in chunk] for k in names}, len(chunk))
+        else:
+            if delimiter is None:
+                delimiter = '\t' if fmt == 'tsv' else ','
+            if fmt == 'tsv':
+                reader = csv.reader(f, delimiter=delimiter, quoting=csv.QUOTE_NONE)
+            else:
+                reader = csv.reader(f, delimiter=delimiter)
+            header = next(reader, None)
+            if header is None:
+                return summary
+            width = len(header)
+            while True:
+                chunk = _take(reader, chunk_rows)
+                if len(chunk) == 0:
+                    break
+                # pad or cut rows to the header, then transpose the chunk into columns
+                chunk = [r + [''] * (width - len(r)) if len(r) < width else r[:width] for r in chunk]
+                summary.add_chunk(dict(zip(header, map(list, zip(*chunk)))), len(chunk))
+
+    return summary
+
+
+def summarize_tables(files, fmt, processes=1, **options):
+    """Summaries of each of {files}, read by up to {processes} processes
+
+    :param files: list of paths
+    :param fmt: 'csv', 'tsv' or 'json'
+    :param processes: number of processes. default: 1
+    :param options: parameters of summarize_table
+    :return: generator of (path, TableSummary), in the order of {files}
+    """
+
+    if processes > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            yield from zip(files, executor.map(_summarize_file, files, [fmt] * len(files), [options] * len(files)))
+        return
+
+    for f in files:
+        yield f, summarize_table(f, fmt, **options)
+
+
+def _summarize_file(path, fmt, options):
+    return summarize_table(path, fmt, **options)
+
+
+def _iter_json_records(f, chunk_size=65536):
+    # objects of a JSON array, decoded one at a time, or of JSON lines
+    decoder = json.JSONDecoder()
+    buf = ''
+    while len(buf.lstrip()) == 0:
+        more = f.read(chunk_size)
+        if len(more) == 0:
+            return
+        buf = buf + more
+    pos = len(buf) - len(buf.lstrip())
+    array = buf[pos: pos + 1] == '['
+    if array:
+        pos += 1
+    eof = False
+    while True:
+        while pos < len(buf) and buf[pos] in ' \t\r\n,':
+            pos += 1
+        if array and pos < len(buf) and buf[pos] == ']':
+            return
+        try:
+            record, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                if pos < len(buf):
+                    raise
+                return
+            more = f.read(chunk_size)
+            eof = len(more) == 0
+            buf = buf[pos:] + more
+            pos = 0
+            continue
+        if end == len(buf) and not eof:
+            # a number may continue in the next chunk
+            more = f.read(chunk_size)
+            if len(more) > 0:
+                buf = buf[pos:] + more
+                pos = 0
+                continue
+            eof = True
+        pos = end
+        if isinstance(record, dict):
+            yield record
+
+
+def _take(iterator, n):
+    chunk = []
+    for item in iterator:
+        chunk.append(item)
+        if len(chunk) == n:
+            break
+
+    return chunk
+
+
+def _open(path):
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, 'rb'), encoding='utf-8-sig', newline='')
+    return open(path, 'r', encoding='utf-8-sig', newline='')
+
+
+def _local_path(path):
+    if path.startswith('file://'):
+        return urllib.request.url2pathname(path[len('file://'):])
+    return path
+
+
+def _label(mtId):
+    name = mtId.rstrip('/').rsplit('/', 1)[-1]
+    for ext in ('.gz',) + tuple([e for exts in TABULAR_EXTENSIONS.values() for e in exts]):
+        if name.lower().endswith(ext):
+            name = name[: -len(ext)]
+    return urllib.parse.unquote(name)
+
+
+def _is_str(value):
+    return type(value) is str
+
+
+def _json_scalar(value):
+    # JSON scalars as they would be written in a CSV cell
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+
+    return value if type(value) is str else str(value)
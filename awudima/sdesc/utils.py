@@ -1,18 +1,127 @@
-
+import sys
 import urllib.parse as urlparse
+import threading
 from http import HTTPStatus
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+
+from awudima.sdesc.sparql_json import SPARQLJSONError, parse_results, iter_bindings
+from awudima.sdesc.scheduler import get_scheduler, RESULT_LIMIT, TIMEOUT, CONNECTION_ERROR, SERVER_ERROR, QUERY_ERROR
+
+# size of the chunks in which responses are read and decoded
+CHUNK_SIZE = 65536
 
 
-def contact_sparql_endpoint(query, endpoint, t=1):
+class EndpointSessionPool:
+    """Pool of persistent HTTP sessions, one per endpoint server
+
+    Each endpoint (scheme, host and port) gets its own :class:`requests.Session` with a pooled HTTP adapter, so
+    consecutive queries to the same endpoint reuse open TCP/TLS connections instead of opening a new one per query.
     """
 
-    :param query:
-    :param endpoint:
-    :param t:
-    :return:
+    def __init__(self, pool_size=10, keep_alive=True, timeout=None):
+        """
+
+        :param pool_size: max number of connections kept open per endpoint. default: 10
+        :param keep_alive: whether to keep connections open between queries. default: True
+        :param timeout: request timeout in seconds, either a number or a (connect, read) tuple. default: None (no timeout)
+        """
+
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get_session(self, endpoint):
+        """Returns the session shared by all queries to the server of the given {endpoint}
+
+        :param endpoint: url of the endpoint
+        :return: requests.Session
+        """
+
+        key = _endpoint_key(endpoint)
+        session = self._sessions.get(key)
+        if session is not None:
+            return session
+
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                if not self.keep_alive:
+                    session.headers['Connection'] = 'close'
+                self._sessions[key] = session
+
+        return session
+
+    def close(self):
+        """Closes all sessions and their open connections
+
+        :return:
+        """
+
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+
+def _endpoint_key(endpoint):
+    url = urlparse.urlsplit(endpoint)
+    return url.scheme, url.netloc
+
+
+_default_pool = EndpointSessionPool()
+
+
+def get_session_pool():
+    """Returns the default session pool used by :func:`contact_sparql_endpoint`
+
+    :return: EndpointSessionPool
+    """
+
+    return _default_pool
+
+
+def configure_sessions(pool_size=10, keep_alive=True, timeout=None):
+    """Replaces the default session pool with one using the given settings. Open sessions are closed.
+
+    :param pool_size: max number of connections kept open per endpoint
+    :param keep_alive: whether to keep connections open between queries
+    :param timeout: request timeout in seconds, either a number or a (connect, read) tuple
+    :return: the new default EndpointSessionPool
+    """
+
+    global _default_pool
+    old = _default_pool
+    _default_pool = EndpointSessionPool(pool_size=pool_size, keep_alive=keep_alive, timeout=timeout)
+    old.close()
+
+    return _default_pool
+
+
+def intern_iri(iri):
+    """Returns the shared copy of {iri}
+
+    Equal IRIs that are interned are the same string object, so an IRI repeated in many RDF-MTs and predicates of a
+    catalog is stored only once.
+
+    :param iri: IRI string
+    :return: interned IRI string ({iri} itself if it is not a str)
     """
 
+    if type(iri) is str:
+        return sys.intern(iri)
+
+    return iri
+
+
+def _request_params(query, endpoint):
     referer = endpoint
     if 'https' in endpoint:
         server = endpoint.split("https://")[1]
@@ -33,54 +142,129 @@ def contact_sparql_endpoint(query, endpoint, t=1):
                "Referer": referer,
                "Host": server}
 
-    # js = "application/sparql-results+json"
-    # params = {'query': query, 'format': js}
+    return params, headers
+
+
+def iter_sparql_endpoint(query, endpoint, pool=None, scheduler=None):
+    """Lazily yields the flattened result rows of {query} while the response is being read
+
+    Unlike contact_sparql_endpoint, failures are raised (requests.HTTPError, requests.RequestException or
+    SPARQLJSONError) instead of being reported as a status code, and are not retried. The query holds a slot of the
+    endpoint in the scheduler only until the response headers are received, so the consumer may send other queries
+    to the same endpoint while it iterates over the rows.
+
+    :param query: SPARQL SELECT query
+    :param endpoint: url of the endpoint
+    :param pool: EndpointSessionPool to get the session from. default: the shared pool, see get_session_pool()
+    :param scheduler: EndpointScheduler that limits queries per endpoint. default: the shared scheduler
+    :return: generator of dicts of variable -> flat value
+    """
+
+    if pool is None:
+        pool = _default_pool
+    if scheduler is None:
+        scheduler = get_scheduler()
+
+    params, headers = _request_params(query, endpoint)
+    session = pool.get_session(endpoint)
+    with scheduler.slot(endpoint):
+        resp = session.get(endpoint, params=params, headers=headers, timeout=pool.timeout, stream=True)
+    with resp:
+        resp.raise_for_status()
+        yield from iter_bindings(resp.iter_content(chunk_size=CHUNK_SIZE))
+
+
+def contact_sparql_endpoint(query, endpoint, pool=None, cache=None, scheduler=None):
+    """Sends {query} to {endpoint} through the scheduler of the endpoint and returns its decoded results
+
+    :param query: SPARQL query
+    :param endpoint: url of the endpoint
+    :param pool: EndpointSessionPool to get the session from. default: the shared pool, see get_session_pool()
+    :param cache: SPARQLResultCache to read results from and write successful results to. default: None (no cache)
+    :param scheduler: EndpointScheduler that limits and retries queries per endpoint. default: the shared scheduler,
+                see awudima.sdesc.scheduler.get_scheduler()
+    :return: (list of rows, number of rows) or (boolean, 1) for ASK queries. On failure ([], status code), where the
+                status code is one of RESULT_LIMIT (-2), TIMEOUT, SERVER_ERROR, CONNECTION_ERROR and QUERY_ERROR of
+                awudima.sdesc.scheduler
+    """
+
+    if cache is not None:
+        cached = cache.get(endpoint, query)
+        if cached is not None:
+            return cached
+
+    if pool is None:
+        pool = _default_pool
+    if scheduler is None:
+        scheduler = get_scheduler()
+
+    res, card = scheduler.run(endpoint, lambda: _send_query(query, endpoint, pool))
+    if card >= 0 and cache is not None:
+        cache.put(endpoint, query, res, card)
+
+    return res, card
+
+
+# phrases of error responses of endpoints that refuse a query because of the size or cost of its result
+_RESULT_LIMIT_MESSAGES = ('too large', 'too many', 'row limit', 'result limit', 'exceeds the limit',
+                          'estimated execution time', 'max rows')
+
+
+def _send_query(query, endpoint, pool):
+    referer = endpoint
     try:
-        resp = requests.get(referer, params=params, headers=headers)
-        if resp.status_code == HTTPStatus.OK:
-            res = resp.text
-            try:
-                res = res.replace("false", "False")
-                res = res.replace("true", "True")
-                res = eval(res)
-            except Exception as ex:
-                print("EX processing res", ex)
-
-            if type(res) is dict:
-                if "results" in res:
-                    for x in res['results']['bindings']:
-                        for key, props in x.items():
-                            # Handle typed-literals and language tags
-                            suffix = ''
-                            if props['type'] == 'typed-literal':
-                                if isinstance(props['datatype'], bytes):
-                                    suffix = "^^<" + props['datatype'].decode('utf-8') + ">"
-                                else:
-                                    suffix = "^^<" + props['datatype'] + ">"
-                            elif "xml:lang" in props:
-                                suffix = '@' + props['xml:lang']
-                            try:
-                                if isinstance(props['value'], bytes):
-                                    x[key] = props['value'].decode('utf-8') + suffix
-                                else:
-                                    x[key] = props['value'] + suffix
-                            except:
-                                x[key] = props['value'] + suffix
-
-                            if isinstance(x[key], bytes):
-                                x[key] = x[key].decode('utf-8')
-
-                    reslist = res['results']['bindings']
-                    return reslist, len(reslist)
-                else:
-                    return res['boolean'], 1
-
-        else:
-            print("Response from endpoint ->", referer, resp.reason, resp.status_code, query)
-            if t == 1:
-                return contact_sparql_endpoint(query, endpoint, t=2)
+        params, headers = _request_params(query, endpoint)
+        session = pool.get_session(endpoint)
+        resp = session.get(referer, params=params, headers=headers, timeout=pool.timeout, stream=True)
+        try:
+            if resp.status_code == HTTPStatus.OK:
+                try:
+                    res = parse_results(resp.iter_content(chunk_size=CHUNK_SIZE))
+                except SPARQLJSONError as ex:
+                    # most often a response cut off by the endpoint at its max size
+                    print("EX processing res", ex)
+                    return [], RESULT_LIMIT
+
+                card = 1 if type(res) is bool else len(res)
+                return res, card
 
+            print("Response from endpoint ->", referer, resp.reason, resp.status_code, query)
+            return [], _error_status(resp)
+        finally:
+            resp.close()
+    except requests.RequestException as e:
+        if _is_timeout(e):
+            print("Timeout during query execution to", referer, ': ', e)
+            return [], TIMEOUT
+        print("Exception during query execution to", referer, ': ', e)
+        return [], CONNECTION_ERROR
     except Exception as e:
         print("Exception during query execution to", referer, ': ', e)
+        return [], QUERY_ERROR
+
+
+def _is_timeout(e):
+    # requests raises read timeouts while streaming a response body as a ConnectionError wrapping urllib3's
+    # ReadTimeoutError, not as requests.Timeout
+    if isinstance(e, requests.Timeout):
+        return True
+
+    return isinstance(e, requests.ConnectionError) and True in [isinstance(a, ReadTimeoutError) for a in e.args]
+
+
+def _error_status(resp):
+    # categorizes a failed response
+    if resp.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE:
+        return RESULT_LIMIT
+    if resp.status_code in (HTTPStatus.REQUEST_TIMEOUT, HTTPStatus.GATEWAY_TIMEOUT):
+        return TIMEOUT
+    try:
+        message = resp.text[:2000].lower()
+    except Exception:
+        message = ''
+    if True in [m in message for m in _RESULT_LIMIT_MESSAGES]:
+        return RESULT_LIMIT
+    if resp.status_code >= 500 or resp.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+        return SERVER_ERROR
 
-    return [], -2
+    return QUERY_ERROR
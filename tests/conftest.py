@@ -0,0 +1,135 @@
+import json
+import threading
+
+import pytest
+
+import awudima.sdesc as sdesc
+from awudima.sdesc import RDFMT, DataSource, DataSourceType, Federation, Predicate
+from awudima.sdesc.scheduler import QUERY_ERROR
+from awudima.sdesc.sparql_json import parse_results
+
+ENDPOINT = 'http://example.org/sparql'
+
+
+class GraphEndpoint:
+    """SPARQL endpoint answering queries over an rdflib graph, in place of contact_sparql_endpoint
+
+    If {failure} is set, every query containing {fail_on} (every query, if it is empty) fails with that status code.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.url = ENDPOINT
+        self.queries = []
+        self.failure = None
+        self.fail_on = ''
+        self._lock = threading.Lock()
+
+    def __call__(self, query, endpoint, *args, **kwargs):
+        with self._lock:
+            self.queries.append(query)
+            if self.failure is not None and self.fail_on in query:
+                return [], self.failure
+            # projections the extractor writes without parentheses, which rdflib does not accept
+            if '(COUNT' not in query:
+                query = query.replace('COUNT(DISTINCT ?s) as ?card', '(COUNT(DISTINCT ?s) as ?card)')
+            if '(datatype' not in query:
+                query = query.replace('datatype(?pt) as ?r', '(datatype(?pt) as ?r)')
+            try:
+                result = self.graph.query(query)
+                if result.type == 'ASK':
+                    return result.askAnswer, 1
+                body = result.serialize(format='json')
+            except Exception:
+                return [], QUERY_ERROR
+
+        rows = parse_results([body if isinstance(body, bytes) else json.dumps(body).encode('utf-8')])
+        return rows, len(rows)
+
+
+def build_graph():
+    rdflib = pytest.importorskip('rdflib')
+    RDF, RDFS, Literal = rdflib.RDF, rdflib.RDFS, rdflib.Literal
+    EX = rdflib.Namespace('http://example.org/')
+
+    g = rdflib.Graph()
+    g.add((EX.Person, RDFS.subClassOf, EX.Agent))
+    g.add((EX.Agent, RDFS.subClassOf, EX.Thing))
+    g.add((EX.Student, RDFS.subClassOf, EX.Person))
+    g.add((EX.Person, RDFS.label, Literal('Person', lang='en')))
+    g.add((EX.name, RDFS.label, Literal('name', lang='en')))
+    g.add((EX.knows, RDFS.range, EX.Person))
+    for i in range(40):
+        p = EX['p%d' % i]
+        g.add((p, RDF.type, EX.Person))
+        g.add((p, EX.name, Literal('P%d' % i)))
+        g.add((p, EX.age, Literal(i)))
+        if i:
+            g.add((p, EX.knows, EX['p%d' % (i - 1)]))
+        g.add((p, EX.worksAt, EX['o%d' % (i % 3)]))
+    for i in range(3):
+        g.add((EX['o%d' % i], RDF.type, EX.Org))
+        g.add((EX['o%d' % i], EX.name, Literal('O%d' % i)))
+    for i in range(5):
+        g.add((EX['s%d' % i], RDF.type, EX.Student))
+        g.add((EX['s%d' % i], EX.name, Literal('S%d' % i)))
+
+    return g
+
+
+@pytest.fixture
+def graph_endpoint(monkeypatch):
+    """GraphEndpoint over a small graph of persons, students and organizations, used by all extractors"""
+
+    endpoint = GraphEndpoint(build_graph())
+    monkeypatch.setattr(sdesc, 'contact_sparql_endpoint', endpoint)
+    return endpoint
+
+
+def describe(rdfmts):
+    """Comparable description of RDF-MTs: mtId -> (label, cardinality, superclasses, predicates with ranges)"""
+
+    return {m.mtId: (m.label, m.cardinality, sorted(sc['sc'] for sc in m.subClassOf),
+                     sorted((p.predId, p.label, p.cardinality, tuple(sorted(p.ranges))) for p in m.predicates))
+            for m in rdfmts}
+
+
+def build_catalog():
+    """Federation of two sources and one referenced non-member source, with exact and estimated cardinalities"""
+
+    fed = Federation('f', 'F', 'test federation')
+    a = DataSource('a', DataSourceType.SPARQL_ENDPOINT, 'http://example.org/a', 'a')
+    b = DataSource('b', DataSourceType.SQLITE, '/tmp/b.sqlite', 'b', params={'base_iri': 'file:///b/'})
+    c = DataSource('c', DataSourceType.SPARQL_ENDPOINT, 'http://example.org/c', 'c')
+    fed.addSource(a)
+    fed.addSource(b)
+
+    person = RDFMT('http://example.org/Person', 'Person', 'typed', cardinality=40)
+    person.subClassOf = [{'sc': 'http://example.org/Agent'}]
+    name = Predicate('http://example.org/name', 'name', cardinality=40)
+    name.ranges = {'http://www.w3.org/2001/XMLSchema#string'}
+    name.stats = {'null_ratio': 0.0, 'distinct': 40}
+    person.addPredicate(name)
+    knows = Predicate('http://example.org/knows', 'knows', cardinality=39)
+    knows.cardinality_bounds = (30, 45)
+    knows.ranges = {'http://example.org/Person'}
+    person.addPredicate(knows)
+    person.addDataSource(a)
+    person.addDataSource(b)
+
+    # sampled RDF-MT whose extraction ran out of time
+    org = RDFMT('http://example.org/Org', 'Org', 'typed', cardinality=1200)
+    org.cardinality_bounds = (1000, 1500)
+    org.complete = False
+    org.addPredicate(Predicate('http://example.org/name', 'name'))
+    org.addDataSource(c)
+
+    fed.addRDFMTs([person, org])
+    return fed
+
+
+def catalog_json(rdfmts):
+    """mtId -> JSON of the RDF-MT, with data sources by dsId in sorted order"""
+
+    return {m.mtId: dict(m.to_json(datasource_ids=True), datasources=sorted(d.dsId for d in m.datasources))
+            for m in rdfmts}
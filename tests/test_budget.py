@@ -0,0 +1,44 @@
+import threading
+import time
+
+import awudima.sdesc as sdesc
+from awudima.sdesc import DataSource, DataSourceType, RDFMTExtractor
+
+ENDPOINT = 'http://example.org/sparql'
+
+
+class SlowEndpoint:
+    # endpoint listing classes without end, and answering every query after {delay} seconds
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def __call__(self, query, endpoint, *args, **kwargs):
+        with self.lock:
+            self.sent.append(time.time())
+        time.sleep(self.delay)
+        limit = int(query.split(' LIMIT ')[1].split()[0])
+        offset = int(query.split(' OFFSET ')[1].split()[0]) if ' OFFSET ' in query else 0
+        if 'SELECT DISTINCT ?t WHERE' in query:
+            return [{'t': 'http://x/C' + str(offset + i)} for i in range(limit)], limit
+        return [], 0
+
+
+def test_no_query_is_sent_after_the_deadline(monkeypatch):
+    endpoint = SlowEndpoint(0.05)
+    monkeypatch.setattr(sdesc, 'contact_sparql_endpoint', endpoint)
+    extractor = RDFMTExtractor(params={'time_budget': 0.5, 'max_workers': 4})
+    datasource = DataSource('ds', DataSourceType.SPARQL_ENDPOINT, ENDPOINT, 'ds')
+
+    start = time.time()
+    extractor.get_molecules(datasource)
+    # the class listing never ends, it is stopped at the deadline
+    assert time.time() - start < 0.5 + 0.2
+
+    # lookups still running after get_molecules returned do not send other queries
+    time.sleep(0.3)
+    assert len(endpoint.sent) > 0
+    assert max(endpoint.sent) < start + 0.5
+    assert extractor._deadlines.deadline is None
@@ -0,0 +1,106 @@
+import pytest
+
+from awudima.sdesc import cache as cache_module
+from awudima.sdesc.cache import SPARQLResultCache
+from awudima.sdesc.utils import contact_sparql_endpoint
+
+ENDPOINT = 'http://example.org/sparql'
+OTHER = 'http://example.org/other'
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, 'time', clock.time)
+    return clock
+
+
+def _query(i):
+    return "SELECT DISTINCT ?c WHERE { ?s a ?c } LIMIT 10 OFFSET " + str(i)
+
+
+def test_hits_misses_and_normalized_queries(clock):
+    cache = SPARQLResultCache(':memory:')
+    assert cache.get(ENDPOINT, _query(0)) is None
+    cache.put(ENDPOINT, _query(0), [{'c': 'http://x/A'}], 1)
+
+    assert cache.get(ENDPOINT, "SELECT DISTINCT ?c   WHERE {\n ?s a ?c }\tLIMIT 10 OFFSET 0") == ([{'c': 'http://x/A'}], 1)
+    assert cache.get(ENDPOINT, _query(10)) is None
+    assert cache.get(OTHER, _query(0)) is None
+    assert cache.stats() == {'hits': 1, 'misses': 3, 'entries': 1, 'size': len('[{"c": "http://x/A"}]')}
+
+
+def test_ttl_and_endpoint_ttls(clock):
+    cache = SPARQLResultCache(':memory:', ttl=100, endpoint_ttls={OTHER: None})
+    cache.put(ENDPOINT, _query(0), [], 0)
+    cache.put(OTHER, _query(0), [], 0)
+
+    clock.now += 100
+    assert cache.get(ENDPOINT, _query(0)) == ([], 0)
+    clock.now += 1
+    assert cache.get(ENDPOINT, _query(0)) is None
+    assert cache.stats()['entries'] == 1
+    # entries of OTHER never expire
+    clock.now += 10 ** 6
+    assert cache.get(OTHER, _query(0)) == ([], 0)
+
+
+def test_least_recently_used_entries_are_evicted(clock):
+    cache = SPARQLResultCache(':memory:', max_entries=3)
+    for i in range(3):
+        clock.now += 1
+        cache.put(ENDPOINT, _query(i), [i], 1)
+    clock.now += 1
+    assert cache.get(ENDPOINT, _query(0)) == ([0], 1)
+
+    clock.now += 1
+    cache.put(ENDPOINT, _query(3), [3], 1)
+    assert cache.stats()['entries'] == 3
+    assert cache.get(ENDPOINT, _query(1)) is None
+    assert cache.get(ENDPOINT, _query(0)) == ([0], 1)
+    assert cache.get(ENDPOINT, _query(3)) == ([3], 1)
+
+
+def test_size_bound(clock):
+    cache = SPARQLResultCache(':memory:', max_size=25)
+    for i in range(5):
+        clock.now += 1
+        cache.put(ENDPOINT, _query(i), ['x' * 8], 1)
+    assert cache.stats()['size'] <= 25
+    assert cache.get(ENDPOINT, _query(4)) == (['x' * 8], 1)
+    assert cache.get(ENDPOINT, _query(0)) is None
+
+
+def test_bypass_still_writes(clock, tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = SPARQLResultCache(path, bypass=True)
+    cache.put(ENDPOINT, _query(0), [1], 1)
+    assert cache.get(ENDPOINT, _query(0)) is None
+    cache.close()
+
+    # entries survive reopening the cache
+    cache = SPARQLResultCache(path)
+    assert cache.get(ENDPOINT, _query(0)) == ([1], 1)
+    cache.invalidate(ENDPOINT)
+    assert cache.get(ENDPOINT, _query(0)) is None
+    cache.close()
+
+
+def test_cached_results_are_not_sent(clock):
+    cache = SPARQLResultCache(':memory:')
+    cache.put(ENDPOINT, _query(0), [{'c': 'http://x/A'}], 1)
+
+    class NoScheduler:
+        def run(self, endpoint, send):
+            raise AssertionError("query sent to the endpoint")
+
+    assert contact_sparql_endpoint(_query(0), ENDPOINT, cache=cache, scheduler=NoScheduler()) == \
+        ([{'c': 'http://x/A'}], 1)
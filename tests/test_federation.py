@@ -0,0 +1,70 @@
+import pytest
+
+from awudima.sdesc import DataSource, DataSourceType, Federation
+from awudima.sdesc.scheduler import SERVER_ERROR
+
+from conftest import describe
+
+
+def _federation(endpoint):
+    fed = Federation('f', 'f', '')
+    for dsId in ('a', 'b'):
+        fed.addSource(DataSource(dsId, DataSourceType.SPARQL_ENDPOINT, endpoint.url + '/' + dsId, dsId))
+    return fed
+
+
+def test_parallel_extraction(graph_endpoint):
+    serial = _federation(graph_endpoint)
+    serial.extract_molecules()
+    parallel = _federation(graph_endpoint)
+    parallel.extract_molecules(parallel=True, max_workers=2)
+
+    assert describe(parallel.rdfmts) == describe(serial.rdfmts)
+    assert {m.mtId for m in parallel.rdfmts} == {'http://example.org/Person', 'http://example.org/Org',
+                                                 'http://example.org/Student'}
+    for m in parallel.rdfmts:
+        assert {ds.dsId for ds in m.datasources} == {'a', 'b'}
+
+
+def test_extractor_params(graph_endpoint):
+    serial = _federation(graph_endpoint)
+    serial.extract_molecules()
+
+    fed = _federation(graph_endpoint)
+    graph_endpoint.queries.clear()
+    fed.extract_molecules(parallel=True, params={'hierarchy_mode': 'local', 'max_workers': 2})
+    assert describe(fed.rdfmts) == describe(serial.rdfmts)
+    # superclasses come from the local hierarchy instead of one path query per class
+    assert True not in ['subClassOf*' in q for q in graph_endpoint.queries]
+
+
+def test_refresh_of_an_endpoint(graph_endpoint):
+    rdflib = pytest.importorskip('rdflib')
+    EX = rdflib.Namespace('http://example.org/')
+    fed = Federation('f', 'f', '')
+    ds = DataSource('a', DataSourceType.SPARQL_ENDPOINT, graph_endpoint.url, 'a')
+    fed.addSource(ds)
+    fed.extract_molecules()
+    mtIds = {'http://example.org/Person', 'http://example.org/Org', 'http://example.org/Student'}
+
+    assert sorted(fed.refresh_source_molecules(ds)['changed']) == sorted(mtIds)
+    assert fed.refresh_source_molecules(ds) == {'added': [], 'changed': [], 'removed': []}
+
+    graph_endpoint.graph.add((EX.s0, EX.age, rdflib.Literal(3)))
+    graph_endpoint.graph.add((EX.d0, rdflib.RDF.type, EX.Dog))
+    assert fed.refresh_source_molecules(ds) == {'added': ['http://example.org/Dog'],
+                                                'changed': ['http://example.org/Student'], 'removed': []}
+    assert 'http://example.org/age' in {p.predId for p in fed.getRDFMT('http://example.org/Student').predicates}
+    mtIds.add('http://example.org/Dog')
+
+    # an endpoint that is down does not remove anything
+    graph_endpoint.failure = SERVER_ERROR
+    assert fed.refresh_source_molecules(ds) == {'added': [], 'changed': [], 'removed': []}
+    assert {m.mtId for m in fed.rdfmts} == mtIds
+
+    # nor do classes that cannot be counted
+    graph_endpoint.fail_on = 'COUNT(DISTINCT ?s)'
+    assert fed.refresh_source_molecules(ds) == {'added': [], 'changed': [], 'removed': []}
+    graph_endpoint.failure = None
+    assert fed.refresh_source_molecules(ds) == {'added': [], 'changed': [], 'removed': []}
+    assert {m.mtId for m in fed.rdfmts} == mtIds
@@ -0,0 +1,35 @@
+from awudima.sdesc import RDFMTExtractor
+from awudima.sdesc.hierarchy import ClassHierarchy
+
+EDGES = [{'c': 'http://x/C', 'sc': 'http://x/B'}, {'c': 'http://x/B', 'sc': 'http://x/A'}]
+
+
+def test_transitive_closure():
+    hierarchy = ClassHierarchy([(e['c'], e['sc']) for e in EDGES])
+    assert set(hierarchy.superclasses('http://x/C')) == {'http://x/C', 'http://x/B', 'http://x/A'}
+    assert set(hierarchy.subclasses('http://x/A')) == {'http://x/A', 'http://x/B', 'http://x/C'}
+
+
+def test_failed_crawl_is_not_cached_and_falls_back_to_path_queries():
+    extractor = RDFMTExtractor(params={'hierarchy_mode': 'local'})
+    queries = []
+    responses = {'crawl': [([], -1), (EDGES, 0)]}
+
+    def results(query, endpoint, limit, *args, **kwargs):
+        queries.append(query)
+        if '?c rdfs:subClassOf ?sc' in query:
+            return responses['crawl'].pop(0)
+        return [{'sc': 'http://x/C'}, {'sc': 'http://x/B'}, {'sc': 'http://x/A'}], 0
+
+    extractor._get_results_iter = results
+
+    concepts = extractor.get_super_classes('http://endpoint', [{'t': 'http://x/C'}], 't')
+    assert [sc['sc'] for sc in concepts[0]['subClassOf']] == ['http://x/C', 'http://x/B', 'http://x/A']
+    assert 'http://endpoint' not in extractor.hierarchies
+    assert len(queries) == 2
+
+    # the next call crawls again, and keeps the hierarchy once the crawl succeeds
+    concepts = extractor.get_super_classes('http://endpoint', [{'t': 'http://x/C'}], 't')
+    assert {sc['sc'] for sc in concepts[0]['subClassOf']} == {'http://x/C', 'http://x/B', 'http://x/A'}
+    assert 'http://endpoint' in extractor.hierarchies
+    assert len(queries) == 3
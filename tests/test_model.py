@@ -0,0 +1,218 @@
+import io
+import random
+import sys
+
+from awudima.sdesc import RDFMT, Predicate, DataSource, DataSourceType, Federation
+
+from conftest import build_catalog, catalog_json
+
+XSD_STRING = 'http://www.w3.org/2001/XMLSchema#string'
+XSD_INT = 'http://www.w3.org/2001/XMLSchema#integer'
+
+
+def _source(dsId):
+    return DataSource(dsId, DataSourceType.SPARQL_ENDPOINT, 'http://example.org/' + dsId, dsId)
+
+
+def test_predicate_ranges_behave_like_a_set():
+    pred = Predicate('http://x/p', 'p')
+    pred.ranges.add(XSD_STRING)
+    pred.ranges.update([XSD_STRING, XSD_INT])
+    assert pred.ranges == {XSD_STRING, XSD_INT}
+    assert len(pred.ranges) == 2 and XSD_INT in pred.ranges
+
+    pred.ranges.discard(XSD_STRING)
+    pred.ranges |= {XSD_STRING}
+    assert pred.ranges.union(['http://x/C']) == {XSD_STRING, XSD_INT, 'http://x/C'}
+    assert pred.ranges.difference([XSD_INT]) == {XSD_STRING}
+    copy = pred.ranges.copy()
+    copy.add('http://x/C')
+    assert 'http://x/C' not in pred.ranges
+
+    pred.ranges = {XSD_INT}
+    assert pred.to_json()['ranges'] == [XSD_INT]
+    # added ranges are interned
+    pred.ranges.add(''.join(['http://x/', 'D']))
+    assert [r for r in pred._ranges if r == 'http://x/D'][0] is sys.intern('http://x/D')
+
+
+def test_rdfmt_predicates_behave_like_a_set():
+    rdfmt = RDFMT('http://x/C', 'C', 'typed')
+    p, q = Predicate('http://x/p', 'p'), Predicate('http://x/q', 'q')
+    rdfmt.predicates.update([p, q])
+    assert len(rdfmt.predicates) == 2 and rdfmt.getPredicate('http://x/q') is q
+    assert rdfmt.predicates.difference([p]) == {q}
+    assert rdfmt.predicates.union([]) == {p, q}
+    rdfmt.predicates.difference_update([q])
+    assert rdfmt.predicates.copy() == {p}
+    rdfmt.predicates.intersection_update([])
+    assert len(rdfmt.predicates) == 0
+
+
+def test_rdfmt_datasources():
+    a, b = _source('a'), _source('b')
+    rdfmt = RDFMT('http://x/C', 'C', 'typed')
+    rdfmt.addDataSource(a)
+    rdfmt.addDataSource(a)
+    rdfmt.datasources.add(b)
+    assert rdfmt.datasources == {a, b}
+    assert isinstance(rdfmt._datasources, tuple)
+
+    rdfmt.datasources.remove(a)
+    assert rdfmt.datasources == {b}
+
+    other = RDFMT('http://x/C', 'C', 'typed')
+    other.addDataSource(a)
+    merged = rdfmt.merge_with(other)
+    assert merged.datasources == {a, b}
+    assert rdfmt.datasources == {b}
+
+    rdfmt.merge(other)
+    assert [d['dsId'] for d in rdfmt.to_json()['datasources']] == ['b', 'a']
+    assert RDFMT.from_json(rdfmt.to_json()).datasources == {a, b}
+
+
+def test_in_place_operators_keep_members():
+    rdfmt = RDFMT('http://x/C', 'C', 'typed')
+    p, q = Predicate('http://x/p', 'p'), Predicate('http://x/q', 'q')
+    rdfmt.predicates = [p]
+    rdfmt.predicates |= {q}
+    assert rdfmt.predicates == {p, q}
+    rdfmt.datasources |= {_source('a')}
+    rdfmt.datasources |= {_source('b')}
+    assert len(rdfmt.datasources) == 2
+
+
+def test_merge_with_keeps_both_rdfmts():
+    a, b = RDFMT('http://x/C', 'C', 'typed'), RDFMT('http://x/C', 'C', 'typed')
+    a.addPredicate(Predicate('http://x/p', 'p'))
+    a.getPredicate('http://x/p').ranges = {XSD_STRING}
+    b.addPredicate(Predicate('http://x/q', 'q'))
+    b.getPredicate('http://x/q').ranges = {XSD_INT}
+    b.addPredicate(Predicate('http://x/p', 'p'))
+
+    merged = a.merge_with(b)
+    for p in merged.predicates:
+        assert p is not a.getPredicate(p.predId) and p is not b.getPredicate(p.predId)
+
+    other = RDFMT('http://x/C', 'C', 'typed')
+    for predId in ('http://x/p', 'http://x/q'):
+        other.addPredicate(Predicate(predId, ''))
+        other.getPredicate(predId).ranges = {'http://x/D'}
+    merged.merge(other)
+    assert merged.getPredicate('http://x/q').ranges == {XSD_INT, 'http://x/D'}
+    assert a.getPredicate('http://x/p').ranges == {XSD_STRING}
+    assert b.getPredicate('http://x/q').ranges == {XSD_INT}
+    assert b.getPredicate('http://x/p').ranges == set()
+
+
+def test_federation_rdfmts_keep_indexes():
+    fed = Federation('f', 'f', '')
+    a, b = RDFMT('http://x/A', 'A', 'typed'), RDFMT('http://x/B', 'B', 'typed')
+    a.addPredicate(Predicate('http://x/p', 'p'))
+    b.addPredicate(Predicate('http://x/p', 'p'))
+    b.addDataSource(_source('b'))
+    fed.rdfmts.add(a)
+    assert fed.getRDFMT('http://x/A') is a and len(fed.rdfmts) == 1
+
+    # a change that keeps the number of RDF-MTs
+    fed.rdfmts.discard(a)
+    fed.rdfmts.add(b)
+    assert fed.getRDFMT('http://x/A') is None and fed.getRDFMT('http://x/B') is b
+    assert fed.rdfmts_of_predicate('http://x/p') == {'http://x/B'}
+    selected = fed.select_sources([('?s', 'http://x/p', '?o')])[('?s', 'http://x/p', '?o')]
+    assert selected['rdfmts'] == {'http://x/B'} and [ds.dsId for ds in selected['sources']] == ['b']
+
+    fed.rdfmts -= {b}
+    assert list(fed.rdfmts) == [] and fed.rdfmts_of_predicate('http://x/p') == set()
+    fed.rdfmts = [a, b]
+    assert fed.rdfmts == {a, b} and fed.rdfmts_of_predicate('http://x/p') == {'http://x/A', 'http://x/B'}
+
+
+def _random_rdfmts(rnd, sources):
+    rdfmts = []
+    for ds in sources:
+        for i in rnd.sample(range(6), 4):
+            rdfmt = RDFMT('http://x/C%d' % i, 'C%d' % i, 'typed')
+            for j in rnd.sample(range(5), rnd.randint(1, 3)):
+                pred = Predicate('http://x/p%d' % j, 'p%d' % j)
+                pred.ranges = {'http://x/C%d' % k for k in rnd.sample(range(6), rnd.randint(0, 2))}
+                rdfmt.addPredicate(pred)
+            rdfmt.addDataSource(ds)
+            rdfmts.append(rdfmt)
+    return rdfmts
+
+
+def _check_indexes(fed):
+    # every index answers as a scan over the RDF-MTs of the federation
+    preds = {p.predId for m in fed.rdfmts for p in m.predicates} | set(fed._pred_index)
+    for predId in preds:
+        assert fed.rdfmts_of_predicate(predId) == {m.mtId for m in fed.rdfmts
+                                                   if predId in {p.predId for p in m.predicates}}
+    ranges = {r for m in fed.rdfmts for p in m.predicates for r in p.ranges} | set(fed._range_index)
+    for r in ranges:
+        assert fed.rdfmts_with_range(r) == {m.mtId for m in fed.rdfmts
+                                            if r in {rng for p in m.predicates for rng in p.ranges}}
+    assert set(fed._class_sources) == {m.mtId for m in fed.rdfmts}
+    for m in fed.rdfmts:
+        assert set(fed.sources_of_rdfmt(m.mtId)) == m.datasources
+
+    for i in range(6):
+        for j in range(5):
+            tps = [('?s', 'a', '<http://x/C%d>' % i), ('?s', 'http://x/p%d' % j, '?o'), ('?o', '?p', '?x')]
+            selection = fed.select_sources(tps)
+            mts = {m for m in fed.rdfmts if m.mtId == 'http://x/C%d' % i and
+                   'http://x/p%d' % j in {p.predId for p in m.predicates}}
+            assert selection[tps[0]]['rdfmts'] == selection[tps[1]]['rdfmts'] == {m.mtId for m in mts}
+            assert set(selection[tps[0]]['sources']) == {ds for m in mts for ds in m.datasources}
+            assert selection[tps[2]]['rdfmts'] == {m.mtId for m in fed.rdfmts}
+
+
+def test_indexes_after_add_detach_and_merge():
+    rnd = random.Random(3)
+    sources = [_source(dsId) for dsId in 'abc']
+    fed = Federation('f', 'f', '')
+    for ds in sources:
+        fed.addSource(ds)
+
+    # RDF-MTs of several sources with the same mtId are merged
+    fed.addRDFMTs(_random_rdfmts(rnd, sources))
+    _check_indexes(fed)
+    assert True in [len(m.datasources) > 1 for m in fed.rdfmts]
+
+    fed.addRDFMTs(_random_rdfmts(rnd, sources[:1]))
+    _check_indexes(fed)
+
+    fed._detach_source(sources[0], {'http://x/C%d' % i for i in range(3)})
+    _check_indexes(fed)
+    fed._detach_source(sources[1])
+    _check_indexes(fed)
+    assert sources[1] not in {ds for m in fed.rdfmts for ds in m.datasources}
+
+    fed.addRDFMTs(_random_rdfmts(rnd, sources[1:]))
+    _check_indexes(fed)
+
+
+def test_ndjson_round_trip(tmp_path):
+    fed = build_catalog()
+    out = io.StringIO()
+    fed.dump_ndjson(out)
+    loaded = Federation.load_ndjson(io.StringIO(out.getvalue()))
+
+    assert (loaded.fedId, loaded.name, loaded.desc) == ('f', 'F', 'test federation')
+    assert {ds.dsId for ds in loaded.datasources} == {'a', 'b'}
+    assert catalog_json(loaded.rdfmts) == catalog_json(fed.rdfmts)
+    org = loaded.getRDFMT('http://example.org/Org')
+    assert org.cardinality_bounds == (1000, 1500) and org.cardinality_estimated and not org.complete
+    knows = loaded.getRDFMT('http://example.org/Person').getPredicate('http://example.org/knows')
+    assert knows.cardinality_bounds == (30, 45)
+    assert loaded.getRDFMT('http://example.org/Person').getPredicate('http://example.org/name').stats == \
+        {'null_ratio': 0.0, 'distinct': 40}
+    # the non-member source is kept with the RDF-MTs that refer to it
+    assert [ds.url for ds in org.datasources] == ['http://example.org/c']
+    assert loaded.select_sources([('?s', 'a', 'http://example.org/Org')])[
+        ('?s', 'a', 'http://example.org/Org')]['sources'] == list(org.datasources)
+
+    path = str(tmp_path / 'catalog.ndjson')
+    fed.dump_ndjson(path)
+    assert catalog_json(Federation.load_ndjson(path).rdfmts) == catalog_json(fed.rdfmts)
@@ -0,0 +1,96 @@
+import time
+
+from awudima.sdesc import DataSource, DataSourceType, RDFMTExtractor
+
+from conftest import describe
+
+
+def _molecules(endpoint, params=None):
+    datasource = DataSource('ds', DataSourceType.SPARQL_ENDPOINT, endpoint.url, 'ds')
+    return describe(RDFMTExtractor(params=params).get_molecules(datasource, collect_labels=True, collect_stats=True))
+
+
+def test_concurrent_lookups(graph_endpoint):
+    assert _molecules(graph_endpoint, {'max_workers': 4}) == _molecules(graph_endpoint)
+
+
+def _without_predicate_cards(molecules):
+    return {t: (label, card, scs, [(p, plabel, ranges) for p, plabel, _, ranges in preds])
+            for t, (label, card, scs, preds) in molecules.items()}
+
+
+def test_batched_cardinalities(graph_endpoint):
+    batched = _molecules(graph_endpoint, {'stats_mode': 'batched'})
+    assert _without_predicate_cards(batched) == _without_predicate_cards(_molecules(graph_endpoint))
+    # predicate cardinalities are the number of triples of the instances of each class
+    assert {p: card for p, _, card, _ in batched['http://example.org/Person'][3]} == {
+        'http://example.org/age': 40, 'http://example.org/knows': 39, 'http://example.org/name': 40,
+        'http://example.org/worksAt': 40, 'http://www.w3.org/1999/02/22-rdf-syntax-ns#type': 40}
+
+    extractor = RDFMTExtractor()
+    classes = [{'t': 'http://example.org/Person'}, {'t': 'http://example.org/Org'}, {'t': 'http://example.org/Nothing'}]
+    counted = extractor.get_cardinalities_batched(graph_endpoint.url, [dict(c) for c in classes], 't', batch_size=2)
+    assert [c['card'] for c in counted] == [40, 3, 0]
+
+
+def test_bulk_predicates(graph_endpoint):
+    assert _molecules(graph_endpoint, {'predicate_mode': 'bulk', 'predicate_batch_size': 2}) == \
+        _molecules(graph_endpoint)
+
+    extractor = RDFMTExtractor()
+    class_preds = extractor.get_class_predicates(graph_endpoint.url, ['http://example.org/Org',
+                                                                      'http://example.org/Student'], limit=2)
+    assert {t: sorted(p['p'] for p in preds) for t, preds in class_preds.items()} == {
+        'http://example.org/Org': ['http://example.org/name', 'http://www.w3.org/1999/02/22-rdf-syntax-ns#type'],
+        'http://example.org/Student': ['http://example.org/name', 'http://www.w3.org/1999/02/22-rdf-syntax-ns#type']}
+
+
+def test_batched_ranges(graph_endpoint):
+    assert _molecules(graph_endpoint, {'range_mode': 'batched'}) == _molecules(graph_endpoint)
+
+    extractor = RDFMTExtractor()
+    preds = ['http://example.org/knows', 'http://example.org/age', 'http://example.org/worksAt']
+    ranges = extractor.get_class_predicate_ranges(graph_endpoint.url, 'http://example.org/Person', preds)
+    assert {p: set(r) for p, r in ranges.items()} == \
+        {p: set(extractor.get_predicate_ranges(graph_endpoint.url, 'http://example.org/Person', p)) for p in preds}
+    assert ranges['http://example.org/age'] == ['http://www.w3.org/2001/XMLSchema#integer']
+
+
+def _streamed(endpoint, params=None):
+    datasource = DataSource('ds', DataSourceType.SPARQL_ENDPOINT, endpoint.url, 'ds')
+    rdfmts = list(RDFMTExtractor(params=params).iter_molecules(datasource, collect_labels=True, collect_stats=True))
+    assert len(rdfmts) == len({m.mtId for m in rdfmts})
+    return rdfmts
+
+
+def test_streamed_molecules(graph_endpoint):
+    expected = _molecules(graph_endpoint)
+    assert describe(_streamed(graph_endpoint)) == expected
+    assert describe(_streamed(graph_endpoint, {'max_workers': 3, 'queue_size': 1})) == expected
+    assert describe(_streamed(graph_endpoint, {'range_mode': 'batched'})) == expected
+    assert describe(_streamed(graph_endpoint, {'predicate_mode': 'bulk'})) == expected
+
+    # with a time budget, RDF-MTs are extracted by priority and may be incomplete
+    graph_endpoint.queries.clear()
+    rdfmts = _streamed(graph_endpoint, {'time_budget': 60})
+    assert describe(rdfmts) == describe(RDFMTExtractor(params={'time_budget': 60}).get_molecules(
+        DataSource('ds', DataSourceType.SPARQL_ENDPOINT, graph_endpoint.url, 'ds'), collect_labels=True,
+        collect_stats=True))
+    assert [m.complete for m in rdfmts] == [True] * 3
+    assert True in ['GROUP BY ?t' in q for q in graph_endpoint.queries]
+
+
+def test_parallel_pages(graph_endpoint):
+    assert _molecules(graph_endpoint, {'page_workers': 3}) == _molecules(graph_endpoint)
+
+    extractor = RDFMTExtractor(params={'page_workers': 3})
+    query = "SELECT DISTINCT ?s WHERE { ?s a <http://example.org/Person> } ORDER BY ?s"
+    assert extractor._get_results_iter(query, graph_endpoint.url, 7) == \
+        RDFMTExtractor()._get_results_iter(query, graph_endpoint.url, 7)
+    assert len(extractor._get_results_iter(query, graph_endpoint.url, 7)[0]) == 40
+
+    # no page is requested after the deadline of the calling thread
+    graph_endpoint.queries.clear()
+    extractor._deadlines.deadline = time.time() - 1
+    assert extractor._get_results_iter(query, graph_endpoint.url, 7) == ([], -1)
+    assert graph_endpoint.queries == []
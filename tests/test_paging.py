@@ -0,0 +1,116 @@
+import time
+
+from awudima.sdesc import RDFMTExtractor
+from awudima.sdesc.paging import AdaptivePageSize, keyset_query
+from awudima.sdesc.scheduler import RESULT_LIMIT, TIMEOUT, SERVER_ERROR, QUERY_ERROR
+
+ENDPOINT = 'http://example.org/sparql'
+
+
+def test_grows_while_fast_and_shrinks_when_slow():
+    sizes = AdaptivePageSize(max_size=400)
+    assert sizes.initial(ENDPOINT, 50) == 50
+    assert sizes.success(ENDPOINT, 50, 50, 0.1) == 100
+    assert sizes.success(ENDPOINT, 100, 100, 5.0) == 100
+    assert sizes.success(ENDPOINT, 100, 40, 0.1) == 100
+    assert sizes.success(ENDPOINT, 400, 400, 0.1) == 400
+    assert sizes.success(ENDPOINT, 400, 400, 20.0) == 200
+    # the last size is remembered for the next query to the endpoint
+    assert sizes.initial(ENDPOINT, 50) == 200
+    assert sizes.initial('http://example.org/other', 50) == 50
+
+
+def test_failures_set_a_ceiling():
+    sizes = AdaptivePageSize()
+    assert sizes.failure(ENDPOINT, 100) == 50
+    # grows halfway towards the ceiling, never to or past it
+    assert sizes.success(ENDPOINT, 50, 50, 0.1) == 75
+    assert sizes.failure(ENDPOINT, 75) == 37
+    size = 37
+    for _ in range(20):
+        size = sizes.success(ENDPOINT, size, size, 0.1)
+        assert size < 75
+    assert size == 74
+    assert sizes.failure(ENDPOINT, 1) == 0
+
+
+def test_row_limit():
+    sizes = AdaptivePageSize()
+    sizes.set_row_limit(ENDPOINT, 60)
+    assert sizes.initial(ENDPOINT, 100) == 60
+    assert sizes.success(ENDPOINT, 60, 60, 0.1) == 60
+
+
+def test_adaptive_paging_settles_below_the_endpoint_limit():
+    # the endpoint rejects pages of more than 64 rows
+    rows = [{'c': 'http://x/C%04d' % i} for i in range(3000)]
+    sent = []
+
+    def query(q, endpoint):
+        limit = int(q.split('LIMIT ')[1].split()[0])
+        offset = int(q.split('OFFSET ')[1]) if 'OFFSET' in q else 0
+        sent.append(limit)
+        if limit > 64:
+            return [], RESULT_LIMIT
+        page = rows[offset:offset + limit]
+        return page, len(page)
+
+    extractor = RDFMTExtractor(params={'page_size_mode': 'adaptive', 'page_sizes': AdaptivePageSize()})
+    extractor._query = query
+    res, status = extractor._get_results_iter("SELECT DISTINCT ?c WHERE { ?s a ?c }", ENDPOINT, 100)
+
+    assert status == 0 and res == rows
+    failures = len([limit for limit in sent if limit > 64])
+    assert failures <= 8
+    assert sent[-10:-1] == [64] * 9
+
+
+def _failing_endpoint(rows, max_limit, failure, sent):
+    # endpoint failing with {failure} on pages of more than {max_limit} rows
+    def query(q, endpoint):
+        limit = int(q.split('LIMIT ')[1].split()[0])
+        offset = int(q.split('OFFSET ')[1]) if 'OFFSET' in q else 0
+        sent.append(limit)
+        if limit > max_limit:
+            return [], failure
+        page = rows[offset:offset + limit]
+        return page, len(page)
+
+    return query
+
+
+def test_slow_or_overloaded_pages_are_shrunk():
+    rows = [{'c': 'http://x/C%04d' % i} for i in range(300)]
+    for failure in (TIMEOUT, SERVER_ERROR):
+        for params in ({}, {'page_workers': 3}):
+            sent = []
+            extractor = RDFMTExtractor(params=params)
+            extractor._query = _failing_endpoint(rows, 30, failure, sent)
+            res, status = extractor._get_results_iter("SELECT DISTINCT ?c WHERE { ?s a ?c }", ENDPOINT, 100)
+            assert status == 0 and res == rows
+            assert sent[-1] <= 30
+
+    # failures that smaller pages cannot avoid
+    sent = []
+    extractor = RDFMTExtractor()
+    extractor._query = _failing_endpoint(rows, 30, QUERY_ERROR, sent)
+    assert extractor._get_results_iter("SELECT DISTINCT ?c WHERE { ?s a ?c }", ENDPOINT, 100) == ([], -1)
+    assert sent == [100]
+
+    sent = []
+    extractor._query = _failing_endpoint(rows, 0, SERVER_ERROR, sent)
+    assert extractor._get_results_iter("SELECT DISTINCT ?c WHERE { ?s a ?c }", ENDPOINT, 100) == ([], -1)
+    assert sent == [100, 50, 25, 12, 6, 3, 1]
+
+    # nor is a page retried once the time budget is used up
+    sent = []
+    extractor._query = _failing_endpoint(rows, 30, TIMEOUT, sent)
+    extractor._deadlines.deadline = time.time() - 1
+    assert extractor._get_results_iter("SELECT DISTINCT ?c WHERE { ?s a ?c }", ENDPOINT, 100) == ([], -1)
+    assert sent == [100]
+
+
+def test_keyset_query():
+    query = keyset_query("SELECT DISTINCT ?c WHERE { ?s a ?c }", 'c', 'http://x/"A"')
+    assert query == 'SELECT DISTINCT ?c WHERE { ?s a ?c  FILTER(isIRI(?c) && STR(?c) > "http://x/\\"A\\"") } ' \
+                    'ORDER BY STR(?c)'
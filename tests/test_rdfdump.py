@@ -0,0 +1,85 @@
+from awudima.sdesc import DataSource, DataSourceType, Federation, RDFMTExtractor
+from awudima.sdesc.rdfdump import DumpSummary, parse_statement, summarize_dump
+
+TYPE = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#type'
+
+DUMP = """<http://x/a1> <%(type)s> <http://x/A> .
+<http://x/a1> <http://x/knows> <http://x/b1> .
+<http://x/a1> <http://x/name> "a \\"one\\""@en .
+<http://x/a2> <%(type)s> <http://x/A> .
+<http://x/a2> <http://x/name> "a2" <http://g> .
+<http://x/b1> <%(type)s> <http://x/B> .
+<http://x/b1> <http://x/age> "3"^^<http://www.w3.org/2001/XMLSchema#integer> .
+<http://x/B> <http://www.w3.org/2000/01/rdf-schema#subClassOf> <http://x/A> .
+<http://x/B> <http://www.w3.org/2000/01/rdf-schema#label> "Bee" .
+""" % {'type': TYPE}
+
+
+def _molecules(summary):
+    return {c['t']: (c, preds, ranges) for c, preds, ranges in summary.molecules(collect_labels=True,
+                                                                                  collect_stats=True)}
+
+
+def test_parse_statement():
+    assert parse_statement('<http://x/s> <http://x/p> "v"@en <http://g> .') == ('http://x/s', 'http://x/p', '"v"@en')
+    assert parse_statement('_:b0 <http://x/p> <http://x/o> .') == ('_:b0', 'http://x/p', 'http://x/o')
+    assert parse_statement('# comment') is None
+
+
+def test_summary_of_a_dump(tmp_path):
+    path = tmp_path / 'a.nt'
+    path.write_text(DUMP, encoding='utf-8')
+    molecules = _molecules(summarize_dump(str(path)))
+
+    concept, preds, ranges = molecules['http://x/A']
+    assert concept['card'] == 2
+    assert {p['p']: p['card'] for p in preds} == {TYPE: 2, 'http://x/knows': 1, 'http://x/name': 2}
+    # the class of b1 is only known once its own run is read
+    assert ranges['http://x/knows'] == ['http://x/B']
+    assert ranges['http://x/name'] == ['http://www.w3.org/1999/02/22-rdf-syntax-ns#langString',
+                                       'http://www.w3.org/2001/XMLSchema#string']
+
+    concept, preds, ranges = molecules['http://x/B']
+    assert concept['label'] == 'Bee'
+    assert [sc['sc'] for sc in concept['subClassOf']] == ['http://x/B', 'http://x/A']
+    assert ranges['http://x/age'] == ['http://www.w3.org/2001/XMLSchema#integer']
+
+
+def test_parts_read_in_parallel_give_the_same_summary(tmp_path):
+    path = tmp_path / 'a.nt'
+    path.write_text(DUMP * 3, encoding='utf-8')
+    assert _molecules(summarize_dump(str(path), processes=2, chunk_size=64)) == \
+        _molecules(summarize_dump(str(path)))
+
+
+def test_merge_of_summaries():
+    first = DumpSummary()
+    first.add_run('http://x/a1', [(TYPE, 'http://x/A')])
+    second = DumpSummary()
+    second.add_run('http://x/a1', [(TYPE, 'http://x/A')])
+    second.add_run('http://x/a2', [(TYPE, 'http://x/A')])
+    first.merge(second)
+    assert _molecules(first)['http://x/A'][0]['card'] == 2
+
+
+def test_refresh_of_a_dump(tmp_path):
+    path = tmp_path / 'a.nt'
+    path.write_text(DUMP, encoding='utf-8')
+    fed = Federation('f', 'f', '')
+    ds = DataSource('d', DataSourceType.LOCAL_RDF, str(path), 'd')
+    fed.addSource(ds)
+    fed.extract_molecules()
+
+    fingerprints = RDFMTExtractor().get_fingerprints(ds)
+    assert set(fingerprints) == {'http://x/A', 'http://x/B'}
+
+    assert fed.refresh_source_molecules(ds) == {'added': [], 'changed': ['http://x/A', 'http://x/B'], 'removed': []}
+    assert fed.refresh_source_molecules(ds) == {'added': [], 'changed': [], 'removed': []}
+    assert {m.mtId for m in fed.rdfmts} == {'http://x/A', 'http://x/B'}
+
+    path.write_text(DUMP.replace('<http://x/B>', '<http://x/C>') + '<http://x/a3> <%s> <http://x/A> .\n' % TYPE,
+                    encoding='utf-8')
+    assert fed.refresh_source_molecules(ds) == {'added': ['http://x/C'], 'changed': ['http://x/A'],
+                                                'removed': ['http://x/B']}
+    assert fed.getRDFMT('http://x/A').cardinality == 3
+    assert {m.mtId for m in fed.rdfmts} == {'http://x/A', 'http://x/C'}
@@ -0,0 +1,112 @@
+import sqlite3
+
+from awudima.sdesc import DataSource, DataSourceType, Federation
+from awudima.sdesc.relational import XSD, molecules, read_catalog, sql_datatype
+
+SCHEMA = """
+CREATE TABLE dept (id INTEGER, site TEXT, name VARCHAR(20) NOT NULL, PRIMARY KEY (id, site));
+CREATE TABLE emp (id INTEGER PRIMARY KEY, dept INTEGER, site TEXT, salary DECIMAL(8, 2), boss INTEGER,
+                  FOREIGN KEY (dept, site) REFERENCES dept, FOREIGN KEY (boss) REFERENCES emp (id));
+INSERT INTO dept VALUES (1, 'a', 'R&D'), (2, 'a', 'Sales');
+INSERT INTO emp VALUES (1, 1, 'a', 10.5, NULL), (2, 1, 'a', 8, 1), (3, 2, 'a', 9, 1);
+"""
+
+BASE = 'file:///db/'
+
+
+def _database(path=':memory:'):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _molecules(tables):
+    return {concept['t']: (concept, {p['p']: p for p in preds}, ranges)
+            for concept, preds, ranges in molecules(tables, BASE, collect_stats=True)}
+
+
+def test_sqlite_catalog():
+    tables = read_catalog(_database(), 'sqlite')
+    assert sorted(tables) == ['dept', 'emp']
+    # composite foreign key referencing the primary key of dept
+    assert sorted(tables['emp'].foreign_keys) == [(['boss'], 'emp', ['id']), (['dept', 'site'], 'dept', ['id', 'site'])]
+
+    concept, preds, ranges = _molecules(tables)[BASE + 'emp']
+    assert 'card' not in concept
+    assert ranges[BASE + 'emp#ref-dept;site'] == [BASE + 'dept']
+    assert ranges[BASE + 'emp#salary'] == [XSD + 'decimal']
+
+
+def test_sqlite_row_estimates():
+    conn = _database()
+    conn.execute("ANALYZE")
+    concept, preds, ranges = _molecules(read_catalog(conn, 'sqlite'))[BASE + 'dept']
+    assert concept['card'] == 2
+    # columns that cannot be null are used by every row
+    assert preds[BASE + 'dept#name']['card'] == 2
+    assert 'card' not in _molecules(read_catalog(conn, 'sqlite'))[BASE + 'emp'][1][BASE + 'emp#ref-boss']
+
+
+def test_sql_datatypes():
+    assert sql_datatype('VARCHAR(20)') == XSD + 'string'
+    assert sql_datatype('int unsigned') == XSD + 'integer'
+    assert sql_datatype('timestamp with time zone') == XSD + 'dateTime'
+    assert sql_datatype('jsonb') == 'http://www.w3.org/1999/02/22-rdf-syntax-ns#JSON'
+    assert sql_datatype('') == XSD + 'hexBinary'
+
+
+class _MySQLCursor:
+    # canned catalog of a MySQL database 'shop', with foreign keys to tables of databases 'shop' and 'crm'
+
+    def __init__(self):
+        self.query = None
+
+    def execute(self, query):
+        self.query = query
+
+    def fetchone(self):
+        return ('shop',) if self.query == "SELECT DATABASE()" else None
+
+    def fetchall(self):
+        if 'COLUMN_NAME, c.DATA_TYPE' in self.query:
+            return [('shop', 'orders', 'id', 'int', 'NO'), ('shop', 'orders', 'customer', 'int', 'YES'),
+                    ('shop', 'orders', 'item', 'int', 'YES')]
+        if 'KEY_COLUMN_USAGE' in self.query:
+            return [('shop', 'orders', 'fk_customer', 'customer', 'crm', 'customer', 'id'),
+                    ('shop', 'orders', 'fk_item', 'item', 'shop', 'items', 'id')]
+        return [('shop', 'orders', 7)]
+
+    def close(self):
+        pass
+
+
+class _MySQLConnection:
+    def cursor(self):
+        return _MySQLCursor()
+
+
+def test_mysql_tables_of_the_default_database():
+    for schema in (None, 'shop'):
+        tables = read_catalog(_MySQLConnection(), 'mysql', schema=schema)
+        assert list(tables) == ['orders']
+        assert tables['orders'].rows == 7
+        # tables of other databases keep their database name
+        assert tables['orders'].foreign_keys == [(['customer'], 'crm.customer', ['id']), (['item'], 'items', ['id'])]
+
+
+def test_refresh_of_a_database(tmp_path):
+    path = str(tmp_path / 'db.sqlite')
+    conn = _database(path)
+    conn.execute("ANALYZE")
+    conn.commit()
+    fed = Federation('f', 'f', '')
+    ds = DataSource('db', DataSourceType.SQLITE, path, 'db', params={'base_iri': BASE})
+    fed.addSource(ds)
+    fed.extract_molecules()
+    assert {m.mtId for m in fed.rdfmts} == {BASE + 'dept', BASE + 'emp'}
+
+    assert fed.refresh_source_molecules(ds) == {'added': [], 'changed': [BASE + 'dept', BASE + 'emp'], 'removed': []}
+    conn.executescript("ALTER TABLE emp ADD COLUMN email TEXT; CREATE TABLE site (id TEXT PRIMARY KEY);")
+    conn.close()
+    assert fed.refresh_source_molecules(ds) == {'added': [BASE + 'site'], 'changed': [BASE + 'emp'], 'removed': []}
+    assert BASE + 'emp#email' in {p.predId for p in fed.getRDFMT(BASE + 'emp').predicates}
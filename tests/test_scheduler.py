@@ -0,0 +1,134 @@
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from awudima.sdesc import scheduler as scheduler_module
+from awudima.sdesc.scheduler import EndpointScheduler, RESULT_LIMIT, TIMEOUT, SERVER_ERROR, QUERY_ERROR
+from awudima.sdesc.utils import EndpointSessionPool, contact_sparql_endpoint
+
+ENDPOINT = 'http://example.org/sparql'
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    # records backoff delays instead of sleeping, only within the scheduler module
+    sleeps = []
+    monkeypatch.setattr(scheduler_module, 'time', types.SimpleNamespace(sleep=sleeps.append, monotonic=time.monotonic))
+    return sleeps
+
+
+def _failing(statuses):
+    # send function returning the next of {statuses}, then a successful result
+    calls = []
+
+    def send():
+        calls.append(1)
+        if len(statuses) > 0:
+            return [], statuses.pop(0)
+        return [{'x': '1'}], 1
+
+    return send, calls
+
+
+def test_transient_failures_are_retried_with_backoff(no_backoff):
+    scheduler = EndpointScheduler(max_retries=3, backoff=0.5)
+    send, calls = _failing([TIMEOUT, SERVER_ERROR])
+    assert scheduler.run(ENDPOINT, send) == ([{'x': '1'}], 1)
+    assert len(calls) == 3
+    assert len(no_backoff) == 2
+    # full jitter: each delay is at most backoff * 2^attempt
+    assert no_backoff[0] <= 0.5 and no_backoff[1] <= 1.0
+    assert scheduler.stats()[ENDPOINT] == {'requests': 3, 'retries': 2, 'failures': {TIMEOUT: 1, SERVER_ERROR: 1}}
+
+
+def test_other_failures_are_not_retried():
+    scheduler = EndpointScheduler()
+    for status in (RESULT_LIMIT, QUERY_ERROR):
+        send, calls = _failing([status])
+        assert scheduler.run(ENDPOINT, send) == ([], status)
+        assert len(calls) == 1
+
+
+def test_max_retries_per_query():
+    scheduler = EndpointScheduler(max_retries=2)
+    send, calls = _failing([TIMEOUT] * 10)
+    assert scheduler.run(ENDPOINT, send) == ([], TIMEOUT)
+    assert len(calls) == 3
+
+
+def test_retry_budget_of_an_endpoint():
+    # retries may not exceed min_retries + retry_ratio * requests
+    scheduler = EndpointScheduler(max_retries=3, retry_ratio=0.1, min_retries=2)
+    send, calls = _failing([TIMEOUT] * 100)
+    for _ in range(10):
+        scheduler.run(ENDPOINT, send)
+    stats = scheduler.stats()[ENDPOINT]
+    assert stats['retries'] <= 2 + 0.1 * stats['requests']
+    assert stats['requests'] == len(calls) < 10 * 4
+
+    # the budget of another endpoint is not affected
+    send, calls = _failing([TIMEOUT])
+    assert scheduler.run('http://example.org/other', send) == ([{'x': '1'}], 1)
+
+
+def test_endpoint_limits_override_defaults():
+    scheduler = EndpointScheduler(max_retries=3, endpoint_limits={ENDPOINT: {'max_retries': 0}})
+    send, calls = _failing([TIMEOUT])
+    assert scheduler.run(ENDPOINT, send) == ([], TIMEOUT)
+    assert len(calls) == 1
+
+
+def test_max_concurrent_queries():
+    scheduler = EndpointScheduler(max_concurrent=2)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def query():
+        with scheduler.slot(ENDPOINT):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.perf_counter()
+            with lock:
+                active.pop()
+
+    threads = [threading.Thread(target=query) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert max(peak) <= 2
+
+
+class _StallingHandler(BaseHTTPRequestHandler):
+    # sends the start of a result, then stalls longer than the read timeout of the client
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/sparql-results+json')
+        self.end_headers()
+        self.wfile.write(b'{"head": {"vars": ["x"]}, "results": {"bindings": [')
+        self.wfile.flush()
+        time.sleep(1.5)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_read_timeout_while_streaming_is_a_timeout():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StallingHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        endpoint = 'http://127.0.0.1:%d/sparql' % server.server_address[1]
+        pool = EndpointSessionPool(timeout=0.3)
+        res, card = contact_sparql_endpoint("SELECT * WHERE { ?s ?p ?x }", endpoint, pool=pool,
+                                            scheduler=EndpointScheduler(max_retries=0))
+        assert card == TIMEOUT
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,72 @@
+import json
+import sqlite3
+
+import pytest
+
+from awudima.sdesc import RDFMT, RDFMTExtractor, DataSource, DataSourceType
+from awudima.sdesc.sinks import MoleculeSink, create_sink
+
+
+def _rdfmt(mtId):
+    rdfmt = RDFMT(mtId, mtId, 'typed')
+    rdfmt.addDataSource(DataSource('ds1', DataSourceType.SPARQL_ENDPOINT, 'http://example.org/sparql', 'ds1'))
+    return rdfmt
+
+
+def test_sink_interface_is_abstract():
+    with pytest.raises(TypeError):
+        MoleculeSink()
+
+    class Incomplete(MoleculeSink):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+@pytest.mark.parametrize('sink_type', ['jsonl', 'sqlite'])
+def test_file_sinks_need_a_path(sink_type):
+    with pytest.raises(Exception, match='path_to_sink'):
+        RDFMTExtractor(sink_type=sink_type)
+
+
+def test_callback_sink_needs_a_callback():
+    with pytest.raises(Exception, match='callback'):
+        create_sink('callback')
+
+
+def test_jsonl_sink(tmp_path):
+    path = str(tmp_path / 'rdfmts.jsonl')
+    sink = create_sink('jsonl', path)
+    sink.write(_rdfmt('http://x/A'))
+    # lines are flushed as soon as they are written
+    with open(path) as f:
+        assert json.loads(f.readline())['mtId'] == 'http://x/A'
+    sink.write(_rdfmt('http://x/B'))
+    sink.close()
+
+    sink = create_sink('jsonl', path, {'sink_mode': 'a'})
+    sink.write(_rdfmt('http://x/C'))
+    sink.close()
+    with open(path) as f:
+        assert [json.loads(line)['mtId'] for line in f] == ['http://x/A', 'http://x/B', 'http://x/C']
+
+
+def test_sqlite_sink(tmp_path):
+    path = str(tmp_path / 'rdfmts.db')
+    sink = create_sink('sqlite', path, {'sink_table': 'mts'})
+    sink.write(_rdfmt('http://x/A'))
+    sink.write(_rdfmt('http://x/A'))
+    sink.close()
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT mtId, dsId FROM mts").fetchall() == [('http://x/A', 'ds1')]
+    conn.close()
+
+
+def test_callback_sink():
+    written = []
+    sink = create_sink('callback', params={'callback': written.append})
+    rdfmt = _rdfmt('http://x/A')
+    sink.write(rdfmt)
+    assert written == [rdfmt] and not sink.in_memory
@@ -0,0 +1,65 @@
+import pytest
+
+from awudima.sdesc import Federation
+from awudima.sdesc.snapshot import CatalogSnapshot
+
+from conftest import build_catalog, catalog_json
+
+
+def test_snapshot_round_trip(tmp_path):
+    fed = build_catalog()
+    path = str(tmp_path / 'catalog.snp')
+    fed.save_snapshot(path)
+
+    with Federation.open_snapshot(path) as snapshot:
+        assert (snapshot.fedId, snapshot.name, snapshot.desc) == ('f', 'F', 'test federation')
+        assert {ds.dsId for ds in snapshot.datasources} == {'a', 'b'}
+        assert len(snapshot) == 2
+        assert list(snapshot.mtIds()) == ['http://example.org/Org', 'http://example.org/Person']
+
+        loaded = snapshot.to_federation()
+        assert catalog_json(loaded.rdfmts) == catalog_json(fed.rdfmts)
+        assert {ds.dsId for ds in loaded.datasources} == {'a', 'b'}
+        org = loaded.getRDFMT('http://example.org/Org')
+        assert org.cardinality_bounds == (1000, 1500) and not org.complete
+
+
+def test_snapshot_lookups(tmp_path):
+    fed = build_catalog()
+    path = str(tmp_path / 'catalog.snp')
+    fed.save_snapshot(path)
+
+    with CatalogSnapshot(path) as snapshot:
+        person = snapshot['http://example.org/Person']
+        # decoded once, then kept
+        assert snapshot.get('http://example.org/Person') is person
+        assert catalog_json([person]) == catalog_json([fed.getRDFMT('http://example.org/Person')])
+        assert {ds.dsId for ds in snapshot['http://example.org/Org'].datasources} == {'c'}
+        assert 'http://example.org/Org' in snapshot
+
+        # missing keys, including ones that sort before, between and after the stored mtIds
+        for mtId in ('http://example.org/A', 'http://example.org/Pa', 'http://example.org/Z', ''):
+            assert mtId not in snapshot
+            assert snapshot.get(mtId) is None
+            assert snapshot.get(mtId, 'missing') == 'missing'
+            with pytest.raises(KeyError):
+                snapshot[mtId]
+
+
+def test_empty_snapshot(tmp_path):
+    path = str(tmp_path / 'empty.snp')
+    Federation('e', 'E', '').save_snapshot(path)
+
+    with Federation.open_snapshot(path) as snapshot:
+        assert len(snapshot) == 0
+        assert list(snapshot.mtIds()) == []
+        assert snapshot.get('http://example.org/Person') is None
+        assert 'http://example.org/Person' not in snapshot
+        assert list(snapshot.to_federation().rdfmts) == []
+
+
+def test_not_a_snapshot(tmp_path):
+    path = tmp_path / 'catalog.ndjson'
+    build_catalog().dump_ndjson(str(path))
+    with pytest.raises(Exception):
+        CatalogSnapshot(str(path))
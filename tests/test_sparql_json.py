@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from awudima.sdesc.sparql_json import SPARQLJSONError, SPARQLJSONStream, iter_bindings, parse_results
+
+DOC = {
+    "head": {"vars": ["s", "n", "l"]},
+    "results": {"bindings": [
+        {"s": {"type": "uri", "value": "http://example.org/café/中"},
+         "n": {"type": "typed-literal", "value": "12345",
+               "datatype": "http://www.w3.org/2001/XMLSchema#integer"},
+         "l": {"type": "literal", "value": "a \"quoted\", {braced} label", "xml:lang": "en"}},
+        {"s": {"type": "bnode", "value": "b0"}}
+    ]}
+}
+
+ROWS = [{'s': 'http://example.org/café/中',
+         'n': '12345^^<http://www.w3.org/2001/XMLSchema#integer>',
+         'l': 'a "quoted", {braced} label@en'},
+        {'s': 'b0'}]
+
+
+def _chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_whole_document():
+    assert parse_results([json.dumps(DOC).encode('utf-8')]) == ROWS
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64])
+def test_chunk_boundaries_in_bytes(size):
+    # boundaries fall inside strings, escapes, numbers and multi-byte UTF-8 characters
+    data = json.dumps(DOC, ensure_ascii=False).encode('utf-8')
+    assert parse_results(_chunks(data, size)) == ROWS
+
+
+def test_chunk_boundary_inside_number():
+    doc = '{"head": {"vars": ["x"]}, "results": {"bindings": [], "count": 1234567}}'
+    for i in range(1, len(doc)):
+        stream = SPARQLJSONStream([doc[:i], doc[i:]])
+        assert list(stream) == []
+        assert stream.vars == ['x']
+
+
+def test_rows_are_lazy():
+    data = json.dumps(DOC).encode('utf-8')
+    consumed = []
+
+    def chunks():
+        for chunk in _chunks(data, 16):
+            consumed.append(chunk)
+            yield chunk
+
+    rows = iter_bindings(chunks())
+    assert next(rows) == ROWS[0]
+    assert sum(map(len, consumed)) < len(data)
+
+
+@pytest.mark.parametrize('value', [True, False])
+def test_ask_result(value):
+    data = json.dumps({"head": {}, "boolean": value}).encode('utf-8')
+    assert parse_results(_chunks(data, 3)) is value
+
+
+def test_empty_results():
+    assert parse_results([b'{"head": {"vars": ["s"]}, "results": {"bindings": []}}']) == []
+    assert parse_results([b'{}']) == []
+
+
+def test_truncated_response():
+    data = json.dumps(DOC).encode('utf-8')
+    for end in (len(data) // 3, len(data) // 2, len(data) - 1):
+        with pytest.raises(SPARQLJSONError):
+            parse_results(_chunks(data[:end], 10))
+
+
+def test_html_response():
+    html = b'<!DOCTYPE html><html><body><h1>Service Unavailable</h1></body></html>'
+    with pytest.raises(SPARQLJSONError):
+        parse_results([html])
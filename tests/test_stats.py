@@ -0,0 +1,48 @@
+from awudima.sdesc import RDFMTExtractor
+from awudima.sdesc.stats import HyperLogLog, wilson_interval
+
+ENDPOINT = 'http://example.org/sparql'
+
+
+def test_wilson_interval():
+    low, high = wilson_interval(5, 10)
+    assert 0 < low < 0.5 < high < 1
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+
+
+def test_hyperloglog():
+    sketch = HyperLogLog()
+    sketch.update(['http://x/s' + str(i) for i in range(10000)])
+    sketch.update(['http://x/s' + str(i) for i in range(5000)])
+    assert abs(sketch.count() - 10000) < 10000 * 3 * sketch.error()
+
+    # small sets are counted exactly, and merged sketches count the union
+    other = HyperLogLog()
+    other.update(['a', 'b', 'c'])
+    small = HyperLogLog()
+    small.update(['c', 'd'])
+    small.merge(other)
+    assert small.count() == 4
+
+
+def test_bulk_predicates_with_approximate_stats():
+    extractor = RDFMTExtractor(params={'predicate_mode': 'bulk', 'stats_mode': 'approximate',
+                                       'stats_sample_size': 10})
+    queries = []
+
+    def results(query, endpoint, limit, *args, **kwargs):
+        queries.append(query)
+        if 'COUNT' in query and 'VALUES ?s' not in query:
+            raise AssertionError("aggregate over a whole class: " + query)
+        if 'SELECT DISTINCT ?s WHERE' in query:
+            return [{'s': 'http://x/s' + str(i)} for i in range(4)], 0
+        if 'VALUES ?s' in query:
+            return [{'p': 'http://x/p', 'n': '2', 'c': '6'}], 0
+        return [], 0
+
+    extractor._get_results_iter = results
+    extractor.get_class_predicates = lambda endpoint, types: {'http://x/C': [{'p': 'http://x/p'}]}
+
+    class_preds = extractor.get_bulk_predicates(ENDPOINT, [{'t': 'http://x/C'}], collect_stats=True)
+    # the whole class (4 instances) is sampled, so the cardinality is exact
+    assert class_preds['http://x/C'] == [{'p': 'http://x/p', 'card': 6, 'card_bounds': None}]
@@ -0,0 +1,77 @@
+import gzip
+
+from awudima.sdesc import DataSource, DataSourceType, Federation
+from awudima.sdesc.tabular import XSD, TableSummary, file_iri, summarize_table
+
+CSV = "id,name,born,score\n1,Ann,1990-01-02,1.5\n2,Bob,NULL,2\n3,\"Doe, Jon\",1985-03-04,\n"
+
+
+def _columns(summary):
+    concept, preds, ranges = summary.molecule('file:///t.csv', collect_stats=True)
+    return {p['label']: (p['card'], ranges[p['p']][0]) for p in preds}
+
+
+def test_summary_of_a_csv_file(tmp_path):
+    path = tmp_path / 't.csv'
+    path.write_text(CSV, encoding='utf-8')
+    summary = summarize_table(str(path), 'csv', chunk_rows=2)
+    assert summary.rows == 3
+    assert _columns(summary) == {'id': (3, XSD + 'integer'), 'name': (3, XSD + 'string'),
+                                 'born': (2, XSD + 'date'), 'score': (2, XSD + 'decimal')}
+
+
+def test_merge_of_summaries():
+    first = TableSummary()
+    first.add_chunk({'a': ['1', '2']}, 2)
+    second = TableSummary()
+    second.add_chunk({'a': ['x'], 'b': ['true']}, 1)
+    first.merge(second)
+    assert first.rows == 3
+    assert _columns(first) == {'a': (3, XSD + 'string'), 'b': (1, XSD + 'boolean')}
+    assert first.columns['b'].null_ratio() == 2 / 3
+
+
+def test_tsv_fields_are_not_quoted(tmp_path):
+    path = tmp_path / 't.tsv'
+    path.write_text('id\tquote\n1\t"a\n2\tb"\n3\t"\n', encoding='utf-8')
+    summary = summarize_table(str(path), 'tsv')
+    assert summary.rows == 3
+    assert summary.columns['quote'].distinct.count() == 3
+
+
+def test_byte_order_mark_is_skipped(tmp_path):
+    path = tmp_path / 't.csv'
+    path.write_text(CSV, encoding='utf-8-sig')
+    assert list(summarize_table(str(path), 'csv').columns) == ['id', 'name', 'born', 'score']
+
+    path = tmp_path / 't.json.gz'
+    with gzip.open(str(path), 'wb') as f:
+        f.write('[{"id": 1, "tags": ["x"]}, {"id": 2}]'.encode('utf-8-sig'))
+    summary = summarize_table(str(path), 'json')
+    assert summary.rows == 2
+    assert _columns(summary) == {'id': (2, XSD + 'integer'),
+                                 'tags': (1, 'http://www.w3.org/1999/02/22-rdf-syntax-ns#JSON')}
+
+
+def test_json_lines(tmp_path):
+    path = tmp_path / 't.jsonl'
+    path.write_text('{"id": 1, "ok": true}\n{"id": 2.5}\n', encoding='utf-8')
+    assert _columns(summarize_table(str(path), 'json', chunk_rows=1)) == {'id': (2, XSD + 'decimal'),
+                                                                          'ok': (1, XSD + 'boolean')}
+
+
+def test_refresh_of_a_folder(tmp_path):
+    (tmp_path / 'a.csv').write_text(CSV, encoding='utf-8')
+    (tmp_path / 'b.csv').write_text('x\n1\n', encoding='utf-8')
+    fed = Federation('f', 'f', '')
+    ds = DataSource('t', DataSourceType.LOCAL_CSV, str(tmp_path), 't')
+    fed.addSource(ds)
+    fed.extract_molecules()
+    a, b = file_iri(str(tmp_path / 'a.csv')), file_iri(str(tmp_path / 'b.csv'))
+    assert {m.mtId for m in fed.rdfmts} == {a, b}
+
+    assert fed.refresh_source_molecules(ds) == {'added': [], 'changed': [a, b], 'removed': []}
+    (tmp_path / 'b.csv').write_text('x\n1\n2\n', encoding='utf-8')
+    assert fed.refresh_source_molecules(ds) == {'added': [], 'changed': [b], 'removed': []}
+    assert fed.getRDFMT(b).cardinality == 2
+    assert fed.getRDFMT(a).cardinality == 3
@@ -0,0 +1,64 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from awudima.sdesc.scheduler import EndpointScheduler
+from awudima.sdesc.utils import EndpointSessionPool, iter_sparql_endpoint
+
+
+def test_one_session_per_server():
+    pool = EndpointSessionPool()
+    session = pool.get_session('http://example.org/sparql')
+    assert pool.get_session('http://example.org/other/sparql') is session
+    assert pool.get_session('https://example.org/sparql') is not session
+    assert pool.get_session('http://example.org:8890/sparql') is not session
+    assert session.headers['Connection'] == 'keep-alive'
+
+    pool.close()
+    assert pool.get_session('http://example.org/sparql') is not session
+
+
+def test_no_keep_alive():
+    pool = EndpointSessionPool(keep_alive=False)
+    assert pool.get_session('http://example.org/sparql').headers['Connection'] == 'close'
+
+
+class _RowsHandler(BaseHTTPRequestHandler):
+    # answers every query with three rows
+
+    def do_GET(self):
+        body = json.dumps({'head': {'vars': ['x']},
+                           'results': {'bindings': [{'x': {'type': 'uri', 'value': 'http://x/' + str(i)}}
+                                                    for i in range(3)]}}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/sparql-results+json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def endpoint():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _RowsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:%d/sparql' % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def test_queries_while_iterating_over_rows(endpoint):
+    # with a single slot per endpoint, a query sent while iterating over the rows of another one must not wait for it
+    scheduler = EndpointScheduler(max_concurrent=1)
+    pool = EndpointSessionPool(timeout=5)
+    rows = []
+    for row in iter_sparql_endpoint("SELECT ?x WHERE { ?x ?p ?o }", endpoint, pool=pool, scheduler=scheduler):
+        inner = list(iter_sparql_endpoint("SELECT ?x WHERE { ?x ?p ?o }", endpoint, pool=pool, scheduler=scheduler))
+        rows.append((row['x'], len(inner)))
+
+    assert rows == [('http://x/0', 3), ('http://x/1', 3), ('http://x/2', 3)]